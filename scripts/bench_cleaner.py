@@ -0,0 +1,62 @@
+"""Benchmark TerminalCleaner on multi-megabyte CLI captures.
+
+Usage: uv run python scripts/bench_cleaner.py [megabytes]
+"""
+
+import sys
+import time
+
+from zyxel_cli.terminal import TerminalCleaner
+
+PAGER_ERASE = "--More--" + "\b" * 8 + " " * 8 + "\b" * 8
+ROW = "    1 | 00:11:22:33:44:{:02X} |      Dynamic      | {} \r\n"
+
+
+def make_capture(size: int, *, paged: bool = True) -> str:
+    """Return a MAC table like capture of about `size` characters"""
+    rows = []
+    total = 0
+    i = 0
+    while total < size:
+        row = ROW.format(i % 256, i % 48 + 1)
+        # Pager marker erased before every page, colored lines now and then
+        if paged and i % 20 == 19:
+            row = PAGER_ERASE + row
+        elif paged and i % 97 == 0:
+            row = "\x1b[1m" + row.rstrip("\r\n") + "\x1b[0m\r\n"
+        rows.append(row)
+        total += len(row)
+        i += 1
+    return "".join(rows)
+
+
+def bench(name: str, fn, text: str, repeat: int = 3) -> None:
+    best = min(_timed(fn, text) for _ in range(repeat))
+    print(f"{name:<22} {len(text) / best / 1e6:8.1f} MB/s  ({best * 1000:.0f} ms)")
+
+
+def _timed(fn, text: str) -> float:
+    started = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - started
+
+
+def clean_chunked(text: str) -> None:
+    cleaner = TerminalCleaner()
+    for pos in range(0, len(text), 4096):
+        cleaner.feed(text[pos : pos + 4096])
+    cleaner.flush()
+
+
+def main() -> None:
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    for paged in (False, True):
+        text = make_capture(int(megabytes * 1_000_000), paged=paged)
+        kind = "paged with escapes" if paged else "plain"
+        print(f"Capture ({kind}): {len(text) / 1e6:.1f} MB, {text.count(chr(10))} lines")
+        bench("  clean (buffered)", TerminalCleaner().clean, text)
+        bench("  feed (4 KiB chunks)", clean_chunked, text)
+
+
+if __name__ == "__main__":
+    main()
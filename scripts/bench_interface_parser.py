@@ -0,0 +1,48 @@
+"""Benchmark the per-interface cost of parse_interface_output.
+
+Usage: uv run python scripts/bench_interface_parser.py [interfaces]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from zyxel_cli.interface_utils import parse_interface_output, split_interface_blocks
+
+FIXTURE = Path(__file__).resolve().parents[1] / "src" / "tests" / "data" / "intefaces_cmd.json"
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    raw = json.loads(FIXTURE.read_text())["interfaces"][0]["raw_output"]
+    block = raw.split("\n", 1)[1]
+
+    best = min(
+        _timed(lambda: [parse_interface_output(block) for _ in range(count)]) for _ in range(3)
+    )
+    print(f"parse_interface_output: {best / count * 1e6:6.1f} us per interface ({count} parsed)")
+
+    # A 52-port switch listed with one "show interfaces"
+    bulk = "\n".join(block.replace("Ethernet1 ", f"Ethernet{i} ") for i in range(1, 53))
+    rounds = max(1, count // 52)
+    best = min(
+        _timed(
+            lambda: [
+                list(map(parse_interface_output, split_interface_blocks(bulk)))
+                for _ in range(rounds)
+            ]
+        )
+        for _ in range(3)
+    )
+    print(f"split + parse (bulk):   {best / (rounds * 52) * 1e6:6.1f} us per interface")
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep the on-disk caches of test runs away from the user's cache directory
+os.environ["ZYXEL_CACHE_DIR"] = tempfile.mkdtemp(prefix="zyxel-cli-tests-")
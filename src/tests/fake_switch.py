@@ -0,0 +1,226 @@
+"""Scripted stand-in for a GS1900 CLI used by the client tests."""
+
+import queue
+import socket
+import threading
+import time
+
+import paramiko
+
+PAGER_MARKER = "--More--"
+PAGER_ERASE = "\b" * len(PAGER_MARKER) + " " * len(PAGER_MARKER) + "\b" * len(PAGER_MARKER)
+
+
+class FakeSwitch:
+    """Answers CLI commands like a GS1900: echo, output, prompt.
+
+    `responses` maps a command to its output. With `page_lines` set, output
+    longer than that is paged with a `--More--` marker until `pager_command`
+    turns paging off. `delay` makes every command take that many seconds,
+    like a switch CPU working through a large table.
+    """
+
+    def __init__(
+        self,
+        responses: dict[str, str] | None = None,
+        *,
+        hostname: str = "GS1900",
+        page_lines: int = 0,
+        pager_command: str | None = "terminal length 0",
+        delay: float = 0.0,
+    ):
+        self.responses = responses or {}
+        self.hostname = hostname
+        self.page_lines = page_lines
+        self.pager_command = pager_command
+        self.delay = delay
+        self.received: list[str] = []
+
+    @property
+    def prompt(self) -> str:
+        return f"{self.hostname}# "
+
+    def answer(self, command: str) -> str:
+        """Return the output of `command` without echo or prompt"""
+        self.received.append(command)
+        if not command:
+            return ""
+        if self.pager_command is not None and command == self.pager_command:
+            self.page_lines = 0
+            return ""
+        if self.delay:
+            time.sleep(self.delay)
+        if command in self.responses:
+            return self.responses[command]
+        return "% Invalid command\r\n"
+
+
+class FakeChannel:
+    """Channel stand-in backed by a socket pair so it works with `select`.
+
+    A writer thread feeds the switch's replies into the socket so large
+    outputs cannot dead-lock against a reader on the same thread.
+    """
+
+    def __init__(self, switch: FakeSwitch):
+        self.switch = switch
+        self.sent: list[bytes] = []
+        self.closed = False
+        self._local, self._remote = socket.socketpair()
+        self._pending_input = ""
+        self._pages: list[str] = []
+        self._outbox: queue.Queue[bytes | None] = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        while (data := self._outbox.get()) is not None:
+            try:
+                self._remote.sendall(data)
+            except OSError:
+                return
+        self._remote.close()
+
+    def _emit(self, text: str) -> None:
+        self._outbox.put(text.encode())
+
+    def _emit_output(self, output: str) -> None:
+        lines = output.splitlines(keepends=True)
+        page_lines = self.switch.page_lines
+        if page_lines and len(lines) > page_lines:
+            self._pages = [
+                "".join(lines[i : i + page_lines]) for i in range(0, len(lines), page_lines)
+            ]
+            self._emit(self._pages.pop(0) + PAGER_MARKER)
+        else:
+            self._emit(output + self.switch.prompt)
+
+    def fileno(self) -> int:
+        return self._local.fileno()
+
+    def recv(self, n: int) -> bytes:
+        return self._local.recv(n)
+
+    def send(self, data: bytes) -> int:
+        self.sent.append(data)
+        self._pending_input += data.decode()
+
+        while self._pages and self._pending_input.startswith(" "):
+            self._pending_input = self._pending_input[1:]
+            page = self._pages.pop(0)
+            self._emit(PAGER_ERASE + page + (PAGER_MARKER if self._pages else self.switch.prompt))
+
+        while not self._pages and "\n" in self._pending_input:
+            line, self._pending_input = self._pending_input.split("\n", 1)
+            command = line.strip()
+            if command == "exit":
+                self._outbox.put(None)
+                return len(data)
+            self._emit(f"{command}\r\n" if command else "\r\n")
+            self._emit_output(self.switch.answer(command))
+
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._outbox.put(None)
+        self._local.close()
+
+
+class FakeClient:
+    """`paramiko.SSHClient` stand-in handing out channels to one FakeSwitch"""
+
+    def __init__(self, switch: FakeSwitch):
+        self.switch = switch
+        self.channels: list[FakeChannel] = []
+
+    def invoke_shell(self) -> FakeChannel:
+        channel = FakeChannel(self.switch)
+        self.channels.append(channel)
+        return channel
+
+    def close(self) -> None:
+        for channel in self.channels:
+            channel.close()
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, password: str):
+        self.password = password
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        if password == self.password:
+            return paramiko.common.AUTH_SUCCESSFUL
+        return paramiko.common.AUTH_FAILED
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.common.OPEN_SUCCEEDED
+        return paramiko.common.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args: object) -> bool:
+        return True
+
+    def check_channel_shell_request(self, channel: paramiko.Channel) -> bool:
+        return True
+
+
+class FakeSSHServer:
+    """Real SSH server on localhost whose shells talk to one FakeSwitch.
+
+    Every shell channel gets its own CLI (a FakeChannel) pumped by a thread,
+    so channels on one transport run their commands concurrently like on
+    the switch. `connections` counts accepted SSH handshakes.
+    """
+
+    def __init__(self, switch: FakeSwitch, *, password: str = "secret"):
+        self.switch = switch
+        self.password = password
+        self.connections = 0
+        self._host_key = paramiko.RSAKey.generate(1024)
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self._listener.getsockname()[1]
+        self._transports: list[paramiko.Transport] = []
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(self._host_key)
+            transport.start_server(server=_ServerInterface(self.password))
+            self._transports.append(transport)
+            threading.Thread(target=self._channel_loop, args=(transport,), daemon=True).start()
+
+    def _channel_loop(self, transport: paramiko.Transport) -> None:
+        while transport.is_active():
+            channel = transport.accept(timeout=1)
+            if channel is not None:
+                threading.Thread(target=self._serve_shell, args=(channel,), daemon=True).start()
+
+    def _serve_shell(self, channel: paramiko.Channel) -> None:
+        cli = FakeChannel(self.switch)
+
+        def pump_output() -> None:
+            while data := cli.recv(4096):
+                channel.sendall(data)
+            channel.close()
+
+        threading.Thread(target=pump_output, daemon=True).start()
+        while data := channel.recv(4096):
+            cli.send(data)
+        cli.close()
+
+    def close(self) -> None:
+        self._listener.close()
+        for transport in self._transports:
+            transport.close()
@@ -0,0 +1,150 @@
+"""Tests for the asyncio session."""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+from zyxel_cli.async_client import AsyncZyxelSession
+from zyxel_cli.client import ZyxelSession
+
+from .fake_switch import FakeClient, FakeSwitch
+from .test_client import FakeShell
+
+RESPONSES = {
+    "show version": "Firmware Version : V2.50\r\n",
+    "show interface 1": "GigabitEthernet1 is up\r\n",
+    "show mac address-table": "".join(
+        f"    1 | 00:00:00:00:00:{i:02X} |      Dynamic      | 1 \r\n" for i in range(40)
+    ),
+}
+
+
+def _async_session(switch, **kwargs):
+    session = AsyncZyxelSession(host="host", user="user", password="pass", timeout=5.0, **kwargs)
+    session.session.client = FakeClient(switch)  # type: ignore[assignment]
+    return session
+
+
+def test_async_execute_matches_sync_session():
+    commands = list(RESPONSES)
+
+    sync = ZyxelSession(host="host", user="user", password="pass", timeout=5.0)
+    sync.client = FakeClient(FakeSwitch(RESPONSES, page_lines=10))  # type: ignore[assignment]
+    expected = [sync.execute_command(command=command) for command in commands]
+
+    async def run():
+        session = _async_session(FakeSwitch(RESPONSES, page_lines=10))
+        single = [await session.execute_command(command=command) for command in commands]
+        batched = await session.execute_many(commands)
+        return single, batched, session
+
+    single, batched, session = asyncio.run(run())
+
+    assert single == expected
+    assert batched == expected
+    assert session.session.pager_disabled is True
+
+
+def test_async_pager_fallback():
+    async def run():
+        session = _async_session(FakeSwitch(RESPONSES, page_lines=10, pager_command=None))
+        return await session.execute_command(command="show mac address-table")
+
+    out = asyncio.run(run())
+    assert out.count("Dynamic") == 40
+    assert "--More--" not in out
+
+
+def test_async_sessions_run_concurrently_on_one_loop():
+    async def run():
+        sessions = [_async_session(FakeSwitch(RESPONSES)) for _ in range(50)]
+        outputs = await asyncio.gather(
+            *(session.execute_command(command="show version") for session in sessions)
+        )
+        await asyncio.gather(*(session.close() for session in sessions))
+        return outputs
+
+    outputs = asyncio.run(run())
+    assert len(outputs) == 50
+    assert all("V2.50" in out for out in outputs)
+
+
+def test_async_context_manager_connects_and_closes():
+    calls = []
+
+    with patch.object(ZyxelSession, "connect", new=lambda self: calls.append("connect")):
+        with patch.object(ZyxelSession, "close", new=lambda self: calls.append("close")):
+
+            async def run():
+                async with AsyncZyxelSession(host="h", user="u") as session:
+                    assert session.host == "h"
+
+            asyncio.run(run())
+
+    assert calls == ["connect", "close"]
+
+
+def test_async_execute_raises_when_not_connected():
+    async def run():
+        await AsyncZyxelSession(host="h", user="u").execute_command(command="show version")
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as err:
+        assert "Not connected" in str(err)
+    else:
+        raise AssertionError("expected RuntimeError")
+
+
+def test_async_shell_opens_off_the_event_loop():
+    threads = []
+    session = _async_session(FakeSwitch(RESPONSES))
+    client = session.session.client
+    invoke_shell = client.invoke_shell
+
+    def recording_invoke_shell():
+        threads.append(threading.current_thread())
+        return invoke_shell()
+
+    client.invoke_shell = recording_invoke_shell  # type: ignore[method-assign]
+
+    async def run():
+        return await session.execute_command(command="show version")
+
+    assert "V2.50" in asyncio.run(run())
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_async_timed_out_batch_resets_the_shell():
+    slow = FakeShell(initial_chunks=[b"GS1900# "], response_chunks=[b"show slow\r\n"])
+    fresh = FakeShell(
+        initial_chunks=[b"GS1900# "],
+        response_chunks=[b"show fast\r\nSHOW FAST OUTPUT\r\nGS1900# "],
+    )
+    shells = [slow, fresh]
+
+    class ReopeningClient:
+        def invoke_shell(self):
+            return shells.pop(0)
+
+        def close(self):
+            pass
+
+    session = AsyncZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=0.1
+    )
+    session.session.client = ReopeningClient()  # type: ignore[assignment]
+
+    async def run():
+        await session.execute_command(command="show slow")
+        assert session.session.complete is False
+        # The switch answers the timed-out command late, on the old shell
+        if not slow.closed:
+            slow._remote.sendall(b"SLOW OUTPUT\r\nGS1900# ")
+        return await session.execute_command(command="show fast")
+
+    out = asyncio.run(run())
+    assert "SHOW FAST OUTPUT" in out
+    assert "SLOW" not in out
+    assert session.session.shell is fresh
+    session.session.close()
@@ -0,0 +1,202 @@
+"""Tests for the session broker."""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from zyxel_cli import commands
+from zyxel_cli.broker import BrokerServer, BrokerSession, SessionPool, broker_available
+
+from .test_commands import make_args
+
+
+class FakePoolSession:
+    instances: list["FakePoolSession"] = []
+
+    def __init__(self, *, host, user, password, port, prompt_pattern):
+        self.host = host
+        self.password = password
+        self.prompt_pattern = prompt_pattern
+        self.client = None
+        self.complete = True
+        self.connects = 0
+        self.closed = False
+        self.fail_next = False
+        FakePoolSession.instances.append(self)
+
+    def connect(self):
+        self.connects += 1
+        if self.password == "wrong":
+            raise ConnectionError(f"Failed to connect to {self.host}: Authentication failed.")
+        self.client = object()
+
+    def execute_many(self, commands):
+        if self.fail_next:
+            self.fail_next = False
+            raise OSError("Socket is closed")
+        return [f"{self.host}: {command}" for command in commands]
+
+    def close(self):
+        self.closed = True
+
+
+def _request(host="sw1", password="pw", commands=("show version",), **extra):
+    return {
+        "host": host,
+        "port": 22,
+        "user": "admin",
+        "password": password,
+        "commands": commands,
+        **extra,
+    }
+
+
+def test_pool_reuses_session_per_host_and_password():
+    FakePoolSession.instances = []
+    pool = SessionPool(session_factory=FakePoolSession)
+
+    assert pool.execute(_request()) == (["sw1: show version"], True)
+    assert pool.execute(_request(commands=["show vlan"])) == (["sw1: show vlan"], True)
+    pool.execute(_request(password="other"))
+    pool.execute(_request(prompt_pattern=r"^core#\s*$"))
+
+    assert len(pool) == 3
+    assert FakePoolSession.instances[0].connects == 1
+    assert FakePoolSession.instances[2].prompt_pattern == r"^core#\s*$"
+
+
+def test_pool_reconnects_dropped_session_once():
+    FakePoolSession.instances = []
+    pool = SessionPool(session_factory=FakePoolSession)
+    pool.execute(_request())
+    FakePoolSession.instances[0].fail_next = True
+
+    assert pool.execute(_request()) == (["sw1: show version"], True)
+    assert FakePoolSession.instances[0].closed is True
+    assert len(FakePoolSession.instances) == 2
+
+
+def test_pool_does_not_retry_failed_logins():
+    FakePoolSession.instances = []
+    pool = SessionPool(session_factory=FakePoolSession)
+    try:
+        pool.execute(_request(password="wrong"))
+    except ConnectionError as err:
+        assert "Authentication failed" in str(err)
+    else:
+        raise AssertionError("expected ConnectionError")
+
+    # One login attempt, and no broken session left in the pool
+    assert [session.connects for session in FakePoolSession.instances] == [1]
+    assert len(pool) == 0
+
+
+def test_pool_evicts_idle_sessions():
+    FakePoolSession.instances = []
+    pool = SessionPool(idle_timeout=0.05, session_factory=FakePoolSession)
+    pool.execute(_request())
+
+    assert pool.evict_idle() == 0
+    time.sleep(0.1)
+    assert pool.evict_idle() == 1
+    assert len(pool) == 0
+    assert FakePoolSession.instances[0].closed is True
+
+
+def test_broker_round_trip_and_cli_uses_it():
+    FakePoolSession.instances = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "broker.sock"
+        server = BrokerServer(path, SessionPool(session_factory=FakePoolSession))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert broker_available(path)
+
+            session = BrokerSession(path, host="sw1", user="admin", password="pw")
+            assert session.execute_many(["a", "b"]) == ["sw1: a", "sw1: b"]
+
+            def no_direct_session(*a, **k):
+                raise AssertionError("CLI should go through the broker")
+
+            stdout = StringIO()
+            with patch.dict("os.environ", {"ZYXEL_BROKER_SOCKET": str(path)}):
+                with patch.object(commands, "ZyxelSession", new=no_direct_session):
+                    with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+                        with patch("sys.stdout", new=stdout):
+                            args = make_args("version", host="sw1", no_broker=False)
+                            out = commands.handle_args(args=args)
+
+            # Plain-text output is streamed rather than returned
+            assert out is None
+            assert stdout.getvalue() == "sw1: show version\n"
+            # Both requests shared one pooled connection
+            assert len(FakePoolSession.instances) == 1
+            assert FakePoolSession.instances[0].connects == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert not path.exists()
+        assert not broker_available(path)
+
+
+def test_broker_session_raises_broker_errors():
+    class FailingPool(SessionPool):
+        def execute(self, request):
+            raise ConnectionError("Failed to connect to sw1: refused")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "broker.sock"
+        server = BrokerServer(path, FailingPool())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            session = BrokerSession(path, host="sw1", user="admin", password="pw")
+            try:
+                session.execute_command(command="show version")
+            except ConnectionError as err:
+                assert "refused" in str(err)
+            else:
+                raise AssertionError("expected ConnectionError")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_broker_refuses_shared_directories_and_running_brokers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "broker.sock"
+        # A stale socket from a broker that died is replaced
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(str(path))
+        server = BrokerServer(path, SessionPool(session_factory=FakePoolSession))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            assert broker_available(path)
+            try:
+                BrokerServer(path, SessionPool(session_factory=FakePoolSession))
+            except RuntimeError as err:
+                assert "already listening" in str(err)
+            else:
+                raise AssertionError("expected RuntimeError")
+            assert broker_available(path)
+
+            # Anyone who can enter the directory could have planted the socket
+            os.chmod(tmp, 0o755)
+            assert not broker_available(path)
+            session = BrokerSession(path, host="sw1", user="admin", password="pw")
+            try:
+                session.execute_command(command="show version")
+            except PermissionError as err:
+                assert "0700" in str(err)
+            else:
+                raise AssertionError("expected PermissionError")
+        finally:
+            os.chmod(tmp, 0o700)
+            server.shutdown()
+            server.server_close()
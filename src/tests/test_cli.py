@@ -15,6 +15,9 @@ class TestCli(TestCase):
 
     def test_main_exec_uses_session(self):
         class FakeSession:
+            host = "1.2.3.4"
+            port = 22
+
             def __enter__(self):
                 return self
 
@@ -24,6 +27,9 @@ class TestCli(TestCase):
             def execute_command(self, *, command):
                 return "RESULT: " + command
 
+            def iter_command(self, command):
+                yield self.execute_command(command=command)
+
         out = StringIO()
         with patch.object(
             sys,
@@ -1,7 +1,12 @@
+import socket
 import time
-from unittest.mock import patch
 
-from zyxel_cli.client import ZyxelSession
+from zyxel_cli.client import DEFAULT_PROMPT, PromptReader, ZyxelSession
+from zyxel_cli.consts import ZYXEL_MAX_CHANNELS
+from zyxel_cli.shell_output import learn_prompt
+
+from .fake_switch import FakeChannel, FakeSSHServer, FakeSwitch
+from .fake_switch import FakeClient as FakeSwitchClient
 
 
 def test_clean_output_removes_ansi_and_prompts():
@@ -13,40 +18,42 @@ def test_clean_output_removes_ansi_and_prompts():
 
 
 class FakeShell:
+    """Channel stand-in backed by a socket pair so it works with `select`."""
+
     def __init__(self, initial_chunks=None, response_chunks=None):
-        self.initial_chunks = initial_chunks or []
         self.response_chunks = response_chunks or []
         self.sent = []
         self.closed = False
-        self._produced_response = False
+        self._local, self._remote = socket.socketpair()
+        for chunk in initial_chunks or []:
+            self._remote.sendall(chunk)
 
-    def recv_ready(self):
-        if not self._produced_response and self.initial_chunks:
-            return True
-        return bool(self.response_chunks)
+    def fileno(self):
+        return self._local.fileno()
 
     def recv(self, n):
-        if not self._produced_response and self.initial_chunks:
-            return self.initial_chunks.pop(0)
-        if self.response_chunks:
-            return self.response_chunks.pop(0)
-        return b""
+        return self._local.recv(n)
 
     def send(self, data):
         self.sent.append(data)
         # When command is sent, make responses available
         if data and data.strip():
-            self._produced_response = True
+            while self.response_chunks:
+                self._remote.sendall(self.response_chunks.pop(0))
 
     def close(self):
         self.closed = True
+        self._local.close()
+        self._remote.close()
 
 
 class FakeClient:
     def __init__(self, shell):
         self._shell = shell
+        self.invoked = 0
 
     def invoke_shell(self):
+        self.invoked += 1
         return self._shell
 
     def close(self):
@@ -60,12 +67,361 @@ def test_execute_command_collects_output():
     shell = FakeShell(initial_chunks=initial, response_chunks=response)
     client = FakeClient(shell)
 
-    session = ZyxelSession(host="host", user="user", password="pass")
+    session = ZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=0.05
+    )
     session.client = client  # type: ignore[assignment]
 
-    with patch.object(time, "sleep", new=lambda s: None):
-        out = session.execute_command(command="show version")
+    out = session.execute_command(command="show version")
 
     # At least the response should contain expected data
     assert "Output line 2" in out
+    # No prompt after the output: the read ended on the idle timeout
+    assert session.complete is False
+    # Its late output must not reach the next command, so the shell is gone
     assert shell.closed is True
+    assert shell.sent[-1] == b"exit\n"
+    assert session.shell is None
+
+
+def test_late_output_does_not_leak_into_the_next_command():
+    for execute in (
+        lambda session, command: session.execute_command(command=command),
+        lambda session, command: session.execute_many([command])[0],
+    ):
+        slow = FakeShell(initial_chunks=[b"GS1900# "], response_chunks=[b"show slow\r\n"])
+        fresh = FakeShell(
+            initial_chunks=[b"GS1900# "],
+            response_chunks=[b"show fast\r\nSHOW FAST OUTPUT\r\nGS1900# "],
+        )
+        shells = [slow, fresh]
+
+        class ReopeningClient:
+            def invoke_shell(self):
+                return shells.pop(0)
+
+            def close(self):
+                pass
+
+        session = ZyxelSession(
+            host="host", user="user", password="pass", pager_command=None, timeout=0.1
+        )
+        session.client = ReopeningClient()  # type: ignore[assignment]
+
+        execute(session, "show slow")
+        assert session.complete is False
+        # The switch answers the timed-out command late, on the old shell
+        if not slow.closed:
+            slow._remote.sendall(b"SLOW OUTPUT\r\nGS1900# ")
+
+        out = execute(session, "show fast")
+        assert "SHOW FAST OUTPUT" in out
+        assert "SLOW" not in out
+        assert session.complete is True
+        assert session.shell is fresh
+        session.close()
+
+
+def test_execute_command_reuses_shell():
+    shell = FakeShell(
+        initial_chunks=[b"Switch>"], response_chunks=[b"show version\r\nfirst\r\nSwitch>"]
+    )
+    client = FakeClient(shell)
+
+    session = ZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=5.0
+    )
+    session.client = client  # type: ignore[assignment]
+
+    first = session.execute_command(command="show version")
+    shell.response_chunks.append(b"show vlan\r\nsecond\r\nSwitch>")
+    second = session.execute_command(command="show vlan")
+
+    assert "first" in first
+    assert "second" in second
+    assert client.invoked == 1
+    assert shell.sent.count(b"\n") == 1
+
+
+def test_execute_command_reopens_closed_shell():
+    dead = FakeShell()
+    dead.closed = True
+    fresh = FakeShell(
+        initial_chunks=[b"GS1900# "], response_chunks=[b"show version\r\nOutput\r\nGS1900# "]
+    )
+    shells = [fresh]
+
+    class ReopeningClient:
+        def invoke_shell(self):
+            return shells.pop(0)
+
+        def close(self):
+            pass
+
+    session = ZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=0.05
+    )
+    session.client = ReopeningClient()  # type: ignore[assignment]
+    session.shell = dead  # type: ignore[assignment]
+
+    out = session.execute_command(command="show version")
+
+    assert "Output" in out
+    assert session.shell is fresh
+
+
+def test_execute_command_returns_at_prompt_without_idle_timeout():
+    shell = FakeShell(
+        initial_chunks=[b"\r\nGS1900# "],
+        response_chunks=[b"show version\r\n", b"Firmware Version : V2.50\r\nGS1900# "],
+    )
+    session = ZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=5.0
+    )
+    session.client = FakeClient(shell)  # type: ignore[assignment]
+
+    started = time.monotonic()
+    out = session.execute_command(command="show version")
+
+    assert "Firmware Version : V2.50" in out
+    assert "GS1900#" not in out
+    # Returned on the prompt, long before the idle timeout
+    assert time.monotonic() - started < 1.0
+    assert session.complete is True
+    assert session.prompt is not None
+    assert session.prompt.pattern.startswith("^GS1900")
+
+
+def test_learn_prompt_from_banner():
+    prompt = learn_prompt("Welcome\r\n\r\nGS1900-24E# ")
+    assert prompt is not None
+    assert prompt.search("GS1900-24E(config)#")
+    assert prompt.search("GS1900-24E>")
+    assert not prompt.search("Switch#")
+    assert learn_prompt("no prompt here") is None
+
+
+def test_explicit_prompt_pattern_skips_learning():
+    session = ZyxelSession(host="host", user="user", prompt_pattern=r"^core-sw#\s*$")
+    assert session.prompt is not None
+    assert session.prompt.search("core-sw# ")
+
+
+def test_execute_command_raises_when_shell_hits_eof_before_output():
+    shell = FakeShell(initial_chunks=[b"GS1900# "])
+    session = ZyxelSession(
+        host="host", user="user", password="pass", pager_command=None, timeout=5.0
+    )
+    session.client = FakeClient(shell)  # type: ignore[assignment]
+    session.open_shell()
+
+    shell._remote.close()
+    try:
+        session._run_on_shell(shell, "show version")  # type: ignore[arg-type]
+    except OSError as err:
+        assert "closed" in str(err)
+    else:
+        raise AssertionError("expected OSError")
+
+
+MAC_ROWS = "".join(
+    f"    1 | 00:00:00:00:00:{i:02X} |      Dynamic      | 1 \r\n" for i in range(40)
+)
+
+
+def _switch_session(switch, **kwargs):
+    session = ZyxelSession(host="host", user="user", password="pass", timeout=5.0, **kwargs)
+    session.client = FakeSwitchClient(switch)  # type: ignore[assignment]
+    return session
+
+
+def test_pager_disabled_once_per_shell():
+    switch = FakeSwitch({"show mac address-table": MAC_ROWS}, page_lines=10)
+    session = _switch_session(switch)
+
+    out = session.execute_command(command="show mac address-table")
+    session.execute_command(command="show mac address-table")
+
+    assert session.pager_disabled is True
+    assert switch.received.count("terminal length 0") == 1
+    assert out.count("Dynamic") == 40
+    channel = session.shell
+    assert isinstance(channel, FakeChannel)
+    assert b" " not in channel.sent
+
+
+def test_pager_fallback_answers_more_prompts():
+    switch = FakeSwitch({"show mac address-table": MAC_ROWS}, page_lines=10, pager_command=None)
+    session = _switch_session(switch)
+
+    out = session.execute_command(command="show mac address-table")
+
+    assert session.pager_disabled is False
+    assert out.count("Dynamic") == 40
+    assert "--More--" not in out
+    assert "\b" not in out
+    channel = session.shell
+    assert isinstance(channel, FakeChannel)
+    assert channel.sent.count(b" ") == 3
+
+
+def test_pager_marker_split_across_reads():
+    # First page fills a whole read buffer so the marker straddles two reads
+    page = "x" * 4090 + "\r\n"
+    switch = FakeSwitch(
+        {"show tech-support": page + "tail line\r\n"}, page_lines=1, pager_command=None
+    )
+    session = _switch_session(switch)
+
+    started = time.monotonic()
+    out = session.execute_command(command="show tech-support")
+
+    assert "tail line" in out
+    assert "--More--" not in out
+    assert time.monotonic() - started < 1.0
+
+
+def test_execute_many_matches_execute_command():
+    switch = FakeSwitch(
+        {
+            "show version": "Firmware Version : V2.50\r\n",
+            "show interface 1": "GigabitEthernet1 is up\r\n",
+            "show interface 10": "GigabitEthernet10 is down\r\n",
+            "show mac address-table": MAC_ROWS,
+        }
+    )
+    commands = ["show interface 10", "show interface 1", "show mac address-table", "show version"]
+
+    single = _switch_session(switch)
+    expected = [single.execute_command(command=command) for command in commands]
+
+    batched = _switch_session(switch)
+    outputs = batched.execute_many(commands)
+
+    assert outputs == expected
+    assert "GigabitEthernet10" in outputs[0]
+    assert "GigabitEthernet1 is up" in outputs[1]
+    # Everything went out in a single write
+    channel = batched.shell
+    assert isinstance(channel, FakeChannel)
+    assert channel.sent[-1] == "".join(f"{c}\n" for c in commands).encode()
+
+
+def test_execute_many_empty_batch():
+    session = _switch_session(FakeSwitch())
+    assert session.execute_many([]) == []
+
+
+def test_execute_parallel_over_one_transport():
+    responses = {f"show interface {i}": f"GigabitEthernet{i} is up\r\n" for i in range(1, 17)}
+    switch = FakeSwitch(responses, delay=0.05)
+    server = FakeSSHServer(switch)
+    commands = list(responses)
+    try:
+        with ZyxelSession("127.0.0.1", "admin", password="secret", port=server.port) as session:
+            started = time.monotonic()
+            expected = session.execute_many(commands)
+            sequential = time.monotonic() - started
+
+            started = time.monotonic()
+            outputs = session.execute_parallel(commands, channels=4)
+            parallel = time.monotonic() - started
+
+            assert len(session.extra_shells) == 3
+    finally:
+        server.close()
+
+    assert outputs == expected
+    assert "GigabitEthernet16 is up" in outputs[-1]
+    # All channels shared the one handshake
+    assert server.connections == 1
+    assert parallel < sequential * 0.6
+
+
+def test_execute_parallel_caps_channels():
+    switch = FakeSwitch({"show version": "Firmware Version : V2.50\r\n"})
+    session = _switch_session(switch)
+
+    assert (
+        session.execute_parallel(["show version"] * 10, channels=50)
+        == [session.execute_command(command="show version")] * 10
+    )
+    assert len(session.extra_shells) == ZYXEL_MAX_CHANNELS - 1
+
+
+def test_prompt_reader_keeps_multibyte_characters_split_across_reads():
+    data = "show system-name\r\nSystem Name : Kontor-Växel\r\nGS1900# ".encode()
+    split = data.index("ä".encode()) + 1
+    reader = PromptReader(DEFAULT_PROMPT, echoes=["show system-name"])
+
+    reader.feed(data[:split])
+    reader.feed(data[split:])
+
+    assert reader.done
+    output, prompt_line = reader.result()
+    assert "Kontor-Växel" in output
+    assert prompt_line == "GS1900# "
+
+
+def test_prompt_reader_large_output_is_linear():
+    line = b"interface GigabitEthernet1\r\n"
+    data = b"show running-config\r\n" + line * 200_000 + b"GS1900# "
+    reader = PromptReader(DEFAULT_PROMPT, echoes=["show running-config"])
+
+    started = time.monotonic()
+    for pos in range(0, len(data), 4096):
+        reader.feed(data[pos : pos + 4096])
+    output, _ = reader.result()
+
+    assert reader.done
+    assert output.count("GigabitEthernet1") == 200_000
+    # About 5.6 MB; quadratic concatenation takes far longer than this
+    assert time.monotonic() - started < 2.0
+
+
+def test_iter_command_matches_execute_command():
+    switch = FakeSwitch({"show mac address-table": MAC_ROWS}, page_lines=10, pager_command=None)
+    session = _switch_session(switch)
+
+    lines = list(session.iter_command("show mac address-table"))
+
+    assert "\n".join(lines) == session.execute_command(command="show mac address-table")
+    assert not any("--More--" in line for line in lines)
+
+
+def test_iter_command_retries_when_the_send_fails():
+    dead = FakeShell()
+
+    def send(data):
+        raise OSError("Socket is closed")
+
+    dead.send = send  # type: ignore[method-assign]
+    fresh = FakeShell(
+        initial_chunks=[b"GS1900# "], response_chunks=[b"show version\r\nV2.50\r\nGS1900# "]
+    )
+    session = ZyxelSession(host="h", user="u", password="p", timeout=5.0, pager_command=None)
+    session.client = FakeClient(fresh)  # type: ignore[assignment]
+    session.shell = dead  # type: ignore[assignment]
+    session.prompt = DEFAULT_PROMPT
+
+    assert "V2.50" in list(session.iter_command("show version"))
+    assert dead.closed
+    assert session.shell is fresh
+    session.close()
+
+
+def test_iter_command_yields_before_prompt_arrives():
+    shell = FakeShell(initial_chunks=[b"show running-config\r\nhostname GS1900\r\n"])
+    session = ZyxelSession(host="h", user="u", password="p", timeout=5.0, pager_command=None)
+    session.client = object()  # type: ignore[assignment]
+    session.shell = shell  # type: ignore[assignment]
+    session.prompt = DEFAULT_PROMPT
+
+    lines = session.iter_command("show running-config")
+    assert next(lines) == "show running-config"
+    assert next(lines) == "hostname GS1900"
+
+    # Abandoning the command mid-output retires the shell
+    lines.close()
+    assert shell.closed
+    assert session.shell is None
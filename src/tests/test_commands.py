@@ -1,22 +1,44 @@
 import argparse
+import json
+import os
+import tempfile
 from io import StringIO
 from unittest.mock import patch
 
 from zyxel_cli import commands
+from zyxel_cli.port_cache import PortCountCache
 
 
 class FakeSession:
+    host = "1.2.3.4"
+    port = 22
+
     def __init__(self):
         self.executed = []
         self.interactive_called = False
         self.next_output: str | None = None
 
+    def connect(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
     def execute_command(self, *, command: str):
         self.executed.append(command)
         if self.next_output is not None:
             return self.next_output
         return f"OUT: {command}"
 
+    def iter_command(self, command: str):
+        yield from self.execute_command(command=command).split("\n")
+
+    def execute_many(self, commands):
+        return [self.execute_command(command=command) for command in commands]
+
+    def execute_parallel(self, commands, *, channels=2):
+        return self.execute_many(commands)
+
     def interactive(self):
         self.interactive_called = True
 
@@ -27,6 +49,22 @@ class FakeSession:
         return False
 
 
+VLAN_OUTPUT = (
+    "  VID  |  VLAN Name  |  Untagged Ports  |  Tagged Ports  |  Type\n"
+    "-------+-------------+------------------+----------------+---------\n"
+    "     1 |     default |     1-7,lag1-2   |       ---      | Default\n"
+    "    20 |     servers |        ---       |       8        | Static\n"
+)
+
+
+def interface_output(command: str, *, ports: int = 10) -> str:
+    """What a switch with interface IDs 1..ports answers to 'show interface <id>'"""
+    port = int(command.split()[-1])
+    if port > ports:
+        return "Invalid port id"
+    return f"GigabitEthernet{port} is up"
+
+
 def make_args(cmd: str, **extra) -> argparse.Namespace:
     ns = argparse.Namespace()
     ns.host = extra.get("host", "1.2.3.4")
@@ -37,6 +75,23 @@ def make_args(cmd: str, **extra) -> argparse.Namespace:
     ns.exec_command = extra.get("exec_command", "")
     ns.debug = extra.get("debug", False)
     ns.output_json = extra.get("output_json", False)
+    ns.prompt_pattern = extra.get("prompt_pattern", None)
+    ns.channels = extra.get("channels", 1)
+    ns.refresh_ports = extra.get("refresh_ports", False)
+    ns.bulk = extra.get("bulk", False)
+    ns.rates = extra.get("rates", False)
+    ns.link_speed = extra.get("link_speed", None)
+    ns.record = extra.get("record", False)
+    ns.index = extra.get("index", False)
+    ns.diff = extra.get("diff", False)
+    ns.compact = extra.get("compact", False)
+    ns.hosts = extra.get("hosts", None)
+    ns.inventory = extra.get("inventory", None)
+    ns.workers = extra.get("workers", 16)
+    ns.host_timeout = extra.get("host_timeout", 120.0)
+    ns.no_broker = extra.get("no_broker", True)
+    ns.no_cache = extra.get("no_cache", True)
+    ns.max_age = extra.get("max_age", None)
     return ns
 
 
@@ -47,25 +102,32 @@ def test_create_parser_contains_subcommands():
     assert args.command == "version"
 
 
-def test_handle_args_exec_calls_execute_and_returns_output():
+def test_handle_args_exec_streams_output():
     fake = FakeSession()
+    stdout = StringIO()
     with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
         with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
-            args = make_args("exec", exec_command="show ip interface")
-            out = commands.handle_args(args=args)
+            with patch("sys.stdout", new=stdout):
+                args = make_args("exec", exec_command="show ip interface")
+                out = commands.handle_args(args=args)
 
-    assert out == "OUT: show ip interface"
+    assert out is None
+    assert stdout.getvalue() == "OUT: show ip interface\n"
     assert "show ip interface" in fake.executed
 
 
 def test_handle_args_mapped_command():
     fake = FakeSession()
+    fake.next_output = "line 1\nline 2"
+    stdout = StringIO()
     with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
         with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
-            args = make_args("version")
-            out = commands.handle_args(args=args)
+            with patch("sys.stdout", new=stdout):
+                args = make_args("version")
+                out = commands.handle_args(args=args)
 
-    assert out == "OUT: show version"
+    assert out is None
+    assert stdout.getvalue() == "line 1\nline 2\n"
     assert fake.executed == ["show version"]
 
 
@@ -104,6 +166,9 @@ def test_handle_args_interfaces_iterates_through_ports():
     executed_commands = []
 
     class CustomFakeSession:
+        host = "1.2.3.4"
+        port = 22
+
         def __init__(self):
             self.executed = []
 
@@ -118,6 +183,9 @@ def test_handle_args_interfaces_iterates_through_ports():
             else:
                 return "Invalid port id"
 
+        def execute_many(self, commands):
+            return [self.execute_command(command=command) for command in commands]
+
         def __enter__(self):
             return self
 
@@ -145,3 +213,349 @@ def test_handle_args_interfaces_iterates_through_ports():
     captured = stdout.getvalue()
     assert "Interface 1" in captured
     assert "Interface 2" in captured
+
+
+def test_run_command_interfaces_uses_parallel_channels():
+    calls = []
+
+    class ParallelFakeSession(FakeSession):
+        host = "parallel.example"
+
+        def execute_command(self, *, command):
+            # No port list in the output: fall back to probing
+            return "% Unrecognized command"
+
+        def execute_parallel(self, commands, *, channels=2):
+            calls.append((len(commands), channels))
+            return [
+                "Invalid port id" if int(c.split()[-1]) > 20 else f"GigabitEthernet{c.split()[-1]}"
+                for c in commands
+            ]
+
+    out, _ = commands.run_command(
+        ParallelFakeSession(), make_args("interfaces", channels=4, refresh_ports=True)
+    )
+
+    assert calls == [(32, 4)]
+    assert "GigabitEthernet20" in out
+    assert "Interface 21" not in out
+
+
+def test_run_command_interfaces_discovers_and_caches_port_count():
+    class VlanFakeSession(FakeSession):
+        host = "ports.example"
+        ports = 10
+
+        def execute_command(self, *, command):
+            self.executed.append(command)
+            if command == "show vlan":
+                return VLAN_OUTPUT
+            return interface_output(command, ports=self.ports)
+
+    first = VlanFakeSession()
+    out, _ = commands.run_command(first, make_args("interfaces", refresh_ports=True))
+
+    # One discovery command, then the ports 1-8 and lag1-2 plus one to confirm the count
+    assert first.executed[0] == "show vlan"
+    assert first.executed[1:] == [f"show interface {i}" for i in range(1, 12)]
+    assert "Interface 10" in out
+
+    second = VlanFakeSession()
+    commands.run_command(second, make_args("interfaces"))
+    assert "show vlan" not in second.executed
+    assert len(second.executed) == 11
+
+    # Two more ports in no VLAN: the sweep goes on past the derived count
+    third = VlanFakeSession()
+    third.ports = 12
+    out, _ = commands.run_command(third, make_args("interfaces", refresh_ports=True))
+    assert "Interface 12" in out
+    assert "Interface 13" not in out
+
+    fourth = VlanFakeSession()
+    fourth.ports = 12
+    commands.run_command(fourth, make_args("interfaces"))
+    assert fourth.executed == [f"show interface {i}" for i in range(1, 14)]
+
+
+def test_run_command_interfaces_bulk_and_fallback():
+    class BulkFakeSession(FakeSession):
+        host = "bulk.example"
+        bulk_supported = True
+
+        def execute_command(self, *, command: str) -> str:
+            self.executed.append(command)
+            if command == "show interfaces":
+                if not self.bulk_supported:
+                    return "% Invalid command"
+                return "GigabitEthernet1 is up\r\n  flow-control is off\r\nLAG1 is down\r\n"
+            if command == "show vlan":
+                return VLAN_OUTPUT
+            return interface_output(command)
+
+    session = BulkFakeSession()
+    _, result = commands.run_command(session, make_args("interfaces", bulk=True, output_json=True))
+
+    assert session.executed == ["show interfaces"]
+    assert [entry["port_id"] for entry in result["interfaces"]] == [1, 2]
+    assert result["interfaces"][1]["parsed"] == {"name": "LAG1", "status": "down"}
+    assert set(result["interfaces"][0]) == {"port_id", "parsed", "raw_output"}
+
+    fallback = BulkFakeSession()
+    fallback.bulk_supported = False
+    _, result = commands.run_command(
+        fallback, make_args("interfaces", bulk=True, output_json=True, refresh_ports=True)
+    )
+
+    assert fallback.executed[:2] == ["show interfaces", "show vlan"]
+    assert len(result["interfaces"]) == 10
+
+
+def test_mac_table_index_and_lookup():
+    fake = FakeSession()
+    fake.host = "10.0.0.7"
+    fake.next_output = "   20 | 22:33:44:55:66:77 |      Dynamic      | 5\n"
+    stdout = StringIO()
+    with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
+        with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+            with patch("sys.stdout", new=stdout):
+                commands.handle_args(args=make_args("mac-table", index=True))
+
+                args = make_args("mac-lookup", output_json=True)
+                args.mac, args.vlan, args.switch_port = "22:33:44:55:66:77", None, None
+                stdout.truncate(0)
+                stdout.seek(0)
+                commands.handle_args(args=args)
+
+    (location,) = json.loads(stdout.getvalue())
+    assert location["host"] == "10.0.0.7"
+    assert location["ssh_port"] == 22
+    assert location["port"] == "5"
+    assert location["vid"] == 20
+    # The lookup itself never connects
+    assert fake.executed == ["show mac address-table"]
+
+    args.mac = "22:33:44:55:66"
+    try:
+        commands.mac_lookup(args)
+    except ValueError as err:
+        assert str(err) == "Invalid MAC address: '22:33:44:55:66'"
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_make_session_bypasses_result_cache_when_indexing():
+    fake = FakeSession()
+    with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
+        args = make_args("mac-table", index=True, no_cache=False, max_age=60.0)
+        session = commands.make_session(args=args, host="sw1", user="admin", password="pw", port=22)
+        assert session is fake
+
+        args = make_args("mac-table", no_cache=False, max_age=60.0)
+        session = commands.make_session(args=args, host="sw1", user="admin", password="pw", port=22)
+        assert isinstance(session, commands.CachedSession)
+
+
+def test_mac_table_diff_against_index():
+    fake = FakeSession()
+    fake.host = "10.0.0.8"
+    row = "{vid:>5} | {mac} |      Dynamic      | {port}\n"
+    fake.next_output = row.format(vid=1, mac="11:22:33:44:55:66", port=1) + row.format(
+        vid=1, mac="22:33:44:55:66:77", port=2
+    )
+    stdout = StringIO()
+    with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
+        with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+            with patch("sys.stdout", new=stdout):
+                commands.handle_args(args=make_args("mac-table", diff=True))
+
+                fake.next_output = row.format(vid=1, mac="11:22:33:44:55:66", port=7)
+                fake.next_output += row.format(vid=1, mac="33:44:55:66:77:88", port=3)
+                stdout.truncate(0)
+                stdout.seek(0)
+                commands.handle_args(args=make_args("mac-table", diff=True, output_json=True))
+
+    diff = json.loads(stdout.getvalue())
+    assert [r["mac"] for r in diff["added"]] == ["33:44:55:66:77:88"]
+    assert [r["mac"] for r in diff["removed"]] == ["22:33:44:55:66:77"]
+    assert diff["moved"] == [
+        {
+            "vid": "1",
+            "mac": "11:22:33:44:55:66",
+            "type": "Dynamic",
+            "port": "7",
+            "from_vid": "1",
+            "from_port": "1",
+        }
+    ]
+
+
+def test_vlans_compact_json():
+    fake = FakeSession()
+    fake.next_output = VLAN_OUTPUT
+    stdout = StringIO()
+    with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
+        with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+            with patch("sys.stdout", new=stdout):
+                commands.handle_args(args=make_args("vlans", output_json=True, compact=True))
+
+    vlans = json.loads(stdout.getvalue())
+    assert vlans[0]["untagged_ports"] == "1-7,lag1-2"
+    assert vlans[0]["tagged_ports"] == "---"
+    assert vlans[1]["tagged_ports"] == "8"
+
+
+class CounterFakeSession(FakeSession):
+    """A two-port switch whose port 1 has received `packets` packets"""
+
+    packets = 1000
+
+    def execute_command(self, *, command: str) -> str:
+        if command == "show vlan":
+            return VLAN_OUTPUT.replace("1-7,lag1-2", "1-2")
+        port = command.split()[-1]
+        if int(port) > 2:
+            return "Invalid port id"
+        packets = self.packets if port == "1" else 0
+        return (
+            f"GigabitEthernet{port} is up\n"
+            f"     {packets} packets input, {packets * 100} bytes, 0 throttles\n"
+        )
+
+
+def test_run_command_interfaces_rates():
+    session = CounterFakeSession()
+    session.host = "rates.example"
+    args = make_args("interfaces", rates=True, output_json=True, refresh_ports=True)
+    with patch("time.time", return_value=1000.0):
+        _, result = commands.run_command(session, args)
+    assert result == {"rates": []}
+
+    session.packets = 1600
+    with patch("time.time", return_value=1060.0):
+        out, result = commands.run_command(session, args)
+
+    (rates,) = result["rates"]
+    assert rates["interface"] == "1"
+    assert rates["deltas"] == {"packets_input": 600, "bytes_input": 60000}
+    assert rates["rates"]["packets_input"] == 10.0
+    assert out == "Interface 1: packets_input 10.0/s, bytes_input 1000.0/s"
+
+
+def test_interfaces_record_and_history():
+    session = CounterFakeSession()
+    args = make_args("interfaces", record=True, refresh_ports=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.dict(os.environ, {"ZYXEL_CACHE_DIR": tmp}):
+            try:
+                commands.counter_history(make_history_args())
+            except ValueError as err:
+                assert "No history recorded" in str(err)
+            else:
+                raise AssertionError("expected ValueError before any --record")
+
+            commands.run_command(session, args)
+            session.packets = 1600
+            commands.run_command(session, args)
+
+            output, rows = commands.counter_history(make_history_args(interface=1))
+            (row,) = rows
+            assert row["port"] == 1
+            assert row["deltas"] == {"bytes_input": 60000, "packets_input": 600}
+            assert "interface 1  bytes_input=60000  packets_input=600" in output
+
+            try:
+                commands.counter_history(make_history_args(counters="nonsense"))
+            except ValueError as err:
+                assert "Unknown counters: nonsense" in str(err)
+            else:
+                raise AssertionError("expected ValueError for an unknown counter")
+
+
+def make_history_args(**extra) -> argparse.Namespace:
+    args = make_args("history")
+    args.interface = extra.get("interface", None)
+    args.since = extra.get("since", "1d")
+    args.until = extra.get("until", None)
+    args.step = extra.get("step", None)
+    args.counters = extra.get("counters", "bytes_input,packets_input")
+    return args
+
+
+def test_handle_args_watch_streams_ndjson():
+    class WatchFakeSession(FakeSession):
+        sessions = 0
+
+        def connect(self):
+            WatchFakeSession.sessions += 1
+
+        def close(self):
+            pass
+
+    fake = WatchFakeSession()
+    fake.next_output = "Firmware Version : V2.70"
+    stdout = StringIO()
+    args = make_args("watch", no_cache=False)
+    args.target, args.interval, args.count = "version", 0.01, 3
+    with patch.object(commands, "ZyxelSession", new=lambda *a, **k: fake):
+        with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+            with patch("sys.stdout", new=stdout):
+                assert commands.handle_args(args=args) is None
+
+    records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert len(records) == 3
+    assert records[0]["host"] == "1.2.3.4"
+    assert records[0]["command"] == "version"
+    assert records[2]["result"] == {"Firmware Version": "V2.70"}
+    # One session for all polls, and every poll reached the switch
+    assert WatchFakeSession.sessions == 1
+    assert fake.executed == ["show version"] * 3
+
+
+def test_collect_metrics_sample():
+    class MetricsFakeSession(FakeSession):
+        host = "metrics.example"
+
+        def execute_command(self, *, command: str) -> str:
+            self.executed.append(command)
+            if command == "show vlan":
+                return VLAN_OUTPUT
+            if command == "show mac address-table":
+                return "    1 | 11:22:33:44:55:66 |      Dynamic      | 1\n"
+            return interface_output(command)
+
+    sample = commands.collect_metrics(MetricsFakeSession(), make_args("serve-metrics"))
+
+    assert sorted(sample.interfaces) == list(range(1, 11))
+    assert sample.interfaces[3]["status"] == "up"
+    assert sample.mac_entries == 1
+    assert sample.vlans == 2
+
+
+def test_collect_metrics_keeps_port_counts_per_ssh_port():
+    class NattedFakeSession(FakeSession):
+        host = "nat.example"
+
+        def __init__(self, port: int, ports: int):
+            super().__init__()
+            self.port = port
+            self.ports = ports
+
+        def execute_command(self, *, command: str) -> str:
+            if command == "show vlan":
+                return VLAN_OUTPUT
+            if command == "show mac address-table":
+                return ""
+            return interface_output(command, ports=self.ports)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.dict(os.environ, {"ZYXEL_CACHE_DIR": tmp}):
+            args = make_args("serve-metrics")
+            for _ in range(2):
+                small = commands.collect_metrics(NattedFakeSession(2201, 10), args)
+                large = commands.collect_metrics(NattedFakeSession(2202, 12), args)
+                assert (len(small.interfaces), len(large.interfaces)) == (10, 12)
+
+            cache = PortCountCache()
+            assert cache.get("nat.example", 2201) == 10
+            assert cache.get("nat.example", 2202) == 12
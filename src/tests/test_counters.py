@@ -0,0 +1,107 @@
+"""Tests for the counter delta and rate engine."""
+
+import json
+import tempfile
+from pathlib import Path
+
+from zyxel_cli.counters import RateEngine, counter_delta, max_counter_increase
+
+
+def test_counter_delta_wraps_and_resets():
+    assert counter_delta(100, 250) == 150
+    # bytes_input near 2^32 wrapping past the top
+    assert counter_delta(4294967000, 704) == 1000
+    # A big drop is a reset, not a wrap
+    assert counter_delta(1000000000, 10) is None
+    assert counter_delta(2**40, 5) is None
+    assert counter_delta(250, 100, width=8) == 106
+    # A configured limit allows wraps past half the range
+    assert counter_delta(1000000000, 10, max_increase=2**32) == 3294967306
+    assert counter_delta(4294967000, 704, max_increase=999) is None
+
+
+def test_link_speed_accepts_wraps_a_busy_port_can_cause():
+    # 1 Gb/s moves 7.5 GB in a minute: far more than half of 2^32 bytes
+    assert max_counter_increase("bytes_input", 1e9, 60.0) == 7500000000
+    assert max_counter_increase("packets_input", 1e9, 60.0) == 89285714
+
+    # 400 Mb/s for 60 s wraps bytes_input from 2e9 to 2e9 + 3e9 - 2^32
+    counters = {1: {"bytes_input": 2000000000}}
+    wrapped = {1: {"bytes_input": 705032704}}
+    engine = RateEngine()
+    engine.update("sw1", counters, now=0.0)
+    (rates,) = engine.update("sw1", wrapped, now=60.0)
+    assert rates.reset == ["bytes_input"]
+
+    engine = RateEngine(link_speed=1e9)
+    engine.update("sw1", counters, now=0.0)
+    (rates,) = engine.update("sw1", wrapped, now=60.0)
+    assert rates.deltas == {"bytes_input": 3000000000}
+    assert rates.reset == []
+    # A drop the link could not have carried in the interval is still a reset
+    engine.update("sw1", counters, now=100.0)
+    (rates,) = engine.update("sw1", wrapped, now=101.0)
+    assert rates.reset == ["bytes_input"]
+
+
+def test_rate_engine_emits_only_changes():
+    engine = RateEngine()
+    assert engine.update("sw1", {1: {"bytes_input": 4294967000, "crc_errors": 0}}, now=100.0) == []
+
+    changed = engine.update(
+        "sw1",
+        {
+            1: {"bytes_input": 704, "crc_errors": 0},
+            2: {"bytes_input": 5},
+        },
+        now=110.0,
+    )
+
+    (rates,) = changed
+    assert rates.interface == "1"
+    assert rates.interval == 10.0
+    assert rates.deltas == {"bytes_input": 1000}
+    assert rates.rates == {"bytes_input": 100.0}
+    assert rates.reset == []
+
+    # Unchanged counters produce nothing; a reset is reported
+    assert engine.update("sw1", {2: {"bytes_input": 5}}, now=120.0) == []
+    (rates,) = engine.update("sw1", {1: {"bytes_input": 3, "crc_errors": 0}}, now=120.0)
+    assert rates.reset == ["bytes_input"]
+    assert rates.deltas == {}
+
+
+def test_rate_engine_state_survives_restarts():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "counters.json"
+        engine = RateEngine(path)
+        engine.update("sw1", {"1": {"packets_output": 10}}, now=0.0)
+        engine.save()
+
+        (rates,) = RateEngine(path).update("sw1", {"1": {"packets_output": 70}}, now=30.0)
+        assert rates.to_dict()["rates"] == {"packets_output": 2.0}
+
+
+def test_rate_engine_skips_malformed_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "counters.json"
+        path.write_text(
+            json.dumps(
+                [
+                    {"host": "sw1", "interface": "1", "time": 0.0, "counters": {"crc_errors": 1}},
+                    {"host": "sw1", "interface": "2", "time": 0.0},
+                    {"host": "sw1", "interface": "3", "time": "x", "counters": {}},
+                    {"host": "sw1", "interface": "4", "time": 0.0, "counters": [1]},
+                    {"host": "sw1", "interface": "5", "time": 0.0, "counters": {"a": "b"}},
+                    "sw1",
+                ]
+            )
+        )
+        engine = RateEngine(path)
+        (rates,) = engine.update(
+            "sw1", {str(port): {"crc_errors": 3} for port in range(1, 6)}, now=10.0
+        )
+        assert (rates.interface, rates.deltas) == ("1", {"crc_errors": 2})
+
+        engine.save()
+        assert len(json.loads(path.read_text())) == 5
@@ -0,0 +1,157 @@
+"""Tests for fleet mode."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from zyxel_cli import commands
+from zyxel_cli.fleet import Target, load_inventory, parse_target, run_fleet
+from zyxel_cli.mac_index import MacIndex
+
+from .test_commands import make_args
+
+
+class FakeSession:
+    def __init__(self, host, *, port=22, fail=False, block=False):
+        self.host = host
+        self.port = port
+        self.fail = fail
+        self.block = block
+        self.closed = threading.Event()
+
+    def connect(self):
+        if self.fail:
+            raise ConnectionError(f"Failed to connect to {self.host}: refused")
+
+    def execute_command(self, *, command):
+        if self.block:
+            self.closed.wait(5)
+            raise OSError("Socket is closed")
+        return f"{self.host}: {command}"
+
+    def iter_command(self, command: str) -> Iterator[str]:
+        yield from self.execute_command(command=command).split("\n")
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]:
+        return [self.execute_command(command=command) for command in commands]
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]:
+        return self.execute_many(commands)
+
+    def close(self):
+        self.closed.set()
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        self.close()
+
+
+def test_parse_target():
+    assert parse_target("10.0.0.1") == Target("10.0.0.1", 22)
+    assert parse_target("admin@sw1:2222") == Target("sw1", 2222, "admin")
+    assert parse_target("sw2", default_port=2200) == Target("sw2", 2200)
+
+
+def test_load_inventory_skips_comments_and_blanks():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "switches.txt"
+        path.write_text("# core\nsw1\n\nsw2:2222  # lab\nops@sw3\n")
+        targets = load_inventory(path)
+
+    assert targets == [Target("sw1"), Target("sw2", 2222), Target("sw3", 22, "ops")]
+
+
+def test_run_fleet_isolates_failures_and_times_out_stuck_hosts():
+    sessions = {
+        "ok": FakeSession("ok"),
+        "bad": FakeSession("bad", fail=True),
+        "stuck": FakeSession("stuck", block=True),
+    }
+
+    started = time.monotonic()
+    results = list(
+        run_fleet(
+            [Target(host) for host in sessions],
+            lambda target: sessions[target.host],
+            lambda session: session.execute_command(command="show version"),
+            workers=3,
+            host_timeout=0.3,
+        )
+    )
+
+    by_host = {result.target.host: result for result in results}
+    assert by_host["ok"].ok and by_host["ok"].value == "ok: show version"
+    assert "refused" in (by_host["bad"].error or "")
+    assert "Timed out" in (by_host["stuck"].error or "")
+    # The stuck host's session was closed to unblock its worker
+    assert sessions["stuck"].closed.is_set()
+    assert time.monotonic() - started < 3
+    # Results arrive in completion order: the stuck host comes last
+    assert results[-1].target.host == "stuck"
+
+
+def test_handle_args_fleet_emits_ndjson_per_host():
+    stdout = StringIO()
+
+    def fake_session(*a, **k):
+        return FakeSession(k["host"], fail=k["host"] == "sw2")
+
+    with patch.object(commands, "ZyxelSession", new=fake_session):
+        with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+            with patch("sys.stdout", new=stdout):
+                args = make_args("version", host=None, hosts="sw1,sw2", output_json=True)
+                try:
+                    commands.handle_args(args=args)
+                except RuntimeError as err:
+                    assert "1 of 2 hosts failed" in str(err)
+                else:
+                    raise AssertionError("expected RuntimeError")
+
+    records = {r["host"]: r for r in map(json.loads, stdout.getvalue().splitlines())}
+    assert records["sw1"]["ok"] is True
+    assert records["sw1"]["result"] == {"sw1": "show version"}
+    assert records["sw2"]["ok"] is False
+    assert "refused" in records["sw2"]["error"]
+
+
+def test_handle_args_requires_a_host():
+    args = make_args("version", host=None)
+    try:
+        commands.handle_args(args=args)
+    except ValueError as err:
+        assert "-H/--host" in str(err)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_fleet_keeps_switches_on_one_address_apart():
+    class MacFakeSession(FakeSession):
+        def execute_command(self, *, command):
+            return f"    1 | 00:00:00:00:00:{self.port % 100:02d} |      Dynamic      | 1\n"
+
+    def fake_session(*a, **k):
+        return MacFakeSession(k["host"], port=k["port"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.dict(os.environ, {"ZYXEL_CACHE_DIR": tmp}):
+            with patch.object(commands, "ZyxelSession", new=fake_session):
+                with patch.object(commands, "resolve_password", new=lambda *a, **k: "pw"):
+                    with patch("sys.stdout", new=StringIO()):
+                        args = make_args(
+                            "mac-table", host=None, hosts="sw:2201,sw:2202", index=True
+                        )
+                        commands.handle_args(args=args)
+
+            with MacIndex() as mac_index:
+                for ssh_port in (2201, 2202):
+                    (entry,) = mac_index.host_entries("sw", ssh_port=ssh_port)
+                    assert entry["mac"] == f"00:00:00:00:00:{ssh_port % 100:02d}"
+                assert mac_index.host_entries("sw") == []
@@ -0,0 +1,159 @@
+"""Tests for the memory-mapped counter history."""
+
+import tempfile
+import threading
+from pathlib import Path
+
+from zyxel_cli.history import FLAG_RESET, CounterHistory, parse_duration
+
+COUNTERS = ("bytes_input", "bytes_output")
+
+
+def open_history(directory: str, **kwargs) -> CounterHistory:
+    return CounterHistory(Path(directory) / "sw1.ring", counters=COUNTERS, **kwargs)
+
+
+def test_append_records_deltas_after_baseline():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_history(tmp, records=16, ports=8) as history:
+            # The first sample of a port only sets its baseline
+            assert (
+                history.append({1: {"bytes_input": 4294967000, "bytes_output": 50}}, now=100) == 0
+            )
+            assert history.append({1: {"bytes_input": 704, "bytes_output": 80}}, now=400) == 1
+            # Dropped without a plausible wrap: the new value counts from zero
+            assert history.append({1: {"bytes_input": 900, "bytes_output": 5}}, now=700) == 1
+            # Ports outside the file's range are ignored
+            assert history.append({9: {"bytes_input": 1}}, now=700) == 0
+
+            first, second = history.query()
+            assert (first.time, first.port, first.flags) == (400, 1, 0)
+            assert first.deltas == {"bytes_input": 1000, "bytes_output": 30}
+            assert second.deltas == {"bytes_input": 196, "bytes_output": 5}
+            assert second.flags == FLAG_RESET
+
+        # Baselines and records survive reopening the file
+        with open_history(tmp, records=16, ports=8) as history:
+            assert history.append({1: {"bytes_input": 1000, "bytes_output": 5}}, now=1000) == 1
+            assert [record.time for record in history.query()] == [400, 700, 1000]
+
+
+def test_missing_counters_keep_their_baseline():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_history(tmp, records=16, ports=8) as history:
+            history.append({1: {"bytes_input": 1000, "bytes_output": 50}}, now=100)
+            # A port without statistics is skipped, not taken as a reset to 0
+            assert history.append({1: {}}, now=200) == 0
+            # A missing counter records no change and keeps its baseline
+            assert history.append({1: {"bytes_input": 1500}}, now=300) == 1
+            assert history.append({1: {"bytes_input": 1600, "bytes_output": 80}}, now=400) == 1
+
+            first, second = history.query()
+            assert (first.deltas, first.flags) == ({"bytes_input": 500, "bytes_output": 0}, 0)
+            assert (second.deltas, second.flags) == ({"bytes_input": 100, "bytes_output": 30}, 0)
+
+            # A counter first seen after the port's baseline only sets its own
+            history.append({2: {"bytes_input": 10}}, now=100)
+            history.append({2: {"bytes_input": 20, "bytes_output": 4000}}, now=200)
+            history.append({2: {"bytes_input": 30, "bytes_output": 4010}}, now=300)
+            assert [record.deltas for record in history.query(port=2)] == [
+                {"bytes_input": 10, "bytes_output": 0},
+                {"bytes_input": 10, "bytes_output": 10},
+            ]
+
+
+def test_ring_overwrites_oldest_and_queries_ranges():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_history(tmp, records=4, ports=4) as history:
+            for step in range(8):
+                history.append(
+                    {port: {"bytes_input": step * 10 * (port + 1)} for port in (0, 1)},
+                    now=step * 60,
+                )
+
+            records = list(history.query())
+            # 14 records written, only the newest 4 kept
+            assert [(record.time, record.port) for record in records] == [
+                (360, 0),
+                (360, 1),
+                (420, 0),
+                (420, 1),
+            ]
+            assert [record.time for record in history.query(start=400)] == [420, 420]
+            assert [record.time for record in history.query(end=400)] == [360, 360]
+            assert [record.deltas["bytes_input"] for record in history.query(port=1)] == [20, 20]
+
+
+def test_queries_see_whole_records_while_another_writer_appends():
+    with tempfile.TemporaryDirectory() as tmp:
+        open_history(tmp, records=8, ports=2).close()
+        done = threading.Event()
+
+        def write() -> None:
+            # A separate open file, as another process would have
+            with open_history(tmp) as writer:
+                for step in range(2000):
+                    writer.append({1: {"bytes_input": step * 10, "bytes_output": step}}, now=step)
+            done.set()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        with open_history(tmp) as reader:
+            while not done.is_set():
+                records = list(reader.query())
+                times = [record.time for record in records]
+                assert times == sorted(times)
+                for record in records:
+                    assert record.deltas == {"bytes_input": 10, "bytes_output": 1}
+        thread.join()
+
+
+def test_downsample_sums_per_bucket_and_port():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open_history(tmp, records=64, ports=4) as history:
+            for step in range(7):
+                history.append(
+                    {2: {"bytes_input": step * 100, "bytes_output": step}}, now=step * 300
+                )
+
+            buckets = history.downsample(900)
+            assert [(bucket.time, bucket.port) for bucket in buckets] == [
+                (0, 2),
+                (900, 2),
+                (1800, 2),
+            ]
+            assert [bucket.deltas["bytes_input"] for bucket in buckets] == [200, 300, 100]
+            assert history.downsample(900, start=900, end=1500)[0].deltas["bytes_output"] == 3
+
+
+def test_layout_mismatch_is_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        open_history(tmp, records=8, ports=4).close()
+        path = Path(tmp) / "sw1.ring"
+        try:
+            CounterHistory(path, counters=("bytes_input",))
+        except ValueError as err:
+            assert "not a counter history file" in str(err)
+        else:
+            raise AssertionError("expected ValueError for a different counter layout")
+
+        path.write_bytes(b"not a ring file")
+        try:
+            open_history(tmp)
+        except ValueError as err:
+            assert "not a counter history file" in str(err)
+        else:
+            raise AssertionError("expected ValueError for a foreign file")
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("15m") == 900
+    assert parse_duration("1.5h") == 5400
+    assert parse_duration(" 7D ") == 7 * 86400
+    try:
+        parse_duration("soon")
+    except ValueError as err:
+        assert "Invalid duration" in str(err)
+    else:
+        raise AssertionError("expected ValueError")
@@ -1,9 +1,17 @@
 """Tests for interface_utils module."""
 
+import json
+import re
+from pathlib import Path
+from typing import Any
+
 from zyxel_cli.interface_utils import (
     collect_all_interfaces,
+    collect_interfaces_bulk,
+    count_ports_from_vlans,
     is_invalid_port_response,
     parse_interface_output,
+    split_interface_blocks,
 )
 
 
@@ -260,3 +268,246 @@ def test_parse_interface_output_with_carriage_returns():
     assert result["name"] == "LAG5"
     assert result["status"] == "down"
     assert result["hardware"] == "Fast Ethernet"
+
+
+def test_collect_all_interfaces_batches_commands():
+    """Test that ports are requested in batches when execute_many_fn is given."""
+    batches = []
+
+    def mock_execute_many(commands: list[str]) -> list[str]:
+        batches.append(commands)
+        return [
+            f"GigabitEthernet{cmd.split()[-1]} is up"
+            if int(cmd.split()[-1]) <= 5
+            else "Invalid port id"
+            for cmd in commands
+        ]
+
+    def mock_execute(cmd: str) -> str:
+        raise AssertionError("single commands should not be used")
+
+    result = collect_all_interfaces(mock_execute, execute_many_fn=mock_execute_many, batch_size=3)
+
+    assert [port_id for port_id, _ in result] == [1, 2, 3, 4, 5]
+    assert result[4] == (5, "GigabitEthernet5 is up")
+    assert batches == [
+        ["show interface 1", "show interface 2", "show interface 3"],
+        ["show interface 4", "show interface 5", "show interface 6"],
+    ]
+
+
+def test_count_ports_from_vlans_counts_front_ports_and_lags():
+    output = (
+        "  VID  |     VLAN Name    |  Untagged Ports  |  Tagged Ports  |  Type\n"
+        "-------+------------------+------------------+----------------+---------\n"
+        "     1 |          default |    1-24,lag1-8   |       ---      | Default\n"
+        "     2 |          fooobaz |        ---       |       23       | Static\n"
+    )
+    assert count_ports_from_vlans(output) == 32
+    assert count_ports_from_vlans("% Invalid command") is None
+
+
+def test_collect_all_interfaces_with_known_port_count():
+    """A known port count sends exactly those commands in one batch."""
+    batches = []
+
+    def mock_execute_many(cmds):
+        batches.append(cmds)
+        return ["Invalid port id" if cmd.endswith(" 4") else f"out {cmd}" for cmd in cmds]
+
+    result = collect_all_interfaces(
+        lambda cmd: "unused", execute_many_fn=mock_execute_many, port_count=5
+    )
+
+    assert batches == [[f"show interface {i}" for i in range(1, 7)]]
+    # The count was too high: the result ends before the first invalid port
+    assert [pid for pid, _ in result] == [1, 2, 3]
+
+
+def test_collect_all_interfaces_probes_past_a_low_port_count():
+    """Ports beyond the known count (e.g. in no VLAN) are still collected."""
+    batches = []
+
+    def mock_execute_many(cmds):
+        batches.append(cmds)
+        return ["Invalid port id" if int(cmd.split()[-1]) > 10 else f"out {cmd}" for cmd in cmds]
+
+    result = collect_all_interfaces(
+        lambda cmd: "unused", execute_many_fn=mock_execute_many, batch_size=4, port_count=5
+    )
+
+    assert batches[0] == [f"show interface {i}" for i in range(1, 7)]
+    assert batches[1] == [f"show interface {i}" for i in range(7, 11)]
+    assert [pid for pid, _ in result] == list(range(1, 11))
+
+
+def _fixture_interface_output():
+    path = Path(__file__).parent / "data" / "intefaces_cmd.json"
+    interface = json.loads(path.read_text())["interfaces"][0]
+    # Drop the echoed "show interface 1" line
+    return interface["raw_output"].split("\n", 1)[1], interface["parsed"]
+
+
+def test_split_interface_blocks_matches_per_port_parsing():
+    block, parsed = _fixture_interface_output()
+    lag_block = "LAG8 is down\r\n  Hardware is EtherSVI\r\n  flow-control is off\r"
+    bulk = f"show interfaces\r\n{block}\n{block.replace('Ethernet1 ', 'Ethernet2 ')}\n{lag_block}\n"
+
+    blocks = split_interface_blocks(bulk)
+
+    assert len(blocks) == 3
+    assert parse_interface_output(blocks[0]) == parsed
+    assert parse_interface_output(blocks[1]) == {**parsed, "name": "GigabitEthernet2"}
+    assert parse_interface_output(blocks[2])["name"] == "LAG8"
+
+
+def test_collect_interfaces_bulk():
+    block, _ = _fixture_interface_output()
+    assert collect_interfaces_bulk(lambda cmd: f"{cmd}\r\n{block}") == [(1, block.rstrip("\n"))]
+    assert collect_interfaces_bulk(lambda cmd: "% Invalid command") is None
+
+
+def _regex_parse_interface_output(output: str) -> dict[str, Any]:
+    """The original parser: one re.search over the whole output per field"""
+    result: dict[str, Any] = {}
+
+    # Extract interface name and status from first line
+    # Example: "GigabitEthernet1 is up" or "LAG8 is down"
+    first_line_match = re.search(r"^(\S+)\s+is\s+(up|down)", output, re.MULTILINE)
+    if first_line_match:
+        result["name"] = first_line_match.group(1)
+        result["status"] = first_line_match.group(2)
+
+    # Extract hardware type
+    # Example: "  Hardware is Gigabit Ethernet"
+    hardware_match = re.search(r"Hardware is (.+?)$", output, re.MULTILINE)
+    if hardware_match:
+        result["hardware"] = hardware_match.group(1).strip()
+
+    # Extract duplex, speed, and media type
+    # Example: "  Auto-duplex, Auto-speed, media type is Copper"
+    config_match = re.search(r"([\w-]+)-duplex,\s*([\w-]+)-speed,\s*media type is (\w+)", output)
+    if config_match:
+        result["duplex"] = config_match.group(1)
+        result["speed"] = config_match.group(2)
+        result["media_type"] = config_match.group(3)
+
+    # Extract flow control
+    # Example: "  flow-control is off"
+    flow_match = re.search(r"flow-control is (\w+)", output)
+    if flow_match:
+        result["flow_control"] = flow_match.group(1)
+
+    # Extract statistics
+    stats: dict[str, int] = {}
+
+    # Input statistics
+    # Example: "     1059016090 packets input, 2902879441 bytes, 0 throttles"
+    input_match = re.search(r"(\d+) packets input, (\d+) bytes, (\d+) throttles", output)
+    if input_match:
+        stats["packets_input"] = int(input_match.group(1))
+        stats["bytes_input"] = int(input_match.group(2))
+        stats["throttles_input"] = int(input_match.group(3))
+
+    # Broadcasts and multicasts
+    # Example: "     Received 57937948 broadcasts (82930444 multicasts)"
+    bcast_match = re.search(r"Received (\d+) broadcasts \((\d+) multicasts\)", output)
+    if bcast_match:
+        stats["broadcasts"] = int(bcast_match.group(1))
+        stats["multicasts"] = int(bcast_match.group(2))
+
+    # Input errors
+    # Example: "     0 runts, 0 giants, 0 throttles"
+    runts_match = re.search(r"(\d+) runts, (\d+) giants", output)
+    if runts_match:
+        stats["runts"] = int(runts_match.group(1))
+        stats["giants"] = int(runts_match.group(2))
+
+    # More input errors
+    # Example: "     0 input errors, 0 CRC, 0 frame, 0 overrun, 0 ignored"
+    errors_match = re.search(
+        r"(\d+) input errors, (\d+) CRC, (\d+) frame, (\d+) overrun, (\d+) ignored",
+        output,
+    )
+    if errors_match:
+        stats["input_errors"] = int(errors_match.group(1))
+        stats["crc_errors"] = int(errors_match.group(2))
+        stats["frame_errors"] = int(errors_match.group(3))
+        stats["overrun_errors"] = int(errors_match.group(4))
+        stats["ignored_errors"] = int(errors_match.group(5))
+
+    # Multicast and pause input
+    # Example: "     82930444 multicast, 0 pause input"
+    multicast_match = re.search(r"(\d+) multicast, (\d+) pause input", output)
+    if multicast_match:
+        stats["multicast"] = int(multicast_match.group(1))
+        stats["pause_input"] = int(multicast_match.group(2))
+
+    # Dribble condition
+    # Example: "     0 input packets with dribble condition detected"
+    dribble_match = re.search(r"(\d+) input packets with dribble condition", output)
+    if dribble_match:
+        stats["dribble_packets"] = int(dribble_match.group(1))
+
+    # Output statistics
+    # Example: "     543385722 packets output, 2386478183 bytes, 0 underrun"
+    output_match = re.search(r"(\d+) packets output, (\d+) bytes, (\d+) underrun", output)
+    if output_match:
+        stats["packets_output"] = int(output_match.group(1))
+        stats["bytes_output"] = int(output_match.group(2))
+        stats["underrun"] = int(output_match.group(3))
+
+    # Output errors
+    # Example: "     0 output errors, 0 collisions, 0 interface resets"
+    output_errors_match = re.search(
+        r"(\d+) output errors, (\d+) collisions, (\d+) interface resets", output
+    )
+    if output_errors_match:
+        stats["output_errors"] = int(output_errors_match.group(1))
+        stats["collisions"] = int(output_errors_match.group(2))
+        stats["interface_resets"] = int(output_errors_match.group(3))
+
+    # More output errors
+    # Example: "     0 babbles, 0 late collision, 0 deferred"
+    babbles_match = re.search(r"(\d+) babbles, (\d+) late collision, (\d+) deferred", output)
+    if babbles_match:
+        stats["babbles"] = int(babbles_match.group(1))
+        stats["late_collisions"] = int(babbles_match.group(2))
+        stats["deferred"] = int(babbles_match.group(3))
+
+    # Pause output
+    # Example: "     0 PAUSE output"
+    pause_output_match = re.search(r"(\d+) PAUSE output", output)
+    if pause_output_match:
+        stats["pause_output"] = int(pause_output_match.group(1))
+
+    if stats:
+        result["statistics"] = stats
+
+    return result
+
+
+def test_parse_interface_output_matches_fixture_and_original_parser():
+    """The single-pass parser returns exactly what the per-field searches did."""
+    path = Path(__file__).parent / "data" / "intefaces_cmd.json"
+    interfaces = json.loads(path.read_text())["interfaces"]
+    raw = interfaces[0]["raw_output"]
+    lines = raw.split("\n")
+
+    variants = [
+        raw,
+        raw.replace("\r", ""),
+        raw.replace("GigabitEthernet1 is up", "LAG8 is down"),
+        # Missing, reordered and repeated lines
+        "\n".join(lines[:4] + lines[9:]),
+        "\n".join(reversed(lines)),
+        raw + raw.replace("1059113630", "1"),
+        "Invalid port id",
+        "",
+    ]
+    for interface in interfaces:
+        assert parse_interface_output(interface["raw_output"]) == interface["parsed"]
+    for variant in variants:
+        parsed = parse_interface_output(variant)
+        assert parsed == _regex_parse_interface_output(variant)
+        assert list(parsed) == list(_regex_parse_interface_output(variant))
@@ -0,0 +1,85 @@
+"""Tests for the local MAC index."""
+
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from zyxel_cli.mac_index import MacIndex
+from zyxel_cli.mac_table_utils import MacTable, parse_mac_table_output
+
+OUTPUT = """ VID  |    MAC Address    |       Type        |   Ports
+------+-------------------+-------------------+----------------
+    1 | AA:BB:CC:11:22:33 |    Management     | CPU
+    1 | 11:22:33:44:55:66 |      Dynamic      | 1
+   20 | 11:22:33:44:55:66 |      Dynamic      | 1
+   20 | 22:33:44:55:66:77 |      Static       | 5
+Total number of entries: 4"""
+
+
+def test_lookup_by_mac_port_and_vlan():
+    with tempfile.TemporaryDirectory() as tmp, MacIndex(Path(tmp) / "macs.db") as index:
+        assert index.replace_host("sw1", parse_mac_table_output(OUTPUT), seen=100.0) == 4
+        index.replace_host(
+            "sw2", [{"vid": "1", "mac": "22:33:44:55:66:77", "type": "Dynamic", "port": "24"}]
+        )
+
+        locations = index.lookup("22:33:44:55:66:77")
+        assert [(loc.host, loc.port, loc.vid) for loc in locations] == [
+            ("sw1", "5", 20),
+            ("sw2", "24", 1),
+        ]
+        assert locations[0].seen == 100.0
+        # Any common notation finds the same MAC
+        assert index.lookup("1122.3344.5566") == index.lookup("11-22-33-44-55-66")
+        assert [loc.vid for loc in index.lookup("11:22:33:44:55:66")] == [1, 20]
+
+        assert [loc.mac for loc in index.on_port("sw1", "1")] == ["11:22:33:44:55:66"] * 2
+        assert {loc.host for loc in index.in_vlan(1)} == {"sw1", "sw2"}
+
+
+def test_replace_host_drops_old_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "macs.db"
+        with MacIndex(path) as index:
+            index.replace_host("sw1", parse_mac_table_output(OUTPUT))
+            index.replace_host("sw1", MacTable.from_output(OUTPUT.replace("| 5", "| 6")))
+
+        # A new instance reads what the first one wrote
+        with MacIndex(path) as index:
+            assert len(index.in_vlan(20)) == 2
+            assert index.on_port("sw1", "5") == []
+            assert index.lookup("22:33:44:55:66:77")[0].to_dict()["port"] == "6"
+
+
+def test_switches_behind_one_host_stay_apart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "macs.db"
+        with MacIndex(path) as index:
+            index.replace_host("gw", parse_mac_table_output(OUTPUT), ssh_port=2201)
+            index.replace_host(
+                "gw", MacTable.from_output(OUTPUT.replace("| 5", "| 6")), ssh_port=2202
+            )
+
+            locations = index.lookup("22:33:44:55:66:77")
+            assert [(loc.switch, loc.port) for loc in locations] == [
+                ("gw:2201", "5"),
+                ("gw:2202", "6"),
+            ]
+            assert index.on_port("gw", "5", ssh_port=2202) == []
+            assert len(index.host_entries("gw", ssh_port=2201)) == 4
+            assert index.host_entries("gw") == []
+
+
+def test_old_index_layout_is_rebuilt():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "macs.db"
+        with sqlite3.connect(path) as db:
+            db.execute("CREATE TABLE macs (host TEXT, port TEXT, vid INTEGER, mac INTEGER)")
+            db.execute("INSERT INTO macs VALUES ('sw1', '1', 1, 1)")
+        db.close()
+
+        with MacIndex(path) as index:
+            assert index.in_vlan(1) == []
+            index.replace_host("sw1", parse_mac_table_output(OUTPUT))
+        with MacIndex(path) as index:
+            assert len(index.in_vlan(1)) == 2
@@ -1,6 +1,13 @@
 """Tests for mac_table_utils module."""
 
-from zyxel_cli.mac_table_utils import parse_mac_table_output
+from zyxel_cli.mac_table_utils import (
+    MacEntry,
+    MacTable,
+    diff_mac_tables,
+    int_to_mac,
+    mac_to_int,
+    parse_mac_table_output,
+)
 
 
 def test_parse_mac_table_output_with_entries():
@@ -170,3 +177,80 @@ GS1900# """
     }
     # Check an entry after --More-- prompt
     assert result[22]["mac"] == "11:22:33:44:55:16"
+
+
+def test_mac_table_columnar_matches_dicts():
+    """The columnar table holds the same rows as the dict parser."""
+    output = """ VID  |    MAC Address    |       Type        |   Ports        \r
+------+-------------------+-------------------+----------------\r
+    1 | AA:BB:CC:11:22:33 |    Management     | CPU\r
+    1 | 11:22:33:44:55:66 |      Dynamic      | 1 \r
+--More--\b\r
+   10 | 22:33:44:55:66:77 |      Static       | lag2 \r
+Total number of entries: 3\r"""
+
+    table = MacTable.from_output(output)
+
+    assert len(table) == 3
+    assert table.to_dicts() == parse_mac_table_output(output)
+    assert table[2] == MacEntry(vid=10, mac=0x223344556677, type="Static", port="lag2")
+    assert [entry.port for entry in table] == ["CPU", "1", "lag2"]
+    assert table[1:] == [table[1], table[2]]
+    assert table[-1].to_dict()["mac"] == "22:33:44:55:66:77"
+
+
+def test_mac_table_interns_types_and_ports():
+    """Repeated type and port values are stored once."""
+    lines = [f"    1 | 00:00:00:00:00:{i:02X} |      Dynamic      | {i % 2}" for i in range(100)]
+
+    table = MacTable.from_lines(iter(lines))
+
+    assert len(table) == 100
+    assert table.types == ["Dynamic"]
+    assert table.ports == ["0", "1"]
+    assert table.macs[99] == 99
+
+
+def test_mac_conversion():
+    """MACs convert to 48-bit integers and back."""
+    assert mac_to_int("aa:bb:cc:11:22:33") == 0xAABBCC112233
+    assert mac_to_int("aabb.cc11.2233") == 0xAABBCC112233
+    for invalid in ("aa:bb:cc", "zz:bb:cc:11:22:33", "aabbcc1122334"):
+        try:
+            mac_to_int(invalid)
+        except ValueError as err:
+            assert "Invalid MAC address" in str(err)
+        else:
+            raise AssertionError(f"expected ValueError for {invalid!r}")
+    assert int_to_mac(0xAABBCC112233) == "AA:BB:CC:11:22:33"
+
+
+def test_diff_mac_tables():
+    """Only added, removed and moved rows are reported."""
+
+    def row(vid, mac, port):
+        return {"vid": vid, "mac": mac, "type": "Dynamic", "port": port}
+
+    previous = [
+        row("1", "AA:BB:CC:11:22:33", "1"),
+        row("1", "11:22:33:44:55:66", "2"),
+        row("10", "22:33:44:55:66:77", "3"),
+        row("1", "33:44:55:66:77:88", "4"),
+    ]
+    current = [
+        row("1", "aa:bb:cc:11:22:33", "1"),  # unchanged, other case
+        row("1", "11:22:33:44:55:66", "5"),  # new port
+        row("20", "22:33:44:55:66:77", "3"),  # new VLAN
+        row("1", "44:55:66:77:88:99", "6"),
+    ]
+
+    diff = diff_mac_tables(previous, current)
+
+    assert diff.added == [row("1", "44:55:66:77:88:99", "6")]
+    assert diff.removed == [row("1", "33:44:55:66:77:88", "4")]
+    assert [(r["mac"], r["from_vid"], r["vid"], r["from_port"], r["port"]) for r in diff.moved] == [
+        ("11:22:33:44:55:66", "1", "1", "2", "5"),
+        ("22:33:44:55:66:77", "10", "20", "3", "3"),
+    ]
+    assert diff.to_text().splitlines()[0] == "+ 44:55:66:77:88:99  vlan 1  port 6"
+    assert not diff_mac_tables(current, current)
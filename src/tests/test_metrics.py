@@ -0,0 +1,149 @@
+"""Tests for the Prometheus exporter."""
+
+import threading
+import urllib.request
+from collections.abc import Iterator, Sequence
+
+from zyxel_cli.client import Session
+from zyxel_cli.fleet import Target
+from zyxel_cli.metrics import (
+    Histogram,
+    MetricsCollector,
+    MetricsServer,
+    SwitchSample,
+    parse_listen,
+)
+
+
+class FakeSession:
+    def __init__(self, host: str, port: int = 22):
+        self.host = host
+        self.port = port
+
+    def connect(self) -> None:
+        if self.host == "down":
+            raise OSError("unreachable")
+
+    def close(self) -> None:
+        pass
+
+    def execute_command(self, *, command: str) -> str:
+        return ""
+
+    def iter_command(self, command: str) -> Iterator[str]:
+        yield from self.execute_command(command=command).split("\n")
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]:
+        return [self.execute_command(command=command) for command in commands]
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]:
+        return self.execute_many(commands)
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        self.close()
+
+
+def make_collector(collections: list[str], targets: list[Target] | None = None):
+    def collect(session: Session) -> SwitchSample:
+        collections.append(session.host)
+        return SwitchSample(
+            interfaces={
+                1: {
+                    "name": "GigabitEthernet1",
+                    "status": "up",
+                    "statistics": {"bytes_input": 4294967000, "crc_errors": 0},
+                },
+                2: {"name": "LAG1", "status": "down"},
+            },
+            mac_entries=42,
+            vlans=3,
+        )
+
+    return MetricsCollector(
+        targets or [Target("sw1"), Target("down")],
+        lambda target: FakeSession(target.host, target.port),
+        collect,
+        workers=2,
+    )
+
+
+def test_render_after_collection():
+    collector = make_collector([])
+    collector.collect_once()
+    text = collector.snapshot().decode()
+
+    assert 'zyxel_up{host="sw1",port="22"} 1' in text
+    assert 'zyxel_up{host="down",port="22"} 0' in text
+    assert 'zyxel_mac_table_entries{host="sw1",port="22"} 42' in text
+    assert 'zyxel_vlans{host="down"' not in text
+    assert "# TYPE zyxel_interface_bytes_input_total counter" in text
+    assert (
+        'zyxel_interface_bytes_input_total{host="sw1",port="22",interface="1",'
+        'name="GigabitEthernet1"} 4294967000' in text
+    )
+    assert 'zyxel_interface_up{host="sw1",port="22",interface="2",name="LAG1"} 0' in text
+    assert 'zyxel_collection_duration_seconds_count{host="sw1",port="22"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_switches_behind_one_address_are_separate_series():
+    collector = make_collector([], [Target("nat", 2201), Target("nat", 2202)])
+    collector.collect_once()
+    text = collector.snapshot().decode()
+
+    assert 'zyxel_up{host="nat",port="2201"} 1' in text
+    assert 'zyxel_up{host="nat",port="2202"} 1' in text
+    assert 'zyxel_vlans{host="nat",port="2202"} 3' in text
+    assert 'zyxel_collection_duration_seconds_count{host="nat",port="2201"} 1' in text
+
+
+def test_parse_listen():
+    assert parse_listen("127.0.0.1:9550") == ("127.0.0.1", 9550)
+    assert parse_listen(":9550") == ("0.0.0.0", 9550)
+    assert parse_listen("[::1]:9550") == ("::1", 9550)
+    assert parse_listen("[::]:0") == ("::", 0)
+    for spec in ("::1:9550", "9550", "[::1]9550", "[::1]", "host:http", "host:70000"):
+        try:
+            parse_listen(spec)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"expected ValueError for {spec!r}")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1.0, 10.0))
+    for value in (0.5, 2.0, 20.0):
+        histogram.observe('host="sw1"', value)
+
+    assert histogram.render("t") == [
+        't_bucket{host="sw1",le="1"} 1',
+        't_bucket{host="sw1",le="10"} 2',
+        't_bucket{host="sw1",le="+Inf"} 3',
+        't_sum{host="sw1"} 22.500000',
+        't_count{host="sw1"} 3',
+    ]
+
+
+def test_scrapes_are_served_from_the_snapshot():
+    collections: list[str] = []
+    collector = make_collector(collections)
+    collector.collect_once()
+
+    server = MetricsServer(("127.0.0.1", 0), collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        for _ in range(3):
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert b'zyxel_up{host="sw1",port="22"} 1' in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Scrapes never trigger collections
+    assert collections == ["sw1"]
@@ -0,0 +1,84 @@
+"""Tests for the port count cache."""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from zyxel_cli.port_cache import PortCountCache, atomic_write_json
+
+
+def test_port_count_round_trip_and_invalidate():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PortCountCache(Path(tmp) / "ports.json")
+        assert cache.get("sw1") is None
+
+        cache.set("sw1", 22, 28)
+        cache.set("sw1", 2222, 10)
+        # A new instance reads what the first one wrote
+        assert PortCountCache(cache.path).get("sw1") == 28
+        assert cache.get("sw1", 2222) == 10
+
+        cache.invalidate("sw1")
+        assert cache.get("sw1") is None
+        assert cache.get("sw1", 2222) == 10
+
+
+def test_port_count_expires():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PortCountCache(Path(tmp) / "ports.json", ttl=60)
+        cache.set("sw1", 22, 28)
+
+        with patch("zyxel_cli.port_cache.time.time", return_value=time.time() + 61):
+            assert cache.get("sw1") is None
+
+
+def test_corrupt_cache_file_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ports.json"
+        path.write_text("{not json")
+        cache = PortCountCache(path)
+
+        assert cache.get("sw1") is None
+        cache.set("sw1", 22, 28)
+        assert cache.get("sw1") == 28
+        # Only the cache file is left behind, no temporary files
+        assert [p.name for p in Path(tmp).iterdir()] == ["ports.json"]
+
+
+def test_atomic_write_json_keeps_the_old_file_on_failure():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.json"
+        atomic_write_json(path, {"count": 28})
+        assert json.loads(path.read_text()) == {"count": 28}
+
+        try:
+            atomic_write_json(path, {"count": object()})
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("expected TypeError")
+        assert json.loads(path.read_text()) == {"count": 28}
+        assert [p.name for p in Path(tmp).iterdir()] == ["state.json"]
+
+
+def test_malformed_entries_are_misses_and_get_overwritten():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ports.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "sw1:22": {"count": 28},
+                    "sw2:22": {"count": "many", "stored": time.time()},
+                    "sw3:22": 28,
+                    "sw4:22": {"count": None, "stored": None},
+                }
+            )
+        )
+        cache = PortCountCache(path)
+        for host in ("sw1", "sw2", "sw3", "sw4", "sw5"):
+            assert cache.get(host) is None
+
+        cache.set("sw1", 22, 10)
+        assert cache.get("sw1") == 10
@@ -0,0 +1,55 @@
+"""Tests for bitset port sets and the port x VLAN matrix."""
+
+from zyxel_cli.parsing import expand_port_range, parse_vlan
+from zyxel_cli.port_sets import PortSet, VlanPortMatrix
+
+VLAN_OUTPUT = """
+  VID  |     VLAN Name    |        Untagged Ports        |        Tagged Ports          |  Type
+-------+------------------+------------------------------+------------------------------+---------
+     1 |          default |                  1-24,lag1-8 |                          --- | Default
+    20 |          servers |                       1,3-5 |                      23-24 | Static
+  4094 |             mgmt |                          --- |                    7,lag2 | Static
+"""
+
+
+def test_port_set_round_trip():
+    for ports in ("1-24,lag1-8", "8,23", "23", "1,3-5,7,lag2", "---"):
+        port_set = PortSet.from_range(ports)
+        assert port_set.to_list() == expand_port_range(ports)
+        assert port_set.to_range() == ports
+        assert PortSet.from_ports(port_set.to_list()) == port_set
+
+
+def test_port_set_operations():
+    left = PortSet.from_range("1-8,lag1")
+    right = PortSet.from_range("5-12,lag1-lag2")
+
+    assert (left | right).to_range() == "1-12,lag1-2"
+    assert (left & right).to_range() == "5-8,lag1"
+    assert (left - right).to_range() == "1-4"
+    assert len(left) == 9
+    assert "7" in left and 7 in left and "LAG1" in left
+    assert "9" not in left and "lag2" not in left and "cpu" not in left
+    assert not PortSet.from_range("---")
+
+
+def test_port_set_rejects_garbage():
+    try:
+        PortSet.from_range("1-4,cpu")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_vlan_port_matrix():
+    matrix = VlanPortMatrix(parse_vlan(VLAN_OUTPUT))
+
+    assert len(matrix) == 3
+    assert matrix.vlans_of(1) == [1, 20]
+    assert matrix.vlans_of("23") == [1, 20]
+    assert matrix.vlans_of("23", tagged=True) == [20]
+    assert matrix.vlans_of("lag2") == [1, 4094]
+    assert matrix.vlans_of("30") == []
+    assert matrix.members(20).to_range() == "1,3-5,23-24"
+    assert matrix.to_dict()["4094"] == {"untagged": "---", "tagged": "7,lag2"}
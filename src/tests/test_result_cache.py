@@ -0,0 +1,142 @@
+"""Tests for the on-disk result cache."""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from zyxel_cli.result_cache import CachedSession, ResultCache
+
+
+class CountingSession:
+    host = "sw1"
+    port = 22
+    complete = True
+
+    def __init__(self):
+        self.connects = 0
+        self.executed = []
+
+    def connect(self):
+        self.connects += 1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def execute_command(self, *, command):
+        self.executed.append(command)
+        return f"OUT {len(self.executed)}\nline"
+
+    def iter_command(self, command):
+        yield from self.execute_command(command=command).split("\n")
+
+
+def make_session(cache, inner, **kwargs):
+    kwargs.setdefault("password", "secret")
+    return CachedSession(lambda: inner, cache, host="sw1", port=22, user="admin", **kwargs)
+
+
+def test_hit_skips_the_switch():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp))
+        inner = CountingSession()
+
+        with make_session(cache, inner) as session:
+            assert session.execute_command(command="show version") == "OUT 1\nline"
+        # Another process: answered without connecting
+        with make_session(cache, CountingSession()) as session:
+            assert session.execute_command(command="show version") == "OUT 1\nline"
+            assert list(session.iter_command("show version")) == ["OUT 1", "line"]
+            assert session._session is None
+
+        assert inner.connects == 1
+
+
+def test_key_holds_the_credential_and_exact_command():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp))
+        inner = CountingSession()
+        with make_session(cache, inner) as session:
+            session.execute_command(command="show running-config")
+
+        # A wrong password is not served what the right one stored
+        with make_session(cache, inner, password="wrong") as session:
+            assert session.execute_command(command="show running-config") == "OUT 2\nline"
+        # The switch decides what an abbreviation means, even with --max-age
+        with make_session(cache, inner, max_age=60) as session:
+            assert session.execute_command(command="show r") == "OUT 3\nline"
+            assert session.execute_command(command="sh run") == "OUT 4\nline"
+            assert session.execute_command(command="show running-config") == "OUT 1\nline"
+        # The password itself is never written to the cache
+        for path in Path(tmp).glob("*.json"):
+            assert "secret" not in path.read_text()
+
+
+def test_uncached_commands_and_max_age():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp))
+        inner = CountingSession()
+
+        with make_session(cache, inner) as session:
+            # Not read-only, and a show command without a default TTL
+            session.execute_command(command="clear mac address-table")
+            session.execute_command(command="clear mac address-table")
+            session.execute_command(command="show clock")
+            session.execute_command(command="show clock")
+        assert len(inner.executed) == 4
+
+        with make_session(cache, inner, max_age=0) as session:
+            assert session.execute_command(command="show vlan") == "OUT 5\nline"
+            assert list(session.iter_command("show vlan")) == ["OUT 6", "line"]
+        with make_session(cache, inner, max_age=30) as session:
+            assert session.execute_command(command="show vlan") == "OUT 6\nline"
+            assert session.execute_command(command="show clock") == "OUT 7\nline"
+
+        with patch("time.time", return_value=time.time() + 3600):
+            with make_session(cache, inner) as session:
+                assert session.execute_command(command="show vlan") == "OUT 8\nline"
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp), max_entries=2)
+        cache.set(["a"], "1")
+        cache.set(["b"], "2")
+        # Make "a" the most recently used entry
+        past = time.time() - 100
+        os.utime(cache._path(["b"]), (past, past))
+        os.utime(cache._path(["a"]), (past - 10, past - 10))
+        assert cache.get(["a"], max_age=60) == "1"
+
+        cache.set(["c"], "3")
+
+        assert cache.get(["a"], max_age=60) == "1"
+        assert cache.get(["b"], max_age=60) is None
+        assert cache.get(["c"], max_age=60) == "3"
+        assert len(list(Path(tmp).glob("*.json"))) == 2
+
+
+def test_incomplete_and_malformed_entries_are_misses():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp))
+        inner = CountingSession()
+        inner.complete = False
+
+        # A command that timed out before its prompt is not stored
+        with make_session(cache, inner) as session:
+            session.execute_command(command="show version")
+            assert list(session.iter_command("show vlan")) == ["OUT 2", "line"]
+        assert list(Path(tmp).glob("*.json")) == []
+
+        cache._path(["bad"]).write_text('{"stored": 1e12}')
+        assert cache.get(["bad"], max_age=60) is None
+        cache._path(["bad"]).write_text('{"stored": 1e12, "output": 5}')
+        assert cache.get(["bad"], max_age=60) is None
@@ -0,0 +1,61 @@
+from zyxel_cli import parsing
+from zyxel_cli.templates import Template, TemplateRegistry
+
+VERSION_OUTPUT = "Boot Version     : V2.00 | 07/08/2015\nFirmware Version : V2.50(AAHK.0)"
+
+
+def test_abbreviated_commands_resolve():
+    registry = parsing.TEMPLATES
+    assert registry.normalize("sh ver") == "show version"
+    assert registry.normalize("SHOW   Version") == "show version"
+    assert registry.normalize("sh mac add") == "show mac address-table"
+    assert registry.normalize("sh int st") == "show interface status"
+    assert registry.normalize("sh run") == "show running-config"
+    assert registry.normalize("sh l") is None  # lag or lldp
+    assert registry.normalize("show version detail") is None
+    assert registry.normalize("reload") is None
+
+
+def test_parse_output_with_abbreviation():
+    assert parsing.parse_output("sh ver", VERSION_OUTPUT) == {
+        "Boot Version": "V2.00",
+        "Firmware Version": "V2.50(AAHK.0)",
+    }
+    assert parsing.parse_output("version", VERSION_OUTPUT) == parsing.parse_version(VERSION_OUTPUT)
+
+
+def test_unknown_command_falls_back_to_output():
+    assert parsing.parse_output("show clock", "12:00") == {"output": "12:00"}
+
+
+def test_header_table_template():
+    output = (
+        "  Port  |     Device ID     |  Port ID  | TTL\n"
+        "--------+-------------------+-----------+-----\n"
+        "     1  | 00:11:22:33:44:55 |   gi0/1   | 120\n"
+        "    24  | AA:BB:CC:DD:EE:FF |   eth0    |  90\n"
+    )
+    assert parsing.parse_output("sh lldp nei", output) == [
+        {"port": "1", "device_id": "00:11:22:33:44:55", "port_id": "gi0/1", "ttl": "120"},
+        {"port": "24", "device_id": "AA:BB:CC:DD:EE:FF", "port_id": "eth0", "ttl": "90"},
+    ]
+
+
+def test_registered_templates_compile_once():
+    registry = TemplateRegistry((Template("show arp"),))
+    assert registry.lookup("sh arp") is registry.lookup("show arp")
+
+    registry.register(Template("show alarm"))
+    assert registry.normalize("sh ar") == "show arp"
+    assert registry.normalize("sh a") is None
+
+
+def test_required_fields_and_transforms():
+    template = Template(
+        "show ports",
+        columns=("port", "state"),
+        require={"state": "^(up|down)$"},
+        transforms={"port": int},
+    )
+    rows = TemplateRegistry((template,)).parse("show ports", "1 | up\n2 | ?\n3 | down")
+    assert rows == [{"port": 1, "state": "up"}, {"port": 3, "state": "down"}]
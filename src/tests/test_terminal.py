@@ -0,0 +1,47 @@
+"""Tests for the terminal output cleaner."""
+
+import re
+
+from zyxel_cli.terminal import TerminalCleaner
+
+PAGER_ERASE = "--More--" + "\b" * 8 + " " * 8 + "\b" * 8
+
+
+def test_clean_drops_escapes_and_blank_lines():
+    raw = "\x1b[1;32mGigabitEthernet1\x1b[0m is up\r\n\r\n\x1b]0;GS1900\x07Hardware\r\n"
+    assert TerminalCleaner().clean(raw) == "GigabitEthernet1 is up\nHardware"
+
+
+def test_backspace_erased_pager_marker_disappears():
+    raw = f"row 1\r\n{PAGER_ERASE}row 2\r\n{PAGER_ERASE}ab\r\n"
+    assert TerminalCleaner().clean(raw) == "row 1\nrow 2\nab"
+
+
+def test_carriage_return_and_erase_line_overwrite():
+    raw = "progress 10%\rprogress 100%\r\nold text\r\x1b[Knew\r\n"
+    assert TerminalCleaner().clean(raw) == "progress 100%\nnew"
+
+
+def test_marker_without_erase_is_removed():
+    assert TerminalCleaner().clean("row 1--More--\r\n") == "row 1"
+
+
+def test_prompts_are_configurable():
+    prompt = re.compile(r"^GS1900(?:\([\w\-]+\))?[>#]\s*$")
+    raw = "show version\r\nVersion 2.80\r\nGS1900# \r\nGS1900(config)#\r\nSwitch> x\r\n"
+
+    assert TerminalCleaner().clean(raw).count("GS1900") == 2
+    assert TerminalCleaner([prompt]).clean(raw) == "show version\nVersion 2.80\nSwitch> x"
+
+
+def test_feed_in_chunks_matches_clean():
+    raw = ("\x1b[33mline\x1b[0m\r\n" + PAGER_ERASE + "next\r\n") * 50 + "last"
+    expected = TerminalCleaner().clean(raw)
+
+    for size in (1, 3, 7):
+        cleaner = TerminalCleaner()
+        lines: list[str] = []
+        for pos in range(0, len(raw), size):
+            lines.extend(cleaner.feed(raw[pos : pos + size]))
+        lines.extend(cleaner.flush())
+        assert "\n".join(lines) == expected
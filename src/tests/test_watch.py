@@ -0,0 +1,88 @@
+"""Tests for watch mode."""
+
+from zyxel_cli.watch import run_watch
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+class FakeSession:
+    opened = 0
+
+    def __init__(self, clock, fail_connect=False):
+        self.clock = clock
+        self.fail_connect = fail_connect
+        self.closed = False
+        FakeSession.opened += 1
+
+    def connect(self):
+        if self.fail_connect:
+            raise OSError("unreachable")
+
+    def close(self):
+        self.closed = True
+
+
+def test_polls_on_a_fixed_grid_over_one_session():
+    clock = FakeClock()
+    sessions = []
+
+    def open_session():
+        sessions.append(FakeSession(clock))
+        return sessions[-1]
+
+    def poll(session):
+        # Polls take time; the 3rd overruns its slot
+        clock.now += 25.0 if len(results) == 2 else 2.0
+        return len(results)
+
+    results = []
+    for record in run_watch(
+        open_session, poll, interval=10.0, count=4, clock=clock, sleep=clock.sleep
+    ):
+        results.append(record)
+
+    assert [record["result"] for record in results] == [0, 1, 2, 3]
+    assert all(record["ok"] for record in results)
+    # Slots at 0, 10, 20, (30 and 40 missed by the slow poll), 50
+    assert clock.sleeps == [8.0, 8.0, 5.0]
+    assert len(sessions) == 1 and sessions[0].closed
+
+
+def test_reconnects_with_backoff():
+    clock = FakeClock()
+    attempts = []
+
+    def open_session():
+        attempts.append(clock.now)
+        # Third and fourth attempts fail to connect
+        return FakeSession(clock, fail_connect=len(attempts) in (3, 4))
+
+    polls = []
+
+    def poll(session):
+        polls.append(clock.now)
+        if len(polls) <= 2:
+            raise EOFError("connection dropped")
+        return "ok"
+
+    records = list(
+        run_watch(open_session, poll, interval=30.0, count=6, clock=clock, sleep=clock.sleep)
+    )
+
+    assert [record["ok"] for record in records] == [False, False, False, False, True, True]
+    assert records[0]["error"] == "connection dropped"
+    assert records[2]["error"] == "Connect failed: unreachable"
+    # Reconnects wait 1 s, then 2 s; after that polls are back on the grid
+    assert attempts == [0.0, 30.0, 60.0, 61.0, 63.0]
+    assert clock.sleeps == [30.0, 30.0, 1.0, 2.0, 27.0]
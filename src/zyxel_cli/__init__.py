@@ -2,7 +2,8 @@
 
 __version__ = "0.1.0"
 
+from .async_client import AsyncZyxelSession
 from .cli import main
 from .client import ZyxelSession
 
-__all__ = ["ZyxelSession", "main"]
+__all__ = ["AsyncZyxelSession", "ZyxelSession", "main"]
@@ -0,0 +1,182 @@
+"""asyncio SSH client for Zyxel switches"""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import Sequence
+
+import paramiko
+
+from .client import DEFAULT_PROMPT, PromptReader, ZyxelSession
+from .consts import ZYXEL_DISABLE_PAGER_COMMAND, ZYXEL_ERROR_MARKERS, ZYXEL_IDLE_TIMEOUT
+from .shell_output import clean_output, learn_prompt, split_outputs
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+
+class AsyncZyxelSession:
+    """asyncio counterpart of `ZyxelSession`.
+
+    Shell output is read from the event loop (`add_reader` on the channel's
+    file descriptor), so one process can keep many switch conversations in
+    flight without a thread blocked per switch. The blocking paramiko calls
+    (the SSH handshake, opening and closing shells) run in the default
+    executor. Output is cut, cleaned and split exactly like the blocking
+    session does it.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        *,
+        password: str | None = None,
+        port: int = 22,
+        prompt_pattern: str | None = None,
+        timeout: float = ZYXEL_IDLE_TIMEOUT,
+        pager_command: str | None = ZYXEL_DISABLE_PAGER_COMMAND,
+    ):
+        # The blocking session owns the transport and the learned shell state
+        self.session = ZyxelSession(
+            host,
+            user,
+            password=password,
+            port=port,
+            prompt_pattern=prompt_pattern,
+            timeout=timeout,
+            pager_command=pager_command,
+        )
+        self._lock = asyncio.Lock()
+
+    @property
+    def host(self) -> str:
+        return self.session.host
+
+    async def connect(self) -> None:
+        """Establish SSH connection"""
+        await asyncio.to_thread(self.session.connect)
+
+    async def open_shell(self) -> paramiko.Channel:
+        """Return the session's interactive shell, opening it on first use"""
+        session = self.session
+        if not session.client:
+            raise RuntimeError("Not connected")
+
+        if session.shell is not None and not session.shell.closed:
+            return session.shell
+
+        LOGGER.debug("Opening interactive shell", extra={"host": self.host})
+
+        # Opening a channel waits for the switch; keep that off the event loop
+        shell = await asyncio.to_thread(session.client.invoke_shell)
+        shell.send(b"\n")
+
+        _, prompt_line = await self._read_until_prompt(shell, session.prompt or DEFAULT_PROMPT)
+        if session.prompt is None:
+            session.prompt = learn_prompt(prompt_line)
+
+        if session.pager_command:
+            output = await self._run_on_shell(shell, [session.pager_command])
+            session.pager_disabled = not any(marker in output[0] for marker in ZYXEL_ERROR_MARKERS)
+
+        session.shell = shell
+        return shell
+
+    async def execute_command(self, *, command: str) -> str:
+        """Execute a command on the Zyxel switch"""
+        return (await self.execute_many([command]))[0]
+
+    async def execute_many(self, commands: Sequence[str]) -> list[str]:
+        """Execute `commands` back-to-back over one shell and return each output"""
+        if not self.session.client:
+            raise RuntimeError("Not connected")
+        if not commands:
+            return []
+
+        # Commands on one shell must not interleave
+        async with self._lock:
+            try:
+                outputs = await self._run_on_shell(await self.open_shell(), commands)
+            except OSError as err:
+                LOGGER.debug(
+                    f"Shell failed ({err}), reopening",
+                    extra={"host": self.host, "command": "; ".join(commands)},
+                )
+                await asyncio.to_thread(self.session.reset_shell)
+                outputs = await self._run_on_shell(await self.open_shell(), commands)
+            if not self.session.complete:
+                # Late output of a timed-out batch would start the next result
+                await asyncio.to_thread(self.session.reset_shell)
+
+        return [clean_output(output, self.session.prompt) for output in outputs]
+
+    async def close(self) -> None:
+        """Close the SSH connection"""
+        await asyncio.to_thread(self.session.close)
+
+    async def _run_on_shell(self, shell: paramiko.Channel, commands: Sequence[str]) -> list[str]:
+        """Send `commands` and return the raw output of each"""
+        batch = "".join(f"{command}\n" for command in commands)
+        LOGGER.debug(f"Sending command: {batch!r}", extra={"host": self.host, "command": batch})
+        shell.send(batch.encode())
+
+        prompt = self.session.prompt or DEFAULT_PROMPT
+        output, _ = await self._read_until_prompt(shell, prompt, echoes=commands)
+        return split_outputs(output, commands, prompt)
+
+    async def _read_until_prompt(
+        self, shell: paramiko.Channel, prompt: re.Pattern[str], *, echoes: Sequence[str] = ()
+    ) -> tuple[str, str]:
+        """Collect output until `prompt` shows up as the last line"""
+        reader = PromptReader(prompt, echoes=echoes, answer_pager=not self.session.pager_disabled)
+        deadline = time.monotonic() + self.session.timeout
+
+        while not reader.done and (remaining := deadline - time.monotonic()) > 0:
+            if not await self._wait_readable(shell, remaining):
+                continue
+
+            data = shell.recv(4096)
+            if not data:
+                # EOF: the switch closed the channel
+                if not reader.received:
+                    raise OSError("Shell closed by remote")
+                break
+
+            deadline = time.monotonic() + self.session.timeout
+            for _ in range(reader.feed(data)):
+                shell.send(b" ")
+
+        if not reader.done:
+            LOGGER.debug("Timed out waiting for prompt", extra={"host": self.host})
+        self.session.complete = reader.done
+        return reader.result()
+
+    @staticmethod
+    async def _wait_readable(shell: paramiko.Channel, timeout: float) -> bool:
+        """Wait until `shell` has data (or EOF) without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        ready: asyncio.Future[None] = loop.create_future()
+        fd = shell.fileno()
+
+        def on_readable() -> None:
+            if not ready.done():
+                ready.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        try:
+            await asyncio.wait_for(ready, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(fd)
+
+    async def __aenter__(self) -> "AsyncZyxelSession":
+        """Async context manager entry"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        """Async context manager exit"""
+        await self.close()
@@ -0,0 +1,359 @@
+"""Local session broker that keeps authenticated switch sessions open.
+
+`zyxel-cli broker` runs a small daemon listening on a Unix socket. It keeps one
+`ZyxelSession` per (host, port, user, password) open between CLI invocations
+and closes sessions that sat idle for too long. When the socket is present the
+CLI sends its commands through the broker instead of connecting itself, so
+scripts calling `zyxel-cli exec` in a loop pay the SSH handshake only once.
+
+The protocol is one JSON request line per connection, answered by one JSON
+response line.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import Any, Protocol
+
+from .client import ZyxelSession
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+BROKER_IDLE_TIMEOUT = 300.0
+
+
+def default_socket_path() -> Path:
+    """Return the broker socket path from `ZYXEL_BROKER_SOCKET` or a per-user default"""
+    env_path = os.environ.get("ZYXEL_BROKER_SOCKET")
+    if env_path:
+        return Path(env_path)
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "zyxel-cli" / "broker.sock"
+    return Path(f"/tmp/zyxel-cli-{os.getuid()}") / "broker.sock"
+
+
+def check_socket_path(path: Path, *, socket_exists: bool = True) -> None:
+    """Raise PermissionError unless only the current user can reach the socket at `path`.
+
+    Requests carry passwords, so the directory must be ours with mode 0700 and
+    the socket ours with no group or other permissions. Otherwise another
+    local user could have planted them (e.g. in /tmp) to collect credentials.
+    """
+    uid = os.getuid()
+    directory = os.lstat(path.parent)
+    if not stat.S_ISDIR(directory.st_mode) or directory.st_uid != uid or directory.st_mode & 0o077:
+        raise PermissionError(f"{path.parent} must be a directory owned by you with mode 0700")
+    if socket_exists:
+        info = os.lstat(path)
+        if not stat.S_ISSOCK(info.st_mode) or info.st_uid != uid or info.st_mode & 0o077:
+            raise PermissionError(f"{path} must be a socket owned by you with mode 0600")
+
+
+def broker_available(path: Path) -> bool:
+    """Check whether a broker only we can reach is listening on `path`"""
+    if not os.path.lexists(path):
+        return False
+    try:
+        check_socket_path(path)
+    except PermissionError as err:
+        LOGGER.warning(f"Not using the broker: {err}")
+        return False
+    except OSError:
+        return False
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def _check_peer(sock: socket.socket) -> None:
+    """Refuse to talk to a broker run by another user, where the OS can tell"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    if uid != os.getuid():
+        raise ConnectionError(f"Broker socket is owned by user {uid}, not by you")
+
+
+class PoolSession(Protocol):
+    """What a SessionPool needs from the sessions its factory creates"""
+
+    @property
+    def client(self) -> object: ...
+
+    @property
+    def complete(self) -> bool: ...
+
+    def connect(self) -> None: ...
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]: ...
+
+    def close(self) -> None: ...
+
+
+class _PooledSession:
+    def __init__(self, session: PoolSession):
+        self.session = session
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+# host, SSH port, user, password hash, prompt pattern ("" to learn it)
+_PoolKey = tuple[str, int, str, str, str]
+
+
+class SessionPool:
+    """Open sessions keyed by `_PoolKey`, with idle eviction"""
+
+    def __init__(
+        self,
+        *,
+        idle_timeout: float = BROKER_IDLE_TIMEOUT,
+        session_factory: Callable[..., PoolSession] = ZyxelSession,
+    ):
+        self.idle_timeout = idle_timeout
+        self.session_factory = session_factory
+        self._sessions: dict[_PoolKey, _PooledSession] = {}
+        self._lock = threading.Lock()
+
+    def execute(self, request: dict[str, Any]) -> tuple[list[str], bool]:
+        """Run the request's commands on a pooled session, connecting if needed.
+
+        Returns the outputs and whether they ended at the prompt, as opposed
+        to a read that timed out.
+        """
+        commands: Sequence[str] = request["commands"]
+        password = request.get("password") or ""
+        # Never hand a session to a caller that did not present its password,
+        # nor one learned with another prompt pattern
+        key = (
+            request["host"],
+            int(request.get("port", 22)),
+            request["user"],
+            hashlib.sha256(password.encode()).hexdigest(),
+            request.get("prompt_pattern") or "",
+        )
+
+        for attempt in range(2):
+            pooled = self._get(key, request)
+            with pooled.lock:
+                pooled.last_used = time.monotonic()
+                connecting = pooled.session.client is None
+                try:
+                    if connecting:
+                        pooled.session.connect()
+                    outputs = pooled.session.execute_many(commands)
+                    return outputs, pooled.session.complete
+                except (OSError, ConnectionError, EOFError) as err:
+                    LOGGER.debug(f"Pooled session failed: {err}", extra={"host": key[0]})
+                    self._discard(key, pooled)
+                    # Only a session the switch dropped while idle gets a fresh
+                    # try; a failed login is not repeated, as that could lock
+                    # the account
+                    if attempt or connecting:
+                        raise
+                finally:
+                    pooled.last_used = time.monotonic()
+        raise AssertionError("unreachable")
+
+    def _get(self, key: _PoolKey, request: dict[str, Any]) -> _PooledSession:
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is None:
+                session = self.session_factory(
+                    host=key[0],
+                    user=key[2],
+                    password=request.get("password"),
+                    port=key[1],
+                    prompt_pattern=key[4] or None,
+                )
+                pooled = self._sessions[key] = _PooledSession(session)
+            return pooled
+
+    def _discard(self, key: _PoolKey, pooled: _PooledSession) -> None:
+        with self._lock:
+            if self._sessions.get(key) is pooled:
+                del self._sessions[key]
+        pooled.session.close()
+
+    def evict_idle(self) -> int:
+        """Close sessions idle for longer than `idle_timeout`; return how many"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [
+                (key, pooled)
+                for key, pooled in self._sessions.items()
+                if pooled.last_used < cutoff and not pooled.lock.locked()
+            ]
+            for key, _ in idle:
+                del self._sessions[key]
+
+        for key, pooled in idle:
+            LOGGER.debug("Evicting idle session", extra={"host": key[0]})
+            pooled.session.close()
+        return len(idle)
+
+    def close(self) -> None:
+        """Close every pooled session"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for pooled in sessions.values():
+            pooled.session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    server: "BrokerServer"
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            outputs, complete = self.server.pool.execute(request)
+            response = {"ok": True, "outputs": outputs, "complete": complete}
+        except Exception as err:
+            response = {"ok": False, "error": str(err)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server in front of a SessionPool"""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, pool: SessionPool):
+        self.pool = pool
+        self.path = path
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # The directory may predate us; never listen where others can get in
+        check_socket_path(path, socket_exists=False)
+        if os.path.lexists(path):
+            if broker_available(path):
+                raise RuntimeError(f"A broker is already listening on {path}")
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise RuntimeError(f"{path} exists and is not a socket")
+            # Left behind by a broker that did not shut down cleanly
+            path.unlink()
+        super().__init__(str(path), _BrokerHandler)
+        # Requests carry passwords: only the owner may talk to the broker
+        os.chmod(path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def serve_broker(path: Path, *, idle_timeout: float = BROKER_IDLE_TIMEOUT) -> None:
+    """Run the broker in the foreground until interrupted"""
+    server = BrokerServer(path, SessionPool(idle_timeout=idle_timeout))
+    stop = threading.Event()
+
+    def evict_loop() -> None:
+        while not stop.wait(min(idle_timeout, 30.0)):
+            server.pool.evict_idle()
+
+    threading.Thread(target=evict_loop, name="zyxel-broker-evict", daemon=True).start()
+    print(f"Broker listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+
+
+class BrokerSession:
+    """Drop-in for `ZyxelSession` that runs commands through a running broker"""
+
+    def __init__(
+        self,
+        path: Path,
+        host: str,
+        user: str,
+        *,
+        password: str | None = None,
+        port: int = 22,
+        prompt_pattern: str | None = None,
+    ):
+        self.path = path
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.prompt_pattern = prompt_pattern
+        # As ZyxelSession.complete, reported by the broker
+        self.complete = True
+
+    def connect(self) -> None:
+        """Nothing to do: the broker connects on first use"""
+
+    def close(self) -> None:
+        """Nothing to do: the broker keeps the session open"""
+
+    def execute_command(self, *, command: str) -> str:
+        """Execute a command on the switch through the broker"""
+        return self.execute_many([command])[0]
+
+    def iter_command(self, command: str) -> Iterator[str]:
+        """Yield the command's output lines; the broker answers in one piece"""
+        output = self.execute_command(command=command)
+        if output:
+            yield from output.split("\n")
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]:
+        """Execute several commands on the switch in one broker round trip"""
+        request = {
+            "host": self.host,
+            "port": self.port,
+            "user": self.user,
+            "password": self.password,
+            "prompt_pattern": self.prompt_pattern,
+            "commands": list(commands),
+        }
+        check_socket_path(self.path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(self.path))
+            _check_peer(sock)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode() + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+
+        if not response["ok"]:
+            raise ConnectionError(response["error"])
+        self.complete = response.get("complete", True)
+        outputs: list[str] = response["outputs"]
+        return outputs
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]:
+        """Execute commands through the broker; it pipelines them on one shell"""
+        return self.execute_many(commands)
+
+    def interactive(self) -> None:
+        raise RuntimeError("Interactive sessions are not supported through the broker")
+
+    def __enter__(self) -> "BrokerSession":
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        """Context manager exit"""
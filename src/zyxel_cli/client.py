@@ -1,26 +1,234 @@
 """SSH client for Zyxel switches"""
 
+import codecs
 import logging
 import re
+import select
 import sys
+import threading
 import time
+from collections.abc import Generator, Iterator, Sequence
+from typing import Protocol
 
 import paramiko
 
-from .consts import ZYXEL_SLEEP_BETWEEN_COMMANDS
+from .consts import (
+    ZYXEL_DISABLE_PAGER_COMMAND,
+    ZYXEL_ERROR_MARKERS,
+    ZYXEL_IDLE_TIMEOUT,
+    ZYXEL_MAX_CHANNELS,
+    ZYXEL_PAGER_MARKER,
+    ZYXEL_PROMPT_PATTERN,
+)
+from .shell_output import clean_output, cleaner_prompts, learn_prompt, split_outputs
+from .terminal import TerminalCleaner
 
 LOGGER = logging.getLogger("zyxel_cli")
 
+DEFAULT_PROMPT = re.compile(ZYXEL_PROMPT_PATTERN, re.MULTILINE)
+
+
+class Session(Protocol):
+    """What the CLI needs from a session: `ZyxelSession` or a stand-in for it"""
+
+    host: str
+    # SSH port; with `host` it identifies the switch for per-switch state
+    port: int
+
+    def connect(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    def execute_command(self, *, command: str) -> str: ...
+
+    def iter_command(self, command: str) -> Iterator[str]: ...
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]: ...
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]: ...
+
+    def __enter__(self) -> "Session": ...
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None: ...
+
+
+class PromptReader:
+    """Incremental parser for the output of one read from a CLI shell.
+
+    Chunks are fed in as they arrive. The reader answers `--More--` markers
+    (even when split across chunks), follows the echoed commands and notices
+    when the prompt is back. When `echoes` are given the prompt only counts
+    once every echoed command has been seen in order, so a prompt still in
+    flight from earlier (or between batched commands) does not end the read.
+    The blocking and asyncio sessions share it so both cut output the same way.
+
+    With `keep_output=False` nothing is retained beyond the line in progress;
+    complete lines are handed out by `take` instead, for streaming.
+    """
+
+    def __init__(
+        self,
+        prompt: re.Pattern[str],
+        *,
+        echoes: Sequence[str] = (),
+        answer_pager: bool = True,
+        keep_output: bool = True,
+    ):
+        self.prompt = prompt
+        self.echoes = echoes
+        self.answer_pager = answer_pager
+        self.keep_output = keep_output
+        self.done = False
+        self.received = 0
+        # Bytes are decoded incrementally so a multibyte character split
+        # across two reads survives. Decoded chunks are only joined once, in
+        # `output`; scanning works on `_window`, the tail of the output from
+        # the last line break on, so every chunk is looked at a bounded number
+        # of times and large captures stay linear.
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._chunks: list[str] = []
+        self._size = 0
+        self._window = ""
+        self._window_start = 0
+        self._overlap = max([len(ZYXEL_PAGER_MARKER), *map(len, echoes)])
+        self._end = -1
+        self._body_start = 0 if not echoes else -1
+        self._echo_index = 0
+        self._echo_scan = 0
+        self._pager_scan = 0
+        self._taken = 0
+        self._pending: list[str] = []
+
+    @property
+    def output(self) -> str:
+        """Everything received so far"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, data: bytes) -> int:
+        """Add `data` and return how many pager markers need a space in reply"""
+        self.received += len(data)
+        chunk = self._decoder.decode(data)
+        if not chunk:
+            return 0
+        if self.keep_output:
+            self._chunks.append(chunk)
+        self._size += len(chunk)
+
+        # Positions below are offsets into the whole output; `window` starts
+        # at `base` and always holds at least the last line and `_overlap`
+        # characters, enough to find a marker, echo or prompt split across reads
+        window = self._window = self._window + chunk
+        base = self._window_start
+
+        pager_answers = 0
+        if self.answer_pager:
+            # Search from just before the new chunk so a marker split across
+            # two reads is still found, and answer every marker exactly once
+            pager_pos = window.find(ZYXEL_PAGER_MARKER, self._pager_scan - base)
+            while pager_pos >= 0:
+                pager_answers += 1
+                self._pager_scan = base + pager_pos + len(ZYXEL_PAGER_MARKER)
+                pager_pos = window.find(ZYXEL_PAGER_MARKER, self._pager_scan - base)
+            self._pager_scan = max(self._pager_scan, self._size - len(ZYXEL_PAGER_MARKER) + 1)
+
+        while self._echo_index < len(self.echoes):
+            echo = self.echoes[self._echo_index]
+            echo_pos = window.find(echo, self._echo_scan - base)
+            if echo_pos < 0:
+                # Keep a partial echo at the end of the chunk for the next read
+                self._echo_scan = max(self._echo_scan, self._size - len(echo) + 1)
+                break
+            self._echo_scan = base + echo_pos + len(echo)
+            self._echo_index += 1
+            if self._echo_index == len(self.echoes):
+                self._body_start = self._echo_scan
+
+        newline = window.rfind("\n")
+        if self._body_start >= 0:
+            # The prompt may follow a pager erase sequence on the same line
+            line_start = newline + 1
+            line_start = max(window.rfind("\b", line_start) + 1, line_start)
+            last_line_start = max(line_start, self._body_start - base)
+            if self.prompt.search(window, last_line_start):
+                self._end = base + last_line_start
+                self.done = True
+
+        if not self.keep_output:
+            # Hand out complete lines before they leave the window
+            end = self._end if self.done else base + newline + 1
+            if end > self._taken:
+                self._pending.append(window[self._taken - base : end - base])
+                self._taken = end
+
+        # Keep the line break before the last line so `^` in the prompt
+        # pattern sees the same context as on the whole output
+        keep = max(0, min(newline, len(window) - self._overlap - 1))
+        if keep:
+            self._window = window[keep:]
+            self._window_start = base + keep
+
+        return pager_answers
+
+    def take(self, *, final: bool = False) -> str:
+        """Return the complete lines received since the last call (streaming mode).
+
+        With `final`, also return the incomplete last line unless it is the
+        prompt, for reads that ended without one.
+        """
+        if final and not self.done:
+            tail = self._window[self._taken - self._window_start :]
+            self._pending.append(tail + self._decoder.decode(b"", final=True))
+            self._taken = self._size
+        text = "".join(self._pending)
+        self._pending.clear()
+        return text
+
+    def result(self) -> tuple[str, str]:
+        """Return the output before the final prompt and the prompt line itself"""
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._chunks.append(tail)
+            self._size += len(tail)
+        output = self.output
+        if not self.done:
+            return output, ""
+        return output[: self._end], output[self._end :]
+
 
 class ZyxelSession:
     """SSH session handler for Zyxel switches"""
 
-    def __init__(self, host: str, user: str, *, password: str | None = None, port: int = 22):
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        *,
+        password: str | None = None,
+        port: int = 22,
+        prompt_pattern: str | None = None,
+        timeout: float = ZYXEL_IDLE_TIMEOUT,
+        pager_command: str | None = ZYXEL_DISABLE_PAGER_COMMAND,
+    ):
         self.host = host
         self.user = user
         self.password = password
         self.port = port
+        self.timeout = timeout
         self.client: paramiko.SSHClient | None = None
+        self.shell: paramiko.Channel | None = None
+        # Additional shells on the same transport used by execute_parallel
+        self.extra_shells: list[paramiko.Channel] = []
+        self.pager_command = pager_command
+        self.pager_disabled = False
+        # Whether the last read ended at the prompt; False after a timeout,
+        # when the output may be cut short
+        self.complete = True
+        # Learned from the first prompt seen at login unless given explicitly
+        self.prompt: re.Pattern[str] | None = (
+            re.compile(prompt_pattern, re.MULTILINE) if prompt_pattern else None
+        )
 
     def connect(self) -> None:
         """Establish SSH connection"""
@@ -40,77 +248,317 @@ class ZyxelSession:
         except Exception as e:
             raise ConnectionError(f"Failed to connect to {self.host}: {e}")
 
-    def execute_command(self, *, command: str) -> str:
-        """Execute a command on the Zyxel switch"""
+    def open_shell(self) -> paramiko.Channel:
+        """Return the session's interactive shell, opening it on first use.
+
+        The shell is kept open between commands so that only the first command
+        pays for the shell setup. A shell that was closed by the switch (idle
+        logout, `exit`, dropped channel) is transparently replaced.
+        """
         if not self.client:
             raise RuntimeError("Not connected")
 
-        # Open an interactive shell
-        shell = self.client.invoke_shell()
-        time.sleep(ZYXEL_SLEEP_BETWEEN_COMMANDS)
+        if self.shell is None or self.shell.closed:
+            self.shell = self._start_shell()
+        return self.shell
+
+    def _start_shell(self) -> paramiko.Channel:
+        """Open a new shell channel on the connection and get it to a prompt"""
+        if not self.client:
+            raise RuntimeError("Not connected")
+
+        LOGGER.debug("Opening interactive shell", extra={"host": self.host})
 
-        # Clear initial output
-        if shell.recv_ready():
-            shell.recv(4096)
+        shell = self.client.invoke_shell()
 
         # Send newline to get prompt
+        LOGGER.debug("Sending initial newline to get prompt", extra={"host": self.host})
+        shell.send(b"\n")
+
+        _, prompt_line = self._read_until_prompt(shell, self.prompt or DEFAULT_PROMPT)
+        if self.prompt is None:
+            self.prompt = learn_prompt(prompt_line)
+            LOGGER.debug(
+                f"Learned prompt pattern: {self.prompt.pattern if self.prompt else None}",
+                extra={"host": self.host},
+            )
+
+        if self.pager_command:
+            self._disable_pager(shell, self.pager_command)
+
+        return shell
+
+    def _disable_pager(self, shell: paramiko.Channel, pager_command: str) -> None:
+        """Turn off paging for `shell` so long outputs arrive without `--More--` stops.
+
+        Switches that reject the command keep paging; the reader then answers
+        each `--More--` marker itself.
+        """
+        output = self._run_on_shell(shell, pager_command)
+        self.pager_disabled = not any(marker in output for marker in ZYXEL_ERROR_MARKERS)
         LOGGER.debug(
-            "Sending initial newline to get prompt", extra={"host": self.host, "command": command}
+            f"Pager {'disabled' if self.pager_disabled else 'could not be disabled'}",
+            extra={"host": self.host, "command": pager_command, "output": output},
         )
 
-        shell.send(b"\n")
-        time.sleep(ZYXEL_SLEEP_BETWEEN_COMMANDS)
+    def reset_shell(self) -> None:
+        """Close the current shell so the next command opens a fresh one"""
+        shell, self.shell = self.shell, None
+        if shell is None or shell.closed:
+            return
 
-        # Clear prompt
-        if shell.recv_ready():
-            shell.recv(4096)
+        try:
+            shell.send(b"exit\n")
+        except OSError:
+            pass
+        shell.close()
 
-        # Send the actual command (send bytes to satisfy stubs)
-        LOGGER.debug(f"Sending command: {command}", extra={"host": self.host, "command": command})
-        shell.send(f"{command}\n".encode())
-        time.sleep(ZYXEL_SLEEP_BETWEEN_COMMANDS)
-
-        # Collect output
-        # Collect output
-        output = ""
-        idle_count = 0
-        max_idle = 20  # 2 seconds timeout (20 * 0.1)
-
-        while idle_count < max_idle:
-            if shell.recv_ready():
-                chunk = shell.recv(4096).decode("utf-8", errors="ignore")
-                output += chunk
-                idle_count = 0  # Reset idle counter when data received
-
-                if "--More--" in chunk:
-                    LOGGER.debug(
-                        "Detected --More-- prompt, sending space",
-                        extra={"host": self.host, "command": command},
-                    )
-                    shell.send(b" ")
+    def execute_command(self, *, command: str) -> str:
+        """Execute a command on the Zyxel switch.
+
+        A read that times out before the prompt resets the shell, so output
+        still in flight cannot end up in the next command's result.
+        """
+        if not self.client:
+            raise RuntimeError("Not connected")
+
+        try:
+            output = self._run_on_shell(self.open_shell(), command)
+        except OSError as err:
+            # The channel died between commands; retry once on a fresh shell
+            LOGGER.debug(
+                f"Shell failed ({err}), reopening", extra={"host": self.host, "command": command}
+            )
+            self.reset_shell()
+            output = self._run_on_shell(self.open_shell(), command)
+        if not self.complete:
+            # Late output of a timed-out command would start the next result
+            self.reset_shell()
+
+        cleaned = clean_output(output, self.prompt)
+
+        LOGGER.debug(
+            "Returning cleaned output",
+            extra={"host": self.host, "command": command, "output": cleaned},
+        )
 
+        return cleaned
+
+    def iter_command(self, command: str) -> Generator[str, None, None]:
+        """Execute a command and yield its cleaned output lines as they arrive.
+
+        Only the line in progress is buffered, so memory stays bounded however
+        large the output is. Joined with newlines the lines are what
+        `execute_command` returns. A shell abandoned mid-output (the caller
+        stopped iterating) is reset so the next command starts clean.
+        """
+        if not self.client:
+            raise RuntimeError("Not connected")
+
+        for attempt in range(2):
+            shell = self.open_shell()
+            reader = PromptReader(
+                self.prompt or DEFAULT_PROMPT,
+                echoes=[command],
+                answer_pager=not self.pager_disabled,
+                keep_output=False,
+            )
+            cleaner = TerminalCleaner(cleaner_prompts(self.prompt))
+            try:
+                LOGGER.debug(
+                    f"Sending command: {command}", extra={"host": self.host, "command": command}
+                )
+                shell.send(f"{command}\n".encode())
+                for _ in self._pump(shell, reader, command=command):
+                    yield from cleaner.feed(reader.take())
+                yield from cleaner.feed(reader.take(final=True))
+                yield from cleaner.flush()
+                return
+            except OSError as err:
+                # Raised before any output was read; retry once on a fresh shell
+                if attempt:
+                    raise
                 LOGGER.debug(
-                    "Current output chunk received",
-                    extra={"host": self.host, "command": command, "output_chunk": chunk},
+                    f"Shell failed ({err}), reopening",
+                    extra={"host": self.host, "command": command},
                 )
-            else:
-                time.sleep(ZYXEL_SLEEP_BETWEEN_COMMANDS)
-                idle_count += 1
+                self.reset_shell()
+            finally:
+                self.complete = reader.done
+                if not reader.done and self.shell is shell:
+                    self.reset_shell()
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]:
+        """Execute `commands` back-to-back over one shell and return each output.
+
+        All commands are written before any output is read, so the batch costs
+        one network round trip instead of one per command. The stream is split
+        on the echoed commands and the prompts between them; each result is the
+        same as `execute_command` returns for that command on its own. As with
+        `execute_command`, a batch that times out before the prompt resets the
+        shell.
+        """
+        if not self.client:
+            raise RuntimeError("Not connected")
+        if not commands:
+            return []
 
-        # Send exit
-        LOGGER.debug("Sending exit!", extra={"host": self.host, "command": command})
-        shell.send(b"exit\n")
+        try:
+            outputs = self._run_many_on_shell(self.open_shell(), commands)
+        except OSError as err:
+            LOGGER.debug(
+                f"Shell failed ({err}), reopening",
+                extra={"host": self.host, "command": "; ".join(commands)},
+            )
+            self.reset_shell()
+            outputs = self._run_many_on_shell(self.open_shell(), commands)
+        if not self.complete:
+            self.reset_shell()
 
-        shell.close()
+        clean_outputs = [clean_output(output, self.prompt) for output in outputs]
 
-        clean_output = self._clean_output(output)
+        LOGGER.debug(
+            "Returning cleaned outputs",
+            extra={"host": self.host, "command": "; ".join(commands), "output": clean_outputs},
+        )
+
+        return clean_outputs
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]:
+        """Execute `commands` concurrently over several shells on this connection.
+
+        Up to `channels` shells (at most `ZYXEL_MAX_CHANNELS`) are opened on the
+        one authenticated SSH transport, so no extra handshakes are paid. The
+        commands are dealt out round-robin and each shell pipelines its share
+        like `execute_many`, on its own thread. Outputs are returned in the
+        order of `commands`, cleaned as by `execute_command`.
+        """
+        if not self.client:
+            raise RuntimeError("Not connected")
+
+        channels = max(1, min(channels, ZYXEL_MAX_CHANNELS, len(commands)))
+        if channels == 1:
+            return self.execute_many(commands)
+
+        # The primary shell learns the prompt and pager support for the others
+        shells = [self.open_shell()]
+        self.extra_shells = [shell for shell in self.extra_shells if not shell.closed]
+        while len(self.extra_shells) < channels - 1:
+            self.extra_shells.append(self._start_shell())
+        shells.extend(self.extra_shells[: channels - 1])
+
+        outputs = [""] * len(commands)
+        errors: list[Exception] = []
+
+        def run_share(index: int, shell: paramiko.Channel) -> None:
+            share = commands[index::channels]
+            try:
+                raw_outputs = self._run_many_on_shell(shell, share)
+            except Exception as err:
+                errors.append(err)
+                return
+            outputs[index::channels] = [clean_output(output, self.prompt) for output in raw_outputs]
+
+        threads = [
+            threading.Thread(target=run_share, args=(index, shell), name=f"zyxel-channel-{index}")
+            for index, shell in enumerate(shells)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            # Shells in an unknown state must not be reused
+            self.reset_shell()
+            for shell in self.extra_shells:
+                shell.close()
+            self.extra_shells = []
+            raise errors[0]
 
         LOGGER.debug(
-            "Returning cleaned output",
-            extra={"host": self.host, "command": command, "output": clean_output},
+            f"Returning cleaned outputs from {channels} channels",
+            extra={"host": self.host, "command": "; ".join(commands), "output": outputs},
         )
+        return outputs
+
+    def _run_on_shell(self, shell: paramiko.Channel, command: str) -> str:
+        """Send `command` to `shell` and return the raw output up to the next prompt"""
+        # Send the actual command (send bytes to satisfy stubs)
+        LOGGER.debug(f"Sending command: {command}", extra={"host": self.host, "command": command})
+        shell.send(f"{command}\n".encode())
+
+        output, _ = self._read_until_prompt(shell, self.prompt or DEFAULT_PROMPT, echoes=[command])
+        return output
 
-        return clean_output
+    def _run_many_on_shell(self, shell: paramiko.Channel, commands: Sequence[str]) -> list[str]:
+        """Send all `commands` at once and split the raw output per command"""
+        batch = "".join(f"{command}\n" for command in commands)
+        LOGGER.debug(
+            f"Sending {len(commands)} commands", extra={"host": self.host, "command": batch}
+        )
+        shell.send(batch.encode())
+
+        prompt = self.prompt or DEFAULT_PROMPT
+        output, _ = self._read_until_prompt(shell, prompt, echoes=commands)
+        return split_outputs(output, commands, prompt)
+
+    def _read_until_prompt(
+        self, shell: paramiko.Channel, prompt: re.Pattern[str], *, echoes: Sequence[str] = ()
+    ) -> tuple[str, str]:
+        """Collect output until `prompt` shows up as the last line.
+
+        Returns the output before the final prompt and the prompt line itself
+        (see `PromptReader`). Waiting `self.timeout` seconds without new data
+        ends the read as a safety net for devices that never print a
+        recognizable prompt.
+
+        The reader blocks in `select` on the channel until data arrives, so it
+        wakes up as soon as the switch answers and uses no CPU while waiting.
+        """
+        reader = PromptReader(prompt, echoes=echoes, answer_pager=not self.pager_disabled)
+        for _ in self._pump(shell, reader, command=echoes[-1] if echoes else None):
+            pass
+        self.complete = reader.done
+        return reader.result()
+
+    def _pump(
+        self, shell: paramiko.Channel, reader: PromptReader, *, command: str | None
+    ) -> Iterator[None]:
+        """Feed `reader` from `shell` until it is done, yielding after every read"""
+        deadline = time.monotonic() + self.timeout
+
+        while not reader.done and (remaining := deadline - time.monotonic()) > 0:
+            readable, _, _ = select.select([shell], [], [], remaining)
+            if not readable:
+                continue
+
+            data = shell.recv(4096)
+            if not data:
+                # EOF: the switch closed the channel
+                if not reader.received:
+                    raise OSError("Shell closed by remote")
+                break
+
+            deadline = time.monotonic() + self.timeout
+
+            for _ in range(reader.feed(data)):
+                LOGGER.debug(
+                    "Detected --More-- prompt, sending space",
+                    extra={"host": self.host, "command": command},
+                )
+                shell.send(b" ")
+
+            LOGGER.debug(
+                f"Received {len(data)} bytes",
+                extra={"host": self.host, "command": command},
+            )
+            yield
+
+        if not reader.done:
+            LOGGER.debug(
+                "Timed out waiting for prompt", extra={"host": self.host, "command": command}
+            )
 
     def interactive(self) -> None:
         """Start an interactive SSH session"""
@@ -153,28 +601,17 @@ class ZyxelSession:
 
     def close(self) -> None:
         """Close the SSH connection"""
+        self.reset_shell()
+        for shell in self.extra_shells:
+            shell.close()
+        self.extra_shells = []
         if self.client:
             self.client.close()
 
     @staticmethod
-    def _clean_output(output: str) -> str:
-        """Clean ANSI escape codes and prompts from output"""
-        # Remove ANSI escape sequences
-        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        cleaned = ansi_escape.sub("", output)
-
-        # Remove prompts and empty lines
-        lines = []
-        for line in cleaned.split("\n"):
-            stripped = line.strip()
-            if (
-                stripped
-                and not stripped.startswith("Switch>")
-                and not stripped.startswith("Switch#")
-            ):
-                lines.append(line)
-
-        return "\n".join(lines)
+    def _clean_output(output: str, prompt: re.Pattern[str] | None = None) -> str:
+        """Render escape codes and pager remnants away; drop prompts and blank lines"""
+        return clean_output(output, prompt)
 
     def __enter__(self) -> "ZyxelSession":
         """Context manager entry"""
@@ -2,10 +2,39 @@
 
 import argparse
 import logging
-
-from .client import ZyxelSession
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .broker import (
+    BROKER_IDLE_TIMEOUT,
+    BrokerSession,
+    broker_available,
+    default_socket_path,
+    serve_broker,
+)
+from .client import Session, ZyxelSession
 from .config import resolve_password
-from .interface_utils import collect_all_interfaces, parse_interface_output
+from .consts import ZYXEL_MAX_CHANNELS
+from .counters import RateEngine
+from .fleet import Target, load_inventory, parse_target, run_fleet
+from .history import FLAG_RESET, CounterHistory, default_history_path, parse_duration
+from .interface_utils import (
+    collect_all_interfaces,
+    collect_interfaces_bulk,
+    count_ports_from_vlans,
+    parse_interface_output,
+)
+from .mac_index import MacIndex
+from .mac_table_utils import diff_mac_tables, mac_to_int, parse_mac_table_output
+from .metrics import MetricsCollector, SwitchSample, parse_listen, serve_metrics
+from .parsing import parse_vlan
+from .port_cache import PortCountCache, default_cache_dir
+from .port_sets import PortSet
+from .result_cache import CachedSession, ResultCache
+from .watch import run_watch
 
 LOGGER = logging.getLogger("zyxel_cli")
 
@@ -24,135 +53,733 @@ def create_parser() -> argparse.ArgumentParser:
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
-    parser.add_argument("-H", "--host", required=True, help="Switch hostname or IP")
+    parser.add_argument("-H", "--host", help="Switch hostname or IP")
     parser.add_argument("-u", "--user", default="admin", help="SSH username (default: admin)")
     parser.add_argument("-p", "--password", help="SSH password (will prompt if not provided)")
     parser.add_argument("--port", type=int, default=22, help="SSH port (default: 22)")
     parser.add_argument("--debug", action="store_true", help="Enable JSON debug logging to file")
     parser.add_argument("--output-json", action="store_true", help="Output results as JSON")
+    parser.add_argument(
+        "--no-broker",
+        action="store_true",
+        help="Connect directly even when a session broker is running",
+    )
+    parser.add_argument(
+        "--channels",
+        type=int,
+        default=1,
+        help=f"Parallel shells per switch for multi-command collections (max {ZYXEL_MAX_CHANNELS})",
+    )
+    parser.add_argument(
+        "--refresh-ports",
+        action="store_true",
+        help="Rediscover the switch's port count instead of using the cached one",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        help="Accept cached output of show commands up to this many seconds old "
+        "(default: per command, e.g. 3600 for version)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor write the local result cache",
+    )
+    parser.add_argument(
+        "--prompt-pattern",
+        help="Regex matching the switch prompt (default: learned from the login prompt)",
+    )
+
+    fleet = parser.add_argument_group("fleet mode")
+    fleet.add_argument(
+        "--hosts", help="Comma-separated list of [user@]host[:port] to run the command on"
+    )
+    fleet.add_argument(
+        "--inventory", help="File with one [user@]host[:port] per line to run the command on"
+    )
+    fleet.add_argument(
+        "--workers", type=int, default=16, help="Hosts worked on concurrently (default: 16)"
+    )
+    fleet.add_argument(
+        "--host-timeout",
+        type=float,
+        default=120.0,
+        help="Seconds before a host is given up on (default: 120)",
+    )
 
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
     subparsers.add_parser("version", help="Show switch version")
     subparsers.add_parser("config", help="Show running configuration")
-    subparsers.add_parser("interfaces", help="Show interface status")
-    subparsers.add_parser("vlans", help="Show VLAN configuration")
-    subparsers.add_parser("mac-table", help="Show MAC address table")
+    interfaces_parser = subparsers.add_parser("interfaces", help="Show interface status")
+    interfaces_parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Fetch all interfaces with one 'show interfaces' (falls back to one per port)",
+    )
+    interfaces_parser.add_argument(
+        "--rates",
+        action="store_true",
+        help="Show per-second counter rates since the previous --rates run instead",
+    )
+    interfaces_parser.add_argument(
+        "--link-speed",
+        type=float,
+        help="--rates: fastest port speed in Mb/s, so busy ports' counter wraps are not "
+        "taken for resets (default: assume at most 2^31 growth between runs)",
+    )
+    interfaces_parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Also append the counters to the local history read by 'history'",
+    )
+    vlans_parser = subparsers.add_parser("vlans", help="Show VLAN configuration")
+    vlans_parser.add_argument(
+        "--compact",
+        action="store_true",
+        help='With --output-json, give port lists as ranges ("1-24,lag1-8") instead of lists',
+    )
+    history_parser = subparsers.add_parser(
+        "history", help="Show counter history recorded with --record, without connecting"
+    )
+    history_parser.add_argument("--interface", type=int, help="Only this interface ID")
+    history_parser.add_argument(
+        "--since", default="1d", help="Start of the range, e.g. 30m, 6h, 7d (default: 1d)"
+    )
+    history_parser.add_argument("--until", help="End of the range as an age (default: now)")
+    history_parser.add_argument(
+        "--step", help="Sum the deltas into buckets of this length, e.g. 5m or 1h"
+    )
+    history_parser.add_argument(
+        "--counters",
+        default="bytes_input,bytes_output,input_errors,output_errors",
+        help="Comma-separated counters to show (default: bytes and errors)",
+    )
+
+    mac_table_parser = subparsers.add_parser("mac-table", help="Show MAC address table")
+    mac_table_parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Also store the table in the local MAC index used by mac-lookup",
+    )
+    mac_table_parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Only show MACs added, removed or moved since the last indexed table",
+    )
+    mac_lookup_parser = subparsers.add_parser(
+        "mac-lookup", help="Find MACs in the local index without connecting to a switch"
+    )
+    mac_lookup_parser.add_argument("mac", nargs="?", help="MAC address to locate")
+    mac_lookup_parser.add_argument("--vlan", type=int, help="List the MACs seen in this VLAN")
+    mac_lookup_parser.add_argument(
+        "--switch-port", help="List the MACs seen on this port of the -H switch"
+    )
 
     exec_parser = subparsers.add_parser("exec", help="Execute custom command")
     exec_parser.add_argument("exec_command", help="Command to execute")
 
     subparsers.add_parser("interactive", help="Interactive shell")
 
+    watch_parser = subparsers.add_parser(
+        "watch", help="Re-run a command on an interval over one session, printing NDJSON"
+    )
+    watch_parser.add_argument("target", choices=[*COMMANDS, "interfaces", "exec"])
+    watch_parser.add_argument("exec_command", nargs="?", help="Command to run for 'exec'")
+    watch_parser.add_argument(
+        "--interval", type=float, default=60.0, help="Seconds between polls (default: 60)"
+    )
+    watch_parser.add_argument("--count", type=int, help="Stop after this many polls")
+    watch_parser.add_argument(
+        "--bulk", action="store_true", help="interfaces: fetch all with one 'show interfaces'"
+    )
+    watch_parser.add_argument(
+        "--rates", action="store_true", help="interfaces: report counter rates between polls"
+    )
+    watch_parser.add_argument(
+        "--link-speed", type=float, help="interfaces: fastest port speed in Mb/s for --rates"
+    )
+    watch_parser.add_argument(
+        "--record", action="store_true", help="interfaces: append counters to the history"
+    )
+    watch_parser.add_argument(
+        "--diff", action="store_true", help="mac-table: report only changes between polls"
+    )
+    watch_parser.set_defaults(index=False, compact=False)
+
+    metrics_parser = subparsers.add_parser(
+        "serve-metrics",
+        help="Serve switch statistics for Prometheus on /metrics (runs in the foreground)",
+    )
+    metrics_parser.add_argument(
+        "--listen",
+        default="127.0.0.1:9550",
+        help="Address and port to serve on, IPv6 as [::1]:9550 (default: 127.0.0.1:9550)",
+    )
+    metrics_parser.add_argument(
+        "--interval",
+        type=float,
+        default=60.0,
+        help="Seconds between collections from the switches (default: 60)",
+    )
+    metrics_parser.add_argument(
+        "--bulk", action="store_true", help="Fetch interfaces with one 'show interfaces'"
+    )
+    metrics_parser.set_defaults(rates=False, record=False, link_speed=None)
+
+    broker_parser = subparsers.add_parser(
+        "broker", help="Keep sessions open for later invocations (runs in the foreground)"
+    )
+    broker_parser.add_argument(
+        "--socket", help="Unix socket to listen on (default: $ZYXEL_BROKER_SOCKET or per-user)"
+    )
+    broker_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=BROKER_IDLE_TIMEOUT,
+        help=f"Close sessions idle for this many seconds (default: {BROKER_IDLE_TIMEOUT:g})",
+    )
+
     return parser
 
 
-def handle_args(*, args: argparse.Namespace) -> str | None:
-    """Execute the requested action described by parsed `args`.
+def run_command(session: Session, args: argparse.Namespace) -> tuple[str, Any]:
+    """Run the non-interactive subcommand described by `args` on `session`.
 
-    Returns output string for non-interactive commands, or None for interactive.
+    Returns the plain-text output and, with `--output-json`, its parsed form
+    (None otherwise).
     """
-    import json
-
-    from .logging_config import setup_logging
     from .parsing import parse_output
 
-    setup_logging(debug=args.debug)
-
-    password = resolve_password(password=args.password, user=args.user, host=args.host)
+    # Per-switch state follows the session's switch: in fleet and metrics runs
+    # that is not the -H/--port one
+    host, ssh_port = session.host, session.port
 
-    cmd_str = args.command
     if args.command == "exec":
-        cmd_str = f"exec: {args.exec_command}"
+        output = session.execute_command(command=args.exec_command)
+        # Log output (escaping newlines could be good but raw string in JSON
+        # is handled by json.dumps)
+        LOGGER.debug(
+            "Command result",
+            extra={"host": host, "command": args.exec_command, "output": output},
+        )
+
+        result = None
+        if args.output_json:
+            result = parse_output(args.exec_command, output)
 
-    LOGGER.debug(f"Connecting to {args.host}", extra={"host": args.host, "command": cmd_str})
-
-    with ZyxelSession(host=args.host, user=args.user, password=password, port=args.port) as session:
-        if args.command == "interactive":
-            session.interactive()
-            return None
-        elif args.command == "exec":
-            output = session.execute_command(command=args.exec_command)
-            # Log output (escaping newlines could be good but raw string in JSON
-            # is handled by json.dumps)
             LOGGER.debug(
-                "Command result",
-                extra={"host": args.host, "command": args.exec_command, "output": output},
+                "Parsed json result",
+                extra={"host": host, "command": args.exec_command, "output": result},
             )
-
-            if args.output_json:
-                result = parse_output(args.exec_command, output)
-
-                LOGGER.debug(
-                    "Parsed json result",
-                    extra={"host": args.host, "command": args.exec_command, "output": result},
+        return output, result
+
+    if args.command == "interfaces":
+        # Special handling: iterate through all port IDs
+        LOGGER.debug(
+            "Collecting all interfaces",
+            extra={"host": host, "command": "interfaces"},
+        )
+
+        interfaces = collect_interfaces(session, args)
+        # Parse each interface once for everything below that needs the fields
+        parsed = (
+            {port_id: parse_interface_output(port_output) for port_id, port_output in interfaces}
+            if args.rates or args.record or args.output_json
+            else {}
+        )
+
+        if args.record:
+            with CounterHistory(default_history_path(host, ssh_port)) as history:
+                written = history.append(
+                    {port_id: fields.get("statistics", {}) for port_id, fields in parsed.items()}
                 )
+            LOGGER.debug(f"Recorded {written} history records", extra={"host": host})
+
+        if args.rates:
+            return interface_rates(host, ssh_port, parsed, link_speed=args.link_speed)
+
+        # Combine all outputs
+        output_parts = []
+        for port_id, port_output in interfaces:
+            output_parts.append(f"=== Interface {port_id} ===")
+            output_parts.append(port_output)
+            output_parts.append("")  # Empty line between interfaces
+
+        output = "\n".join(output_parts)
+
+        LOGGER.debug(
+            "Command result",
+            extra={"host": host, "command": "interfaces", "output": output},
+        )
+
+        result = None
+        if args.output_json:
+            # For JSON output, create a structured format with parsed data
+            result = {
+                "interfaces": [
+                    {
+                        "port_id": port_id,
+                        "parsed": parsed[port_id],
+                        "raw_output": port_output,
+                    }
+                    for port_id, port_output in interfaces
+                ]
+            }
 
-                print(json.dumps(result, indent=2))
-            else:
-                print(output)
-            return output
-        elif args.command == "interfaces":
-            # Special handling: iterate through all port IDs
             LOGGER.debug(
-                "Collecting all interfaces",
-                extra={"host": args.host, "command": "interfaces"},
+                "Parsed json result",
+                extra={"host": host, "command": "interfaces", "output": result},
             )
+        return output, result
+
+    cmd = COMMANDS.get(args.command)
+    if not cmd:
+        raise ValueError(f"Unsupported command: {args.command}")
+
+    output = session.execute_command(command=cmd)
+    LOGGER.debug("Command result", extra={"host": host, "command": cmd, "output": output})
+
+    result = None
+    if args.output_json:
+        result = parse_output(cmd, output)
+
+        LOGGER.debug(
+            "Parsed json result",
+            extra={"host": host, "command": args.command, "output": result},
+        )
+
+    if args.command == "vlans" and args.compact and result is not None:
+        for vlan in result:
+            for key in ("untagged_ports", "tagged_ports"):
+                if key in vlan:
+                    vlan[key] = PortSet.from_ports(vlan[key]).to_range()
+
+    if args.command == "mac-table" and (args.index or args.diff):
+        entries = result if result is not None else parse_output(cmd, output)
+        with MacIndex() as mac_index:
+            if args.diff:
+                # The index holds the previous table; the new one replaces it
+                diff = diff_mac_tables(mac_index.host_entries(host, ssh_port=ssh_port), entries)
+                output = diff.to_text()
+                result = diff.to_dict() if args.output_json else None
+            count = mac_index.replace_host(host, entries, ssh_port=ssh_port)
+        LOGGER.debug(f"Indexed {count} MAC entries", extra={"host": host})
+    return output, result
+
+
+def interface_rates(
+    host: str,
+    port: int,
+    parsed: dict[int, dict[str, Any]],
+    *,
+    link_speed: float | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Return the counter rates of the interfaces that changed since the last run.
+
+    `link_speed` is the fastest port's speed in Mb/s, if known.
+    """
+    engine = RateEngine(
+        default_cache_dir() / "counters" / f"{host}_{port}.json",
+        link_speed=None if link_speed is None else link_speed * 1_000_000,
+    )
+    changed = engine.update(
+        host, {port_id: fields.get("statistics", {}) for port_id, fields in parsed.items()}
+    )
+    engine.save()
+
+    lines = []
+    for rates in changed:
+        summary = ", ".join(f"{name} {rate:.1f}/s" for name, rate in rates.rates.items())
+        if rates.reset:
+            summary += f"{', ' if summary else ''}reset: {', '.join(rates.reset)}"
+        lines.append(f"Interface {rates.interface}: {summary}")
+    return "\n".join(lines), {"rates": [rates.to_dict() for rates in changed]}
+
+
+def counter_history(args: argparse.Namespace) -> tuple[str, list[dict[str, Any]]]:
+    """Answer a history query from the switch's local ring file"""
+    path = default_history_path(args.host, args.port)
+    if not path.exists():
+        raise ValueError(f"No history recorded for {args.host}; use 'interfaces --record'")
+
+    now = time.time()
+    start = now - parse_duration(args.since)
+    end = now - parse_duration(args.until) if args.until else None
+    counters = [name.strip() for name in args.counters.split(",") if name.strip()]
+    with CounterHistory(path) as history:
+        unknown = set(counters) - set(history.counters)
+        if unknown:
+            raise ValueError(f"Unknown counters: {', '.join(sorted(unknown))}")
+        if args.step:
+            records = history.downsample(
+                parse_duration(args.step), start=start, end=end, port=args.interface
+            )
+        else:
+            records = list(history.query(start=start, end=end, port=args.interface))
+
+    rows = []
+    lines = []
+    for record in records:
+        record.deltas = {name: record.deltas[name] for name in counters}
+        rows.append(record.to_dict())
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.time))
+        values = "  ".join(f"{name}={value}" for name, value in record.deltas.items())
+        reset = "  (reset)" if record.flags & FLAG_RESET else ""
+        lines.append(f"{when}  interface {record.port}  {values}{reset}")
+    return "\n".join(lines), rows
+
+
+def mac_lookup(args: argparse.Namespace) -> tuple[str, list[dict[str, Any]]]:
+    """Answer a mac-lookup query from the local index"""
+    if args.mac:
+        # Reject typos before touching the index
+        mac_to_int(args.mac)
+    with MacIndex() as mac_index:
+        if args.mac:
+            locations = mac_index.lookup(args.mac)
+        elif args.vlan is not None:
+            locations = mac_index.in_vlan(args.vlan)
+        elif args.switch_port:
+            if not args.host:
+                raise ValueError("--switch-port needs the switch given with -H/--host")
+            locations = mac_index.on_port(args.host, args.switch_port, ssh_port=args.port)
+        else:
+            raise ValueError("Give a MAC address, --vlan or --switch-port")
 
-            interfaces = collect_all_interfaces(lambda cmd: session.execute_command(command=cmd))
+    lines = [
+        f"{location.mac}  {location.switch}  port {location.port}  vlan {location.vid}  "
+        f"{location.type}  seen {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(location.seen))}"
+        for location in locations
+    ]
+    return "\n".join(lines), [location.to_dict() for location in locations]
 
-            # Combine all outputs
-            output_parts = []
-            for port_id, port_output in interfaces:
-                output_parts.append(f"=== Interface {port_id} ===")
-                output_parts.append(port_output)
-                output_parts.append("")  # Empty line between interfaces
 
-            output = "\n".join(output_parts)
+def stream_command(args: argparse.Namespace) -> str | None:
+    """Return the switch command whose plain-text output can be streamed, if any"""
+    if args.output_json or (args.command == "mac-table" and (args.index or args.diff)):
+        return None
+    if args.command == "exec":
+        return str(args.exec_command)
+    return COMMANDS.get(args.command)
 
-            LOGGER.debug(
-                "Command result",
-                extra={"host": args.host, "command": "interfaces", "output": output},
+
+def collect_interfaces(session: Session, args: argparse.Namespace) -> list[tuple[int, str]]:
+    """Return (port_id, output) for every interface of the switch.
+
+    With `--bulk` the all-interfaces form is tried first. Otherwise, or when
+    the switch does not support it, one command per port is sent, for the
+    port count from the cache or discovered from `show vlan`. Either count
+    is checked against the port after it, so ports in no VLAN are still
+    found and the cache always ends up with the count actually seen.
+    """
+    host, ssh_port = session.host, session.port
+    port_cache = PortCountCache()
+
+    if args.bulk:
+        bulk_interfaces = collect_interfaces_bulk(lambda cmd: session.execute_command(command=cmd))
+        if bulk_interfaces is not None:
+            port_cache.set(host, ssh_port, len(bulk_interfaces))
+            return bulk_interfaces
+        LOGGER.debug("Bulk interface listing unavailable, probing ports", extra={"host": host})
+
+    execute_many_fn: Callable[[list[str]], list[str]]
+    if args.channels > 1:
+        # One pipelined batch per channel in every round
+        def execute_many_fn(cmds: list[str]) -> list[str]:
+            return session.execute_parallel(cmds, channels=args.channels)
+
+        batch_size = 8 * min(args.channels, ZYXEL_MAX_CHANNELS)
+    else:
+        execute_many_fn = session.execute_many
+        batch_size = 8
+
+    port_count = None if args.refresh_ports else port_cache.get(host, ssh_port)
+    if port_count is None:
+        port_count = count_ports_from_vlans(session.execute_command(command="show vlan"))
+        LOGGER.debug(f"Discovered {port_count} ports", extra={"host": host})
+
+    interfaces = collect_all_interfaces(
+        lambda cmd: session.execute_command(command=cmd),
+        execute_many_fn=execute_many_fn,
+        batch_size=batch_size,
+        port_count=port_count,
+    )
+    if interfaces:
+        # Also corrects a count that turned out too high or too low
+        port_cache.set(host, ssh_port, len(interfaces))
+    return interfaces
+
+
+def make_session(
+    *, args: argparse.Namespace, host: str, user: str, password: str, port: int
+) -> Session:
+    """Return a session for `host`, going through the broker when one is running.
+
+    Unless `--no-cache` is given, read-only commands are answered from the
+    result cache when possible and the switch is only connected to on a miss.
+    """
+
+    def open_session() -> Session:
+        socket_path = default_socket_path()
+        if not args.no_broker and broker_available(socket_path):
+            LOGGER.debug(f"Using broker at {socket_path}", extra={"host": host})
+            return BrokerSession(
+                socket_path,
+                host=host,
+                user=user,
+                password=password,
+                port=port,
+                prompt_pattern=args.prompt_pattern,
             )
 
-            if args.output_json:
-                # For JSON output, create a structured format with parsed data
-                result = {
-                    "interfaces": [
-                        {
-                            "port_id": port_id,
-                            "parsed": parse_interface_output(port_output),
-                            "raw_output": port_output,
-                        }
-                        for port_id, port_output in interfaces
-                    ]
-                }
-
-                LOGGER.debug(
-                    "Parsed json result",
-                    extra={"host": args.host, "command": "interfaces", "output": result},
-                )
-                print(json.dumps(result, indent=2))
+        return ZyxelSession(
+            host=host,
+            user=user,
+            password=password,
+            port=port,
+            prompt_pattern=args.prompt_pattern,
+        )
+
+    # Indexed tables get a fresh `seen` time, so they must come from the switch
+    indexing = args.command == "mac-table" and (args.index or args.diff)
+    if args.no_cache or indexing:
+        return open_session()
+    return CachedSession(
+        open_session,
+        ResultCache(),
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        max_age=args.max_age,
+    )
+
+
+def fleet_targets(args: argparse.Namespace) -> list[Target]:
+    """Return the targets for fleet mode, or an empty list for a single host"""
+    targets = []
+    if args.inventory:
+        targets.extend(load_inventory(args.inventory, default_port=args.port))
+    if args.hosts:
+        targets.extend(
+            parse_target(spec.strip(), default_port=args.port)
+            for spec in args.hosts.split(",")
+            if spec.strip()
+        )
+    if targets and args.host:
+        targets.insert(0, Target(host=args.host, port=args.port))
+    return targets
+
+
+def handle_fleet(*, args: argparse.Namespace, targets: list[Target]) -> None:
+    """Run the subcommand on every target, printing each host's result as it finishes"""
+    import json
+
+    if args.command in ("interactive", "watch"):
+        raise ValueError(f"{args.command} cannot be used with several hosts")
+
+    password = resolve_password(
+        password=args.password, user=args.user, host=f"{len(targets)} hosts"
+    )
+
+    def open_session(target: Target) -> Session:
+        return make_session(
+            args=args,
+            host=target.host,
+            user=target.user or args.user,
+            password=password,
+            port=target.port,
+        )
+
+    failed = 0
+    for fleet_result in run_fleet(
+        targets,
+        open_session,
+        lambda session: run_command(session, args),
+        workers=args.workers,
+        host_timeout=args.host_timeout,
+    ):
+        host = fleet_result.target.host
+        if not fleet_result.ok:
+            failed += 1
+
+        if args.output_json:
+            record: dict[str, Any] = {"host": host, "ok": fleet_result.ok}
+            if fleet_result.ok:
+                record["result"] = fleet_result.value[1]
             else:
-                print(output)
-            return output
+                record["error"] = fleet_result.error
+            record["elapsed"] = round(fleet_result.elapsed, 3)
+            print(json.dumps(record), flush=True)
+        elif fleet_result.ok:
+            print(f"=== {host} ===\n{fleet_result.value[0]}\n", flush=True)
         else:
-            cmd = COMMANDS.get(args.command)
-            if cmd:
-                output = session.execute_command(command=cmd)
-                LOGGER.debug(
-                    "Command result", extra={"host": args.host, "command": cmd, "output": output}
-                )
+            print(f"{host}: Error: {fleet_result.error}", file=sys.stderr, flush=True)
+
+    if failed:
+        raise RuntimeError(f"{failed} of {len(targets)} hosts failed")
+
+
+def handle_watch(*, args: argparse.Namespace) -> None:
+    """Poll the watched command until interrupted, printing one JSON line per poll"""
+    import json
+
+    if args.target == "exec" and not args.exec_command:
+        raise ValueError("watch exec needs the command to run")
+    if args.interval <= 0:
+        raise ValueError("--interval must be positive")
 
-                if args.output_json:
-                    result = parse_output(cmd, output)
+    password = resolve_password(password=args.password, user=args.user, host=args.host)
+    # Every poll must reach the switch, so never answer from the result cache
+    poll_args = argparse.Namespace(
+        **{**vars(args), "command": args.target, "output_json": True, "no_cache": True}
+    )
+    command = args.exec_command if args.target == "exec" else args.target
+
+    def open_session() -> Session:
+        return make_session(
+            args=poll_args, host=args.host, user=args.user, password=password, port=args.port
+        )
+
+    for record in run_watch(
+        open_session,
+        lambda session: run_command(session, poll_args)[1],
+        interval=args.interval,
+        count=args.count,
+    ):
+        print(json.dumps({"host": args.host, "command": command, **record}), flush=True)
+
+
+def collect_metrics(session: Session, args: argparse.Namespace) -> SwitchSample:
+    """Collect everything serve-metrics exposes from one switch"""
+    interfaces = collect_interfaces(session, args)
+    return SwitchSample(
+        interfaces={
+            port_id: parse_interface_output(port_output) for port_id, port_output in interfaces
+        },
+        mac_entries=len(
+            parse_mac_table_output(session.execute_command(command=COMMANDS["mac-table"]))
+        ),
+        vlans=len(parse_vlan(session.execute_command(command=COMMANDS["vlans"]))),
+    )
+
+
+def handle_serve_metrics(*, args: argparse.Namespace) -> None:
+    """Collect from the switches on a schedule and serve the results on /metrics"""
+    targets = fleet_targets(args) or ([Target(host=args.host, port=args.port)] if args.host else [])
+    if not targets:
+        raise ValueError("No switch given: use -H/--host, --hosts or --inventory")
+    if args.interval <= 0:
+        raise ValueError("--interval must be positive")
+
+    address = parse_listen(args.listen)
+    password = resolve_password(
+        password=args.password, user=args.user, host=f"{len(targets)} hosts"
+    )
+    # Collections must reach the switches, so never answer from the result cache
+    collect_args = argparse.Namespace(**{**vars(args), "no_cache": True})
+
+    def open_session(target: Target) -> Session:
+        return make_session(
+            args=collect_args,
+            host=target.host,
+            user=target.user or args.user,
+            password=password,
+            port=target.port,
+        )
+
+    collector = MetricsCollector(
+        targets,
+        open_session,
+        lambda session: collect_metrics(session, collect_args),
+        interval=args.interval,
+        workers=args.workers,
+        host_timeout=args.host_timeout,
+    )
+    serve_metrics(collector, address)
+
+
+def handle_args(*, args: argparse.Namespace) -> str | None:
+    """Execute the requested action described by parsed `args`.
+
+    Returns the output string for buffered commands, or None for interactive
+    and fleet runs and for streamed output.
+    """
+    import json
+
+    from .logging_config import setup_logging
+
+    setup_logging(debug=args.debug)
+
+    if args.command == "broker":
+        serve_broker(
+            Path(args.socket) if args.socket else default_socket_path(),
+            idle_timeout=args.idle_timeout,
+        )
+        return None
+
+    if args.command == "history":
+        if not args.host:
+            raise ValueError("No switch given: use -H/--host")
+        output, rows = counter_history(args)
+        print(json.dumps(rows, indent=2) if args.output_json else output)
+        return output
+
+    if args.command == "serve-metrics":
+        handle_serve_metrics(args=args)
+        return None
+
+    if args.command == "mac-lookup":
+        output, locations = mac_lookup(args)
+        print(json.dumps(locations, indent=2) if args.output_json else output)
+        return output
+
+    targets = fleet_targets(args)
+    if targets:
+        handle_fleet(args=args, targets=targets)
+        return None
+
+    if not args.host:
+        raise ValueError("No switch given: use -H/--host, --hosts or --inventory")
+
+    if args.command == "watch":
+        handle_watch(args=args)
+        return None
+
+    password = resolve_password(password=args.password, user=args.user, host=args.host)
+
+    cmd_str = args.command
+    if args.command == "exec":
+        cmd_str = f"exec: {args.exec_command}"
+
+    LOGGER.debug(f"Connecting to {args.host}", extra={"host": args.host, "command": cmd_str})
+
+    if args.command == "interactive":
+        with ZyxelSession(
+            host=args.host,
+            user=args.user,
+            password=password,
+            port=args.port,
+            prompt_pattern=args.prompt_pattern,
+        ) as interactive_session:
+            interactive_session.interactive()
+        return None
+
+    with make_session(
+        args=args, host=args.host, user=args.user, password=password, port=args.port
+    ) as session:
+        streamed_command = stream_command(args)
+        if streamed_command:
+            # Print lines as they arrive so large outputs start showing at once
+            for line in session.iter_command(streamed_command):
+                print(line)
+            return None
 
-                    LOGGER.debug(
-                        "Parsed json result",
-                        extra={"host": args.host, "command": args.command, "output": result},
-                    )
-                    print(json.dumps(result, indent=2))
-                else:
-                    print(output)
-                return output
+        output, result = run_command(session, args)
 
-    return None
+    if args.output_json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(output)
+    return output
@@ -1 +1,16 @@
-ZYXEL_SLEEP_BETWEEN_COMMANDS = 0.2
+# Give up waiting for the prompt after this many seconds without new output
+ZYXEL_IDLE_TIMEOUT = 4.0
+
+# Matches the CLI prompt before the hostname is known, e.g. "GS1900#" or "Switch>"
+ZYXEL_PROMPT_PATTERN = r"^[\w.\-]+(?:\([\w\-]+\))?[>#]\s*$"
+
+# Turns off the "--More--" pager for the rest of the shell session
+ZYXEL_DISABLE_PAGER_COMMAND = "terminal length 0"
+
+ZYXEL_PAGER_MARKER = "--More--"
+
+# Output fragments the CLI prints when it rejects a command
+ZYXEL_ERROR_MARKERS = ("Invalid", "Unrecognized", "Incomplete", "Unknown", "% ")
+
+# Upper bound on concurrent shells per switch; GS1900 CPUs struggle with more
+ZYXEL_MAX_CHANNELS = 4
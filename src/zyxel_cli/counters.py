@@ -0,0 +1,189 @@
+"""Per-second rates from the cumulative interface counters.
+
+`parse_interface_output` returns counters such as `bytes_input` as the
+switch reports them: totals since boot that wrap around at 2^32. A
+`RateEngine` remembers the previous sample per (host, interface) and turns
+each new one into deltas and rates, treating a counter that went down as a
+wrap when that is plausible and as a reset otherwise.
+
+Without a link speed, a wrap is plausible when the counter grew by at most
+half its range, 2^31. On a busy fast port a real wrap can take more than
+that: a 1 Gb/s port moving more than about 286 Mb/s between 60 s polls. Give
+the engine the port's `link_speed` and it accepts any growth the link could
+have carried in the interval instead.
+"""
+
+import json
+import logging
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .port_cache import atomic_write_json
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+# GS1900 interface counters are 32 bits wide
+COUNTER_WIDTH = 32
+# Smallest Ethernet frame on the wire in bytes: 64, plus preamble and gap
+_MIN_FRAME_BYTES = 84
+
+
+def counter_delta(
+    previous: int,
+    current: int,
+    *,
+    width: int = COUNTER_WIDTH,
+    max_increase: int | None = None,
+) -> int | None:
+    """Return how much a counter grew between two samples, or None after a reset.
+
+    A counter lower than before either wrapped past 2^width or was reset
+    (switch reboot, `clear counters`). A wrap is assumed when it explains the
+    drop with an increase of at most `max_increase`, by default half the
+    counter range.
+    """
+    if current >= previous:
+        return current - previous
+    modulus = 1 << width
+    if max_increase is None:
+        max_increase = modulus // 2
+    if previous < modulus:
+        wrapped = current + modulus - previous
+        if wrapped <= max_increase:
+            return wrapped
+    return None
+
+
+def max_counter_increase(name: str, link_speed: float, interval: float) -> int:
+    """Return the most a counter can grow in `interval` seconds on a link.
+
+    `link_speed` is in bits per second. Byte counters can grow by the bytes the
+    link carries; all others, packets and errors alike, by at most one per
+    minimum-size frame.
+    """
+    max_bytes = link_speed / 8 * interval
+    if "bytes" in name:
+        return int(max_bytes)
+    return int(max_bytes / _MIN_FRAME_BYTES)
+
+
+@dataclass
+class InterfaceRates:
+    """What one interface's counters did since the previous sample"""
+
+    host: str
+    interface: str
+    interval: float
+    # Only counters that changed
+    deltas: dict[str, int] = field(default_factory=dict)
+    rates: dict[str, float] = field(default_factory=dict)
+    # Counters that went down without wrapping; no delta or rate for them
+    reset: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "host": self.host,
+            "interface": self.interface,
+            "interval": round(self.interval, 3),
+            "deltas": self.deltas,
+            "rates": {name: round(rate, 3) for name, rate in self.rates.items()},
+            "reset": self.reset,
+        }
+
+
+class RateEngine:
+    """Turns successive counter samples into deltas and per-second rates.
+
+    Samples are kept in memory, and in `state_path` when given, so separate
+    CLI runs can compute rates against the previous run. With `link_speed`
+    (bits per second) a drop is taken as a wrap whenever the link could have
+    carried the implied growth since the previous sample.
+    """
+
+    def __init__(
+        self,
+        state_path: Path | None = None,
+        *,
+        width: int = COUNTER_WIDTH,
+        link_speed: float | None = None,
+    ):
+        self.state_path = state_path
+        self.width = width
+        self.link_speed = link_speed
+        # (host, interface) -> (sample time, counters)
+        self._previous: dict[tuple[str, str], tuple[float, dict[str, int]]] = {}
+        if state_path is not None:
+            self._load()
+
+    def update(
+        self,
+        host: str,
+        statistics: Mapping[Any, Mapping[str, int]],
+        *,
+        now: float | None = None,
+    ) -> list[InterfaceRates]:
+        """Add a sample of `statistics` (counters by interface) for `host`.
+
+        Returns the interfaces whose counters changed since the previous
+        sample; interfaces seen for the first time are only remembered.
+        """
+        now = time.time() if now is None else now
+        changed = []
+        for interface, counters in statistics.items():
+            key = (host, str(interface))
+            previous = self._previous.get(key)
+            self._previous[key] = (now, dict(counters))
+            if previous is None or now <= previous[0]:
+                continue
+
+            rates = InterfaceRates(host=host, interface=str(interface), interval=now - previous[0])
+            previous_counters = previous[1]
+            for name, value in counters.items():
+                old_value = previous_counters.get(name)
+                if old_value is None or old_value == value:
+                    continue
+                max_increase = None
+                if self.link_speed is not None:
+                    max_increase = max_counter_increase(name, self.link_speed, rates.interval)
+                delta = counter_delta(old_value, value, width=self.width, max_increase=max_increase)
+                if delta is None:
+                    rates.reset.append(name)
+                else:
+                    rates.deltas[name] = delta
+                    rates.rates[name] = delta / rates.interval
+            if rates.deltas or rates.reset:
+                changed.append(rates)
+        return changed
+
+    def save(self) -> None:
+        """Write the latest samples to `state_path`"""
+        if self.state_path is None:
+            return
+        entries = [
+            {"host": host, "interface": interface, "time": sample_time, "counters": counters}
+            for (host, interface), (sample_time, counters) in self._previous.items()
+        ]
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.state_path, entries)
+        except OSError as err:
+            LOGGER.debug(f"Could not write counter state {self.state_path}: {err}")
+
+    def _load(self) -> None:
+        assert self.state_path is not None
+        try:
+            entries = json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return
+        for entry in entries if isinstance(entries, list) else []:
+            # Skip malformed entries; the next save drops them
+            try:
+                key = (str(entry["host"]), str(entry["interface"]))
+                sample_time = float(entry["time"])
+                counters = {str(name): int(value) for name, value in entry["counters"].items()}
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            self._previous[key] = (sample_time, counters)
@@ -0,0 +1,142 @@
+"""Run one subcommand against many switches concurrently."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .client import Session
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+
+@dataclass(frozen=True)
+class Target:
+    """A switch to connect to"""
+
+    host: str
+    port: int = 22
+    user: str | None = None
+
+
+@dataclass
+class FleetResult:
+    """Outcome of running the task against one target"""
+
+    target: Target
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_target(spec: str, *, default_port: int = 22) -> Target:
+    """Parse `[user@]host[:port]` into a Target.
+
+    Examples:
+        "192.168.1.1" -> Target("192.168.1.1", 22)
+        "admin@sw1:2222" -> Target("sw1", 2222, "admin")
+    """
+    user = None
+    if "@" in spec:
+        user, spec = spec.split("@", 1)
+
+    port = default_port
+    if spec.count(":") == 1:
+        spec, port_str = spec.split(":")
+        port = int(port_str)
+
+    return Target(host=spec, port=port, user=user or None)
+
+
+def load_inventory(path: str | Path, *, default_port: int = 22) -> list[Target]:
+    """Read targets from an inventory file, one `[user@]host[:port]` per line.
+
+    Blank lines and `#` comments are ignored.
+    """
+    targets = []
+    for line in Path(path).read_text().splitlines():
+        spec = line.split("#", 1)[0].strip()
+        if spec:
+            targets.append(parse_target(spec, default_port=default_port))
+    return targets
+
+
+def run_fleet(
+    targets: Iterable[Target],
+    open_session: Callable[[Target], Session],
+    task: Callable[[Session], Any],
+    *,
+    workers: int = 16,
+    host_timeout: float = 120.0,
+) -> Iterator[FleetResult]:
+    """Run `task` on a session to every target and yield results as hosts finish.
+
+    At most `workers` hosts are worked on at a time. A host still running
+    `host_timeout` seconds after it started is reported as failed and its
+    session is closed so the worker thread unblocks. A failing host never
+    affects the others.
+    """
+    sessions: dict[Target, Session] = {}
+    started: dict[Target, float] = {}
+    lock = threading.Lock()
+
+    def work(target: Target) -> Any:
+        with lock:
+            started[target] = time.monotonic()
+        session = open_session(target)
+        with lock:
+            sessions[target] = session
+        try:
+            session.connect()
+            return task(session)
+        finally:
+            session.close()
+
+    def result_for(target: Target, **kwargs: Any) -> FleetResult:
+        with lock:
+            elapsed = time.monotonic() - started.get(target, time.monotonic())
+        return FleetResult(target=target, elapsed=elapsed, **kwargs)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zyxel-fleet")
+    try:
+        pending: dict[Future[Any], Target] = {
+            # Duplicate targets would share bookkeeping, so run each once
+            executor.submit(work, target): target
+            for target in dict.fromkeys(targets)
+        }
+
+        while pending:
+            done, _ = wait(pending, timeout=min(1.0, host_timeout), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                target = pending.pop(future)
+                try:
+                    yield result_for(target, value=future.result())
+                except Exception as err:
+                    LOGGER.debug(f"Host failed: {err}", extra={"host": target.host})
+                    yield result_for(target, error=str(err))
+
+            now = time.monotonic()
+            for future, target in list(pending.items()):
+                with lock:
+                    start = started.get(target)
+                    session = sessions.get(target)
+                if start is None or now - start < host_timeout:
+                    continue
+
+                del pending[future]
+                future.cancel()
+                if session is not None:
+                    # Tear down the connection so the blocked worker returns
+                    session.close()
+                yield result_for(target, error=f"Timed out after {host_timeout:g}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
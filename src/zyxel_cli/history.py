@@ -0,0 +1,287 @@
+"""Counter history in fixed-size, memory-mapped ring files.
+
+Each switch gets one file, created at its full size up front:
+
+    header | last sample per port | ring of records
+
+A record is one port's counter deltas since its previous sample, with a
+fixed layout: time (u32 seconds), port ID (u16), flags (u16) and one u32
+delta per counter in `INTERFACE_COUNTERS`. Appending a poll touches one
+record per port plus that port's last sample; once the ring is full the
+oldest records are overwritten. Records are in time order, so range
+queries find their start with a binary search and only read the records
+they return.
+"""
+
+import fcntl
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .counters import counter_delta
+from .interface_utils import INTERFACE_COUNTERS
+from .port_cache import default_cache_dir
+
+# About a week of 5-minute polls of a 48-port switch with its LAGs
+HISTORY_RECORDS = 120_000
+# Interface IDs 0-127
+HISTORY_PORTS = 128
+
+# A counter went down without wrapping; its delta is the value since the reset
+FLAG_RESET = 1
+
+_MAGIC = b"ZXRB"
+_VERSION = 1
+# magic, version, counter count, counter names checksum, ports, records, head, filled
+_HEADER = struct.Struct("<4sHHIIIII")
+_HEADER_SIZE = 32
+_MAX_DELTA = 0xFFFFFFFF
+# Stored as a counter's last value until a sample has included that counter
+_NO_BASELINE = 2**64 - 1
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*([smhdw]?)")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(text: str) -> float:
+    """Parse "90", "90s", "15m", "6h", "7d" or "1w" into seconds"""
+    match = _DURATION.fullmatch(text.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {text!r}")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def default_history_path(host: str, port: int = 22) -> Path:
+    """Return the ring file for a switch under the cache directory"""
+    return default_cache_dir() / "history" / f"{host}_{port}.ring"
+
+
+@dataclass
+class HistoryRecord:
+    """Counter deltas of one port over the interval ending at `time`"""
+
+    time: int
+    port: int
+    deltas: dict[str, int] = field(default_factory=dict)
+    flags: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"time": self.time, "port": self.port, "deltas": self.deltas, "flags": self.flags}
+
+
+class CounterHistory:
+    """One switch's ring file of counter deltas"""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        records: int = HISTORY_RECORDS,
+        ports: int = HISTORY_PORTS,
+        counters: Sequence[str] = INTERFACE_COUNTERS,
+    ):
+        self.path = path
+        self.counters = tuple(counters)
+        self._record = struct.Struct(f"<IHH{len(self.counters)}I")
+        # time, whether there is a sample, counters
+        self._last = struct.Struct(f"<II{len(self.counters)}Q")
+        checksum = zlib.crc32(",".join(self.counters).encode())
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size == 0:
+                    header = _HEADER.pack(
+                        _MAGIC, _VERSION, len(self.counters), checksum, ports, records, 0, 0
+                    )
+                    os.ftruncate(self._fd, self._size(ports, records))
+                    os.pwrite(self._fd, header, 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+            self._map = mmap.mmap(self._fd, 0)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        layout = _HEADER.unpack_from(self._map, 0) if len(self._map) >= _HEADER_SIZE else None
+        if (
+            layout is None
+            or layout[:4] != (_MAGIC, _VERSION, len(self.counters), checksum)
+            or len(self._map) != self._size(layout[4], layout[5])
+        ):
+            self.close()
+            raise ValueError(f"{path} is not a counter history file of this layout")
+        self.ports, self.records = layout[4], layout[5]
+        self._ring_offset = _HEADER_SIZE + self.ports * self._last.size
+
+    def append(self, samples: Mapping[int, Mapping[str, int]], *, now: float | None = None) -> int:
+        """Record one poll: cumulative counters by interface ID.
+
+        Each port's deltas are taken against its last sample, which is kept in
+        the file; a port's first sample only sets that baseline. Ports without
+        any of the file's counters are skipped. A counter missing from a
+        port's sample records a delta of 0 and keeps its previous baseline; a
+        counter seen for the first time only sets its baseline. Returns the
+        number of records written.
+        """
+        timestamp = int(time.time() if now is None else now)
+        written = 0
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            *_, head, filled = _HEADER.unpack_from(self._map, 0)
+            for port, counters in samples.items():
+                if not 0 <= port < self.ports:
+                    continue
+                # None for counters missing from the sample
+                values = [
+                    None if value is None else min(int(value), _NO_BASELINE - 1)
+                    for value in (counters.get(name) for name in self.counters)
+                ]
+                if all(value is None for value in values):
+                    continue
+                last_offset = _HEADER_SIZE + port * self._last.size
+                _, seen, *last_values = self._last.unpack_from(self._map, last_offset)
+                if not seen:
+                    last_values = [_NO_BASELINE] * len(values)
+                self._last.pack_into(
+                    self._map,
+                    last_offset,
+                    timestamp,
+                    1,
+                    *(
+                        previous if current is None else current
+                        for previous, current in zip(last_values, values, strict=True)
+                    ),
+                )
+                if not seen:
+                    continue
+
+                flags = 0
+                deltas = []
+                for previous, current in zip(last_values, values, strict=True):
+                    if current is None or previous == _NO_BASELINE:
+                        deltas.append(0)
+                        continue
+                    delta = counter_delta(previous, current)
+                    if delta is None:
+                        flags |= FLAG_RESET
+                        delta = current
+                    deltas.append(min(delta, _MAX_DELTA))
+
+                self._record.pack_into(
+                    self._map,
+                    self._ring_offset + head * self._record.size,
+                    timestamp,
+                    port,
+                    flags,
+                    *deltas,
+                )
+                head = (head + 1) % self.records
+                filled = min(filled + 1, self.records)
+                written += 1
+
+            # Publish the records only once they are complete
+            struct.pack_into("<II", self._map, _HEADER.size - 8, head, filled)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return written
+
+    def query(
+        self,
+        *,
+        start: float | None = None,
+        end: float | None = None,
+        port: int | None = None,
+    ) -> Iterator[HistoryRecord]:
+        """Yield the records with `start <= time <= end`, oldest first.
+
+        The matching records are read under a shared lock, so an `append` from
+        another process cannot overwrite them halfway through the read.
+        """
+        rows = []
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            *_, head, filled = _HEADER.unpack_from(self._map, 0)
+            first = (head - filled) % self.records
+
+            def time_at(index: int) -> int:
+                offset = self._ring_offset + (first + index) % self.records * self._record.size
+                return int.from_bytes(self._map[offset : offset + 4], "little")
+
+            # Binary search for the first record at or after `start`
+            low, high = 0, filled
+            if start is not None:
+                while low < high:
+                    middle = (low + high) // 2
+                    if time_at(middle) < start:
+                        low = middle + 1
+                    else:
+                        high = middle
+
+            for index in range(low, filled):
+                offset = self._ring_offset + (first + index) % self.records * self._record.size
+                row = self._record.unpack_from(self._map, offset)
+                if end is not None and row[0] > end:
+                    break
+                if port is None or row[1] == port:
+                    rows.append(row)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        for timestamp, record_port, flags, *deltas in rows:
+            yield HistoryRecord(
+                time=timestamp,
+                port=record_port,
+                deltas=dict(zip(self.counters, deltas, strict=True)),
+                flags=flags,
+            )
+
+    def downsample(
+        self,
+        step: float,
+        *,
+        start: float | None = None,
+        end: float | None = None,
+        port: int | None = None,
+    ) -> list[HistoryRecord]:
+        """Sum the deltas per port into buckets of `step` seconds.
+
+        Each returned record's time is the start of its bucket.
+        """
+        buckets: dict[tuple[int, int], HistoryRecord] = {}
+        for record in self.query(start=start, end=end, port=port):
+            bucket_time = int(record.time // step * step)
+            bucket = buckets.get((bucket_time, record.port))
+            if bucket is None:
+                buckets[(bucket_time, record.port)] = HistoryRecord(
+                    time=bucket_time, port=record.port, deltas=record.deltas, flags=record.flags
+                )
+            else:
+                for name, delta in record.deltas.items():
+                    bucket.deltas[name] += delta
+                bucket.flags |= record.flags
+        return [buckets[key] for key in sorted(buckets)]
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+        os.close(self._fd)
+
+    def _size(self, ports: int, records: int) -> int:
+        return _HEADER_SIZE + ports * self._last.size + records * self._record.size
+
+    def __enter__(self) -> "CounterHistory":
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        self.close()
@@ -2,8 +2,15 @@
 
 import re
 from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import pairwise
 from typing import Any
 
+from .parsing import parse_vlan
+
+# First line of each interface's section, e.g. "GigabitEthernet1 is up"
+INTERFACE_HEADER = re.compile(r"^(\S+)\s+is\s+(?:up|down)", re.MULTILINE)
+
 
 def is_invalid_port_response(output: str) -> bool:
     """Check if the output indicates an invalid port ID.
@@ -17,134 +24,156 @@ def is_invalid_port_response(output: str) -> bool:
     return "Invalid port id" in output
 
 
-def parse_interface_output(output: str) -> dict[str, Any]:
-    """Parse individual interface output into structured data.
+def count_ports_from_vlans(output: str) -> int | None:
+    """Work out how many interface IDs the switch has from 'show vlan' output.
+
+    Interface IDs number the front ports first and the LAGs after them, so
+    "1-24,lag1-8" in the port lists means 32 IDs. Returns None when the
+    output lists no ports.
 
     Args:
-        output: Raw output from 'show interface <id>' command
+        output: Raw output from the 'show vlan' command
 
     Returns:
-        Dictionary containing parsed interface information including:
-        - name: Interface name (e.g., "GigabitEthernet1", "LAG8")
-        - status: "up" or "down"
-        - hardware: Hardware type
-        - duplex: Duplex setting
-        - speed: Speed setting
-        - media_type: Media type (e.g., "Copper")
-        - flow_control: Flow control status
-        - statistics: Dict of packet statistics
+        The number of interface IDs, or None if it cannot be told
     """
-    result: dict[str, Any] = {}
+    ports: set[str] = set()
+    for vlan in parse_vlan(output):
+        for key in ("untagged_ports", "tagged_ports"):
+            ports.update(vlan.get(key, []))
 
-    # Extract interface name and status from first line
-    # Example: "GigabitEthernet1 is up" or "LAG8 is down"
-    first_line_match = re.search(r"^(\S+)\s+is\s+(up|down)", output, re.MULTILINE)
-    if first_line_match:
-        result["name"] = first_line_match.group(1)
-        result["status"] = first_line_match.group(2)
+    front_ports = [int(port) for port in ports if port.isdigit()]
+    if not front_ports:
+        return None
+    lags = [
+        int(port[3:]) for port in ports if port.lower().startswith("lag") and port[3:].isdigit()
+    ]
+    return max(front_ports) + max(lags, default=0)
 
-    # Extract hardware type
-    # Example: "  Hardware is Gigabit Ethernet"
-    hardware_match = re.search(r"Hardware is (.+?)$", output, re.MULTILINE)
-    if hardware_match:
-        result["hardware"] = hardware_match.group(1).strip()
 
-    # Extract duplex, speed, and media type
-    # Example: "  Auto-duplex, Auto-speed, media type is Copper"
-    config_match = re.search(r"([\w-]+)-duplex,\s*([\w-]+)-speed,\s*media type is (\w+)", output)
-    if config_match:
-        result["duplex"] = config_match.group(1)
-        result["speed"] = config_match.group(2)
-        result["media_type"] = config_match.group(3)
+@dataclass(frozen=True)
+class _InterfaceLine:
+    """One kind of line in 'show interface' output and the fields it holds"""
 
-    # Extract flow control
-    # Example: "  flow-control is off"
-    flow_match = re.search(r"flow-control is (\w+)", output)
-    if flow_match:
-        result["flow_control"] = flow_match.group(1)
+    pattern: str
+    fields: tuple[str, ...]
+    # Counters go into "statistics" as ints, everything else is a string
+    statistics: bool = True
 
-    # Extract statistics
-    stats: dict[str, int] = {}
 
-    # Input statistics
+# In the order the fields appear in the parsed dictionary
+_INTERFACE_LINES = (
+    # Example: "GigabitEthernet1 is up" or "LAG8 is down"
+    _InterfaceLine(r"(\S+)\s+is\s+(up|down)", ("name", "status"), False),
+    # Example: "  Hardware is Gigabit Ethernet"
+    _InterfaceLine(r"Hardware is (.+?)$", ("hardware",), False),
+    # Example: "  Auto-duplex, Auto-speed, media type is Copper"
+    _InterfaceLine(
+        r"([\w-]+)-duplex,\s*([\w-]+)-speed,\s*media type is (\w+)",
+        ("duplex", "speed", "media_type"),
+        False,
+    ),
+    # Example: "  flow-control is off"
+    _InterfaceLine(r"flow-control is (\w+)", ("flow_control",), False),
     # Example: "     1059016090 packets input, 2902879441 bytes, 0 throttles"
-    input_match = re.search(r"(\d+) packets input, (\d+) bytes, (\d+) throttles", output)
-    if input_match:
-        stats["packets_input"] = int(input_match.group(1))
-        stats["bytes_input"] = int(input_match.group(2))
-        stats["throttles_input"] = int(input_match.group(3))
-
-    # Broadcasts and multicasts
+    _InterfaceLine(
+        r"(\d+) packets input, (\d+) bytes, (\d+) throttles",
+        ("packets_input", "bytes_input", "throttles_input"),
+    ),
     # Example: "     Received 57937948 broadcasts (82930444 multicasts)"
-    bcast_match = re.search(r"Received (\d+) broadcasts \((\d+) multicasts\)", output)
-    if bcast_match:
-        stats["broadcasts"] = int(bcast_match.group(1))
-        stats["multicasts"] = int(bcast_match.group(2))
-
-    # Input errors
+    _InterfaceLine(r"Received (\d+) broadcasts \((\d+) multicasts\)", ("broadcasts", "multicasts")),
     # Example: "     0 runts, 0 giants, 0 throttles"
-    runts_match = re.search(r"(\d+) runts, (\d+) giants", output)
-    if runts_match:
-        stats["runts"] = int(runts_match.group(1))
-        stats["giants"] = int(runts_match.group(2))
-
-    # More input errors
+    _InterfaceLine(r"(\d+) runts, (\d+) giants", ("runts", "giants")),
     # Example: "     0 input errors, 0 CRC, 0 frame, 0 overrun, 0 ignored"
-    errors_match = re.search(
+    _InterfaceLine(
         r"(\d+) input errors, (\d+) CRC, (\d+) frame, (\d+) overrun, (\d+) ignored",
-        output,
-    )
-    if errors_match:
-        stats["input_errors"] = int(errors_match.group(1))
-        stats["crc_errors"] = int(errors_match.group(2))
-        stats["frame_errors"] = int(errors_match.group(3))
-        stats["overrun_errors"] = int(errors_match.group(4))
-        stats["ignored_errors"] = int(errors_match.group(5))
-
-    # Multicast and pause input
+        ("input_errors", "crc_errors", "frame_errors", "overrun_errors", "ignored_errors"),
+    ),
     # Example: "     82930444 multicast, 0 pause input"
-    multicast_match = re.search(r"(\d+) multicast, (\d+) pause input", output)
-    if multicast_match:
-        stats["multicast"] = int(multicast_match.group(1))
-        stats["pause_input"] = int(multicast_match.group(2))
-
-    # Dribble condition
+    _InterfaceLine(r"(\d+) multicast, (\d+) pause input", ("multicast", "pause_input")),
     # Example: "     0 input packets with dribble condition detected"
-    dribble_match = re.search(r"(\d+) input packets with dribble condition", output)
-    if dribble_match:
-        stats["dribble_packets"] = int(dribble_match.group(1))
-
-    # Output statistics
+    _InterfaceLine(r"(\d+) input packets with dribble condition", ("dribble_packets",)),
     # Example: "     543385722 packets output, 2386478183 bytes, 0 underrun"
-    output_match = re.search(r"(\d+) packets output, (\d+) bytes, (\d+) underrun", output)
-    if output_match:
-        stats["packets_output"] = int(output_match.group(1))
-        stats["bytes_output"] = int(output_match.group(2))
-        stats["underrun"] = int(output_match.group(3))
-
-    # Output errors
+    _InterfaceLine(
+        r"(\d+) packets output, (\d+) bytes, (\d+) underrun",
+        ("packets_output", "bytes_output", "underrun"),
+    ),
     # Example: "     0 output errors, 0 collisions, 0 interface resets"
-    output_errors_match = re.search(
-        r"(\d+) output errors, (\d+) collisions, (\d+) interface resets", output
+    _InterfaceLine(
+        r"(\d+) output errors, (\d+) collisions, (\d+) interface resets",
+        ("output_errors", "collisions", "interface_resets"),
+    ),
+    # Example: "     0 babbles, 0 late collision, 0 deferred"
+    _InterfaceLine(
+        r"(\d+) babbles, (\d+) late collision, (\d+) deferred",
+        ("babbles", "late_collisions", "deferred"),
+    ),
+    # Example: "     0 PAUSE output"
+    _InterfaceLine(r"(\d+) PAUSE output", ("pause_output",)),
+)
+
+# Every counter in "statistics", in a fixed order
+INTERFACE_COUNTERS = tuple(
+    name for kind in _INTERFACE_LINES if kind.statistics for name in kind.fields
+)
+
+# All line kinds in one pattern, anchored after the indentation of a line, so
+# a single scan finds every field. Group "lineN" wraps the Nth kind.
+_INTERFACE_LINE = re.compile(
+    r"^[ \t]*(?:"
+    + "|".join(f"(?P<line{index}>{kind.pattern})" for index, kind in enumerate(_INTERFACE_LINES))
+    + ")",
+    re.MULTILINE,
+)
+# Line kind and the slice of `match.groups()` holding its fields, by group name
+_INTERFACE_GROUPS = {
+    f"line{index}": (
+        index,
+        slice(
+            _INTERFACE_LINE.groupindex[f"line{index}"],
+            _INTERFACE_LINE.groupindex[f"line{index}"] + len(kind.fields),
+        ),
     )
-    if output_errors_match:
-        stats["output_errors"] = int(output_errors_match.group(1))
-        stats["collisions"] = int(output_errors_match.group(2))
-        stats["interface_resets"] = int(output_errors_match.group(3))
+    for index, kind in enumerate(_INTERFACE_LINES)
+}
 
-    # More output errors
-    # Example: "     0 babbles, 0 late collision, 0 deferred"
-    babbles_match = re.search(r"(\d+) babbles, (\d+) late collision, (\d+) deferred", output)
-    if babbles_match:
-        stats["babbles"] = int(babbles_match.group(1))
-        stats["late_collisions"] = int(babbles_match.group(2))
-        stats["deferred"] = int(babbles_match.group(3))
 
-    # Pause output
-    # Example: "     0 PAUSE output"
-    pause_output_match = re.search(r"(\d+) PAUSE output", output)
-    if pause_output_match:
-        stats["pause_output"] = int(pause_output_match.group(1))
+def parse_interface_output(output: str) -> dict[str, Any]:
+    """Parse individual interface output into structured data.
+
+    The output is scanned once with a single precompiled pattern covering
+    every kind of line; the first line of each kind wins.
+
+    Args:
+        output: Raw output from 'show interface <id>' command
+
+    Returns:
+        Dictionary containing parsed interface information including:
+        - name: Interface name (e.g., "GigabitEthernet1", "LAG8")
+        - status: "up" or "down"
+        - hardware: Hardware type
+        - duplex: Duplex setting
+        - speed: Speed setting
+        - media_type: Media type (e.g., "Copper")
+        - flow_control: Flow control status
+        - statistics: Dict of packet statistics
+    """
+    found: dict[int, tuple[str, ...]] = {}
+    for match in _INTERFACE_LINE.finditer(output):
+        index, fields = _INTERFACE_GROUPS[match.lastgroup or ""]
+        if index not in found:
+            found[index] = match.groups()[fields]
+
+    result: dict[str, Any] = {}
+    stats: dict[str, int] = {}
+    for index, kind in enumerate(_INTERFACE_LINES):
+        values = found.get(index)
+        if values is None:
+            continue
+        if kind.statistics:
+            stats.update(zip(kind.fields, map(int, values), strict=True))
+        else:
+            result.update(zip(kind.fields, map(str.strip, values), strict=True))
 
     if stats:
         result["statistics"] = stats
@@ -152,15 +181,30 @@ def parse_interface_output(output: str) -> dict[str, Any]:
     return result
 
 
-def collect_all_interfaces(execute_fn: Callable[[str], str]) -> list[tuple[int, str]]:
+def collect_all_interfaces(
+    execute_fn: Callable[[str], str],
+    *,
+    execute_many_fn: Callable[[list[str]], list[str]] | None = None,
+    batch_size: int = 8,
+    port_count: int | None = None,
+) -> list[tuple[int, str]]:
     """Collect all valid interfaces by iterating through port IDs.
 
     Starts at port ID 1 and continues incrementing until receiving
-    "Invalid port id" response.
+    "Invalid port id" response. With a known `port_count` ports
+    1..port_count+1 are requested, in one batch with `execute_many_fn`;
+    should one of them be invalid the result ends before it. The extra port
+    checks that the count is complete: when it exists the count was too low
+    and probing carries on from there.
 
     Args:
         execute_fn: Function that executes a command and returns output.
                    Should accept a command string and return the output.
+        execute_many_fn: Optional function that executes a list of commands in
+                   one round trip and returns their outputs in order. When
+                   given, ports are probed `batch_size` at a time.
+        batch_size: Number of ports requested per batch with `execute_many_fn`
+        port_count: Number of interface IDs, if known (see `count_ports_from_vlans`)
 
     Returns:
         List of tuples containing (port_id, output) for each valid interface
@@ -168,6 +212,33 @@ def collect_all_interfaces(execute_fn: Callable[[str], str]) -> list[tuple[int,
     interfaces: list[tuple[int, str]] = []
     port_id = 1
 
+    if port_count is not None:
+        port_ids = list(range(1, port_count + 2))
+        commands = [f"show interface {pid}" for pid in port_ids]
+        if execute_many_fn is not None:
+            outputs = execute_many_fn(commands)
+        else:
+            outputs = [execute_fn(command) for command in commands]
+
+        for pid, output in zip(port_ids, outputs, strict=True):
+            if is_invalid_port_response(output):
+                return interfaces
+            interfaces.append((pid, output))
+        # Ports beyond the count exist (e.g. in no VLAN): probe the rest
+        port_id = port_count + 2
+
+    if execute_many_fn is not None:
+        while True:
+            port_ids = list(range(port_id, port_id + batch_size))
+            outputs = execute_many_fn([f"show interface {pid}" for pid in port_ids])
+
+            for pid, output in zip(port_ids, outputs, strict=True):
+                if is_invalid_port_response(output):
+                    return interfaces
+                interfaces.append((pid, output))
+
+            port_id += batch_size
+
     while True:
         command = f"show interface {port_id}"
         output = execute_fn(command)
@@ -179,3 +250,43 @@ def collect_all_interfaces(execute_fn: Callable[[str], str]) -> list[tuple[int,
         port_id += 1
 
     return interfaces
+
+
+def split_interface_blocks(output: str) -> list[str]:
+    """Split all-interfaces output into one block per interface.
+
+    Each block starts at an `<name> is up/down` header line and runs to the
+    next one. Anything before the first header (such as the echoed command)
+    is dropped.
+
+    Args:
+        output: Raw output from the 'show interfaces' command
+
+    Returns:
+        List of per-interface output blocks, in the order the switch listed them
+    """
+    starts = [match.start() for match in INTERFACE_HEADER.finditer(output)]
+    return [output[start:end].rstrip("\n") for start, end in pairwise([*starts, len(output)])]
+
+
+def collect_interfaces_bulk(
+    execute_fn: Callable[[str], str], *, command: str = "show interfaces"
+) -> list[tuple[int, str]] | None:
+    """Collect all interfaces with one all-interfaces command.
+
+    The switch lists interfaces in port ID order, so the Nth block belongs to
+    port ID N, the same numbering `collect_all_interfaces` uses.
+
+    Args:
+        execute_fn: Function that executes a command and returns output
+        command: The switch's all-interfaces command
+
+    Returns:
+        List of tuples containing (port_id, output) for each interface, or
+        None if the switch rejected the command or listed no interfaces
+    """
+    # A rejected command ("% Invalid command") has no interface headers
+    blocks = split_interface_blocks(execute_fn(command))
+    if not blocks:
+        return None
+    return list(enumerate(blocks, start=1))
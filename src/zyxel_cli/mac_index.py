@@ -0,0 +1,183 @@
+"""Local index of where MAC addresses were last seen across switches.
+
+`zyxel-cli mac-table --index` stores each switch's MAC table in a small
+SQLite database; `zyxel-cli mac-lookup` then answers "which switch and port
+is this MAC on?" from the index without connecting to any switch.
+"""
+
+import sqlite3
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from .mac_table_utils import MacTable, int_to_mac, mac_to_int
+from .port_cache import default_cache_dir
+
+# A switch is its host and SSH port, as in the other caches; `port` is the
+# switch port the MAC was seen on
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS macs (
+    host TEXT NOT NULL,
+    ssh_port INTEGER NOT NULL,
+    port TEXT NOT NULL,
+    vid INTEGER NOT NULL,
+    mac INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    seen REAL NOT NULL,
+    PRIMARY KEY (host, ssh_port, vid, mac)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS macs_by_mac ON macs (mac);
+CREATE INDEX IF NOT EXISTS macs_by_port ON macs (host, ssh_port, port);
+CREATE INDEX IF NOT EXISTS macs_by_vid ON macs (vid);
+"""
+_SCHEMA_VERSION = 2
+
+_COLUMNS = "host, ssh_port, port, vid, mac, type, seen"
+
+
+@dataclass(frozen=True)
+class MacLocation:
+    """Where a MAC address was seen"""
+
+    mac: str
+    host: str
+    ssh_port: int
+    port: str
+    vid: int
+    type: str
+    seen: float
+
+    @property
+    def switch(self) -> str:
+        """The switch as given on the command line: "host", or "host:port" off port 22"""
+        return self.host if self.ssh_port == 22 else f"{self.host}:{self.ssh_port}"
+
+    def to_dict(self) -> dict[str, str | int | float]:
+        return {
+            "mac": self.mac,
+            "host": self.host,
+            "ssh_port": self.ssh_port,
+            "port": self.port,
+            "vid": self.vid,
+            "type": self.type,
+            "seen": self.seen,
+        }
+
+
+class MacIndex:
+    """MAC table rows of many switches, indexed by MAC, switch port and VLAN.
+
+    Switches are identified by host and SSH port, so several switches
+    reached through one host on different ports keep separate rows.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_cache_dir() / "mac_index.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Fleet collections update the index from several threads and
+        # processes; wait for the writer instead of failing
+        self._db = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Check and build the schema under the write lock, so a second
+        # process opening a new index cannot drop rows the first just wrote
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                # The index only mirrors the switches: rebuild it, don't migrate
+                self._db.execute("DROP TABLE IF EXISTS macs")
+                for statement in _SCHEMA.split(";"):
+                    if statement.strip():
+                        self._db.execute(statement)
+                self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.commit()
+        except BaseException:
+            self._db.rollback()
+            raise
+
+    def replace_host(
+        self,
+        host: str,
+        entries: MacTable | Iterable[Mapping[str, str]],
+        *,
+        ssh_port: int = 22,
+        seen: float | None = None,
+    ) -> int:
+        """Replace everything known about a switch with `entries`; return the row count.
+
+        `entries` is a MacTable or rows as returned by `parse_mac_table_output`.
+        The switch's rows change in one transaction, so lookups never see a
+        half-updated switch.
+        """
+        seen = time.time() if seen is None else seen
+        if isinstance(entries, MacTable):
+            rows = [
+                (host, ssh_port, entry.port, entry.vid, entry.mac, entry.type, seen)
+                for entry in entries
+            ]
+        else:
+            rows = [
+                (
+                    host,
+                    ssh_port,
+                    entry["port"],
+                    int(entry["vid"]),
+                    mac_to_int(entry["mac"]),
+                    entry["type"],
+                    seen,
+                )
+                for entry in entries
+            ]
+
+        with self._db:
+            self._db.execute("DELETE FROM macs WHERE host = ? AND ssh_port = ?", (host, ssh_port))
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO macs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def host_entries(self, host: str, *, ssh_port: int = 22) -> list[dict[str, str]]:
+        """Return the switch's stored table in the format of `parse_mac_table_output`"""
+        return [
+            {"vid": str(row.vid), "mac": row.mac, "type": row.type, "port": row.port}
+            for row in self._select("host = ? AND ssh_port = ?", (host, ssh_port))
+        ]
+
+    def lookup(self, mac: str) -> list[MacLocation]:
+        """Return every switch, port and VLAN where `mac` was seen"""
+        return self._select("mac = ?", (mac_to_int(mac),))
+
+    def on_port(self, host: str, port: str, *, ssh_port: int = 22) -> list[MacLocation]:
+        """Return the MACs seen on one port of a switch"""
+        return self._select("host = ? AND ssh_port = ? AND port = ?", (host, ssh_port, port))
+
+    def in_vlan(self, vid: int) -> list[MacLocation]:
+        """Return the MACs seen in a VLAN on any switch"""
+        return self._select("vid = ?", (vid,))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _select(self, where: str, params: tuple[object, ...]) -> list[MacLocation]:
+        cursor = self._db.execute(
+            f"SELECT {_COLUMNS} FROM macs WHERE {where} ORDER BY host, ssh_port, vid, mac", params
+        )
+        return [
+            MacLocation(
+                mac=int_to_mac(mac),
+                host=host,
+                ssh_port=ssh_port,
+                port=port,
+                vid=vid,
+                type=kind,
+                seen=seen,
+            )
+            for host, ssh_port, port, vid, mac, kind, seen in cursor
+        ]
+
+    def __enter__(self) -> "MacIndex":
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        self.close()
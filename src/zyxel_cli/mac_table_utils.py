@@ -1,5 +1,22 @@
 """Utility functions for MAC address table parsing."""
 
+import re
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import overload
+
+# One data row: "    1 | AA:BB:CC:11:22:33 |    Management     | CPU \r".
+# The cells are captured without their padding, so rows need no strip().
+_MAC_ROW = re.compile(
+    r"[ \t]*(\d+)[ \t]*\|"
+    r"[ \t]*([0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){5})[ \t]*\|"
+    r"[ \t]*([^|\r\n]*?)[ \t]*\|"
+    r"[ \t]*([^|\r\n]*?)[ \t\r]*(?:\||$)"
+)
+# A MAC address with its separators removed
+_MAC_DIGITS = re.compile(r"[0-9A-Fa-f]{12}")
+
 
 def parse_mac_table_output(output: str) -> list[dict[str, str]]:
     """Parse MAC address table output into structured data.
@@ -15,49 +32,200 @@ def parse_mac_table_output(output: str) -> list[dict[str, str]]:
         - port: Port identifier
     """
     entries: list[dict[str, str]] = []
-    lines = output.splitlines()
+    match_row = _MAC_ROW.match
+    # Headers, separators, pager markers, totals and prompts never match a row
+    for line in output.splitlines():
+        row = match_row(line)
+        if row:
+            vid, mac, entry_type, port = row.groups()
+            entries.append({"vid": vid, "mac": mac, "type": entry_type, "port": port})
 
-    for line in lines:
-        # Skip empty lines
-        if not line.strip():
-            continue
+    return entries
 
-        # Skip header lines (contain "VID" or "MAC Address")
-        if "VID" in line or "MAC Address" in line:
-            continue
 
-        # Skip separator lines (contain dashes)
-        if line.strip().startswith("-"):
-            continue
+def mac_to_int(mac: str) -> int:
+    """Convert "AA:BB:CC:11:22:33" (any case, `:`, `-` or `.` separated) to an int"""
+    digits = re.sub(r"[:.-]", "", mac)
+    if not _MAC_DIGITS.fullmatch(digits):
+        raise ValueError(f"Invalid MAC address: {mac!r}")
+    return int(digits, 16)
 
-        # Skip "Total number of entries" line
-        if "Total number" in line:
-            continue
 
-        # Skip prompts and commands
-        if line.strip().startswith("GS1900") or line.strip().startswith("show "):
-            continue
+def int_to_mac(value: int) -> str:
+    """Convert a 48-bit int to "AA:BB:CC:11:22:33" """
+    return value.to_bytes(6, "big").hex(":").upper()
 
-        # Handle --More-- prompt (may appear with backspace characters)
-        if "--More--" in line:
-            continue
 
-        # Check if line contains pipe delimiters (actual data row)
-        if "|" not in line:
-            continue
+@dataclass(frozen=True, slots=True)
+class MacEntry:
+    """One row of a MacTable"""
 
-        # Split by pipe and extract fields
-        parts = [p.strip() for p in line.split("|")]
+    vid: int
+    mac: int
+    type: str
+    port: str
 
-        # Valid data rows should have 4 parts: VID, MAC, Type, Port
-        if len(parts) >= 4:
-            vid = parts[0].strip()
-            mac = parts[1].strip()
-            entry_type = parts[2].strip()
-            port = parts[3].strip()
+    def to_dict(self) -> dict[str, str]:
+        """Return the row in the format of `parse_mac_table_output`"""
+        return {
+            "vid": str(self.vid),
+            "mac": int_to_mac(self.mac),
+            "type": self.type,
+            "port": self.port,
+        }
 
-            # Validate that we have actual data (not empty or just whitespace)
-            if vid and mac and ":" in mac:
-                entries.append({"vid": vid, "mac": mac, "type": entry_type, "port": port})
 
-    return entries
+class MacTable:
+    """Columnar MAC address table for switches with thousands of entries.
+
+    Each row costs a few bytes in typed arrays instead of a dict of four
+    strings: VIDs and MACs are stored as integers, and the few distinct type
+    and port values are stored once and referenced by index. Rows are only
+    materialized as `MacEntry` when indexed or iterated; MACs are formatted
+    in upper case again when converted back.
+    """
+
+    def __init__(self) -> None:
+        self.vids = array("H")
+        self.macs = array("Q")
+        self._type_ids = array("H")
+        self._port_ids = array("H")
+        self.types: list[str] = []
+        self.ports: list[str] = []
+        self._type_index: dict[str, int] = {}
+        self._port_index: dict[str, int] = {}
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "MacTable":
+        """Parse 'show mac address-table' output given as a stream of lines"""
+        table = cls()
+        match_row = _MAC_ROW.match
+        for line in lines:
+            row = match_row(line)
+            if row:
+                vid, mac, entry_type, port = row.groups()
+                table.append(int(vid), int(mac.replace(":", ""), 16), entry_type, port)
+        return table
+
+    @classmethod
+    def from_output(cls, output: str) -> "MacTable":
+        """Parse complete 'show mac address-table' output"""
+        return cls.from_lines(output.splitlines())
+
+    def append(self, vid: int, mac: int, entry_type: str, port: str) -> None:
+        """Add one row"""
+        type_id = self._type_index.get(entry_type)
+        if type_id is None:
+            type_id = self._type_index[entry_type] = len(self.types)
+            self.types.append(entry_type)
+        port_id = self._port_index.get(port)
+        if port_id is None:
+            port_id = self._port_index[port] = len(self.ports)
+            self.ports.append(port)
+
+        self.vids.append(vid)
+        self.macs.append(mac)
+        self._type_ids.append(type_id)
+        self._port_ids.append(port_id)
+
+    def type_at(self, index: int) -> str:
+        return self.types[self._type_ids[index]]
+
+    def port_at(self, index: int) -> str:
+        return self.ports[self._port_ids[index]]
+
+    def to_dicts(self) -> list[dict[str, str]]:
+        """Return all rows in the format of `parse_mac_table_output`"""
+        types = self.types
+        ports = self.ports
+        return [
+            {"vid": str(vid), "mac": int_to_mac(mac), "type": types[t], "port": ports[p]}
+            for vid, mac, t, p in zip(self.vids, self.macs, self._type_ids, self._port_ids)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.macs)
+
+    @overload
+    def __getitem__(self, index: int) -> MacEntry: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[MacEntry]: ...
+
+    def __getitem__(self, index: int | slice) -> MacEntry | list[MacEntry]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return MacEntry(
+            self.vids[index], self.macs[index], self.type_at(index), self.port_at(index)
+        )
+
+    def __iter__(self) -> Iterator[MacEntry]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+@dataclass
+class MacTableDiff:
+    """What changed between two MAC tables of one switch.
+
+    Rows are in the format of `parse_mac_table_output`. A moved row is the
+    MAC's new location with `from_vid` and `from_port` added.
+    """
+
+    added: list[dict[str, str]]
+    removed: list[dict[str, str]]
+    moved: list[dict[str, str]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+    def to_dict(self) -> dict[str, list[dict[str, str]]]:
+        return {"added": self.added, "removed": self.removed, "moved": self.moved}
+
+    def to_text(self) -> str:
+        """One line per change: "+" added, "-" removed, "~" moved"""
+        lines = [f"+ {row['mac']}  vlan {row['vid']}  port {row['port']}" for row in self.added]
+        lines += [f"- {row['mac']}  vlan {row['vid']}  port {row['port']}" for row in self.removed]
+        lines += [
+            f"~ {row['mac']}  vlan {row['from_vid']}  port {row['from_port']}"
+            f" -> vlan {row['vid']}  port {row['port']}"
+            for row in self.moved
+        ]
+        return "\n".join(lines)
+
+
+def diff_mac_tables(
+    previous: Iterable[dict[str, str]], current: Iterable[dict[str, str]]
+) -> MacTableDiff:
+    """Compare two MAC tables of a switch in linear time.
+
+    Rows are matched by (MAC, VID). A row whose port changed is a move, and so
+    is a MAC that left exactly one VLAN and appeared in exactly one other.
+    Rows that did not change are not reported.
+    """
+    old = {(row["mac"].upper(), row["vid"]): row for row in previous}
+    new = {(row["mac"].upper(), row["vid"]): row for row in current}
+
+    moved = []
+    added: dict[str, list[dict[str, str]]] = {}
+    for key, row in new.items():
+        old_row = old.pop(key, None)
+        if old_row is None:
+            added.setdefault(key[0], []).append(row)
+        elif old_row["port"] != row["port"]:
+            moved.append({**row, "from_vid": old_row["vid"], "from_port": old_row["port"]})
+
+    # What is left of `old` was removed, unless its MAC reappeared elsewhere
+    removed: dict[str, list[dict[str, str]]] = {}
+    for (mac, _), row in old.items():
+        removed.setdefault(mac, []).append(row)
+    for mac in added.keys() & removed.keys():
+        if len(added[mac]) == 1 and len(removed[mac]) == 1:
+            row, old_row = added.pop(mac)[0], removed.pop(mac)[0]
+            moved.append({**row, "from_vid": old_row["vid"], "from_port": old_row["port"]})
+
+    return MacTableDiff(
+        added=[row for rows in added.values() for row in rows],
+        removed=[row for rows in removed.values() for row in rows],
+        moved=moved,
+    )
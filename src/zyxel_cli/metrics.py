@@ -0,0 +1,313 @@
+"""Prometheus exporter for switch statistics.
+
+`zyxel-cli serve-metrics` collects interface counters, link status, MAC table
+size and VLAN count from every switch on a fixed schedule and serves them on
+`/metrics`. Scrapes only read the text rendered after the last collection,
+so any number of Prometheus servers can scrape without causing SSH sessions
+to the switches.
+"""
+
+import logging
+import math
+import socket
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from .client import Session
+from .fleet import Target, run_fleet
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Collection takes from under a second (small switch, bulk) to minutes
+COLLECTION_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+@dataclass
+class SwitchSample:
+    """What one collection found on a switch"""
+
+    # parse_interface_output() results by interface ID
+    interfaces: dict[int, dict[str, Any]] = field(default_factory=dict)
+    mac_entries: int = 0
+    vlans: int = 0
+
+
+class Histogram:
+    """Cumulative histogram per label set, as Prometheus expects it.
+
+    Label sets are passed rendered, as `_labels` returns them.
+    """
+
+    def __init__(self, buckets: Iterable[float] = COLLECTION_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def observe(self, labels: str, value: float) -> None:
+        counts = self._counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        # The +Inf bucket counts every observation
+        counts[-1] += 1
+        self._sums[labels] = self._sums.get(labels, 0.0) + value
+
+    def render(self, name: str) -> list[str]:
+        lines = []
+        for labels, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts, strict=False):
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{name}_sum{{{labels}}} {self._sums[labels]:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {counts[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+def _switch_labels(switch: tuple[str, int]) -> str:
+    host, port = switch
+    return _labels(host=host, port=port)
+
+
+def parse_listen(spec: str) -> tuple[str, int]:
+    """Parse `[address]:port` into a server address.
+
+    IPv6 addresses go in brackets; an empty address listens on all IPv4 ones.
+
+    Examples:
+        "127.0.0.1:9550" -> ("127.0.0.1", 9550)
+        "[::1]:9550" -> ("::1", 9550)
+        ":9550" -> ("0.0.0.0", 9550)
+    """
+    if spec.startswith("["):
+        address, bracket, port = spec[1:].partition("]:")
+        if not bracket:
+            raise ValueError(f"Invalid listen address {spec!r}: expected [address]:port")
+    else:
+        address, colon, port = spec.rpartition(":")
+        if not colon:
+            raise ValueError(f"Invalid listen address {spec!r}: expected address:port")
+        if ":" in address:
+            raise ValueError(f"Invalid listen address {spec!r}: put IPv6 addresses in brackets")
+    if not port.isdigit() or not 0 <= int(port) <= 65535:
+        raise ValueError(f"Invalid listen port in {spec!r}")
+    return address or "0.0.0.0", int(port)
+
+
+class MetricsCollector:
+    """Collects samples from all targets on a schedule and renders them.
+
+    At most `workers` switches are collected at a time. After every round
+    the exposition text is rendered once; `snapshot` returns it without
+    touching the switches. Switches are told apart by host and SSH port, so
+    several switches behind one address are separate series.
+    """
+
+    def __init__(
+        self,
+        targets: list[Target],
+        open_session: Callable[[Target], Session],
+        collect: Callable[[Session], SwitchSample],
+        *,
+        interval: float = 60.0,
+        workers: int = 16,
+        host_timeout: float = 120.0,
+    ):
+        self.targets = targets
+        self.open_session = open_session
+        self.collect = collect
+        self.interval = interval
+        self.workers = workers
+        self.host_timeout = host_timeout
+        self.durations = Histogram()
+        # All by (host, SSH port)
+        self._samples: dict[tuple[str, int], SwitchSample] = {}
+        self._up: dict[tuple[str, int], bool] = {}
+        self._collected_at: dict[tuple[str, int], float] = {}
+        self._snapshot = self.render().encode()
+
+    def collect_once(self) -> None:
+        """Collect every target once and replace the snapshot"""
+        for result in run_fleet(
+            self.targets,
+            self.open_session,
+            self.collect,
+            workers=self.workers,
+            host_timeout=self.host_timeout,
+        ):
+            switch = (result.target.host, result.target.port)
+            self.durations.observe(_switch_labels(switch), result.elapsed)
+            self._up[switch] = result.ok
+            self._collected_at[switch] = time.time()
+            if result.ok:
+                self._samples[switch] = result.value
+            else:
+                LOGGER.debug(
+                    f"Collection failed: {result.error}", extra={"host": result.target.host}
+                )
+                # Never serve numbers from an older collection as current
+                self._samples.pop(switch, None)
+
+        # Scrapes read the attribute; replacing it whole keeps them consistent
+        self._snapshot = self.render().encode()
+
+    def run(self, stop: threading.Event) -> None:
+        """Collect every `interval` seconds until `stop` is set"""
+        start = time.monotonic()
+        rounds = 0
+        while not stop.is_set():
+            self.collect_once()
+            rounds = max(rounds + 1, math.floor((time.monotonic() - start) / self.interval) + 1)
+            stop.wait(max(0.0, start + rounds * self.interval - time.monotonic()))
+
+    def snapshot(self) -> bytes:
+        """Return the exposition text of the last collection"""
+        return self._snapshot
+
+    def render(self) -> str:
+        """Render all samples in the Prometheus text format"""
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: list[str]) -> None:
+            if samples:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+
+        switches = sorted(self._up)
+        family(
+            "zyxel_up",
+            "gauge",
+            "Whether the last collection from the switch succeeded",
+            [
+                f"zyxel_up{{{_switch_labels(switch)}}} {int(self._up[switch])}"
+                for switch in switches
+            ],
+        )
+        family(
+            "zyxel_last_collection_timestamp_seconds",
+            "gauge",
+            "When the switch was last collected",
+            [
+                f"zyxel_last_collection_timestamp_seconds{{{_switch_labels(switch)}}} "
+                f"{self._collected_at[switch]:.3f}"
+                for switch in switches
+            ],
+        )
+
+        samples = sorted(self._samples.items())
+        family(
+            "zyxel_mac_table_entries",
+            "gauge",
+            "Entries in the switch's MAC address table",
+            [
+                f"zyxel_mac_table_entries{{{_switch_labels(switch)}}} {sample.mac_entries}"
+                for switch, sample in samples
+            ],
+        )
+        family(
+            "zyxel_vlans",
+            "gauge",
+            "VLANs configured on the switch",
+            [
+                f"zyxel_vlans{{{_switch_labels(switch)}}} {sample.vlans}"
+                for switch, sample in samples
+            ],
+        )
+
+        link_lines = []
+        counters: dict[str, list[str]] = {}
+        for (host, port), sample in samples:
+            for port_id, parsed in sorted(sample.interfaces.items()):
+                labels = _labels(
+                    host=host, port=port, interface=port_id, name=parsed.get("name", "")
+                )
+                if "status" in parsed:
+                    link_lines.append(
+                        f"zyxel_interface_up{{{labels}}} {int(parsed['status'] == 'up')}"
+                    )
+                for counter, value in parsed.get("statistics", {}).items():
+                    counters.setdefault(counter, []).append(
+                        f"zyxel_interface_{counter}_total{{{labels}}} {value}"
+                    )
+        family("zyxel_interface_up", "gauge", "Whether the interface link is up", link_lines)
+        for counter, counter_lines in counters.items():
+            family(
+                f"zyxel_interface_{counter}_total",
+                "counter",
+                f"Interface {counter.replace('_', ' ')} as reported by the switch (wraps at 2^32)",
+                counter_lines,
+            )
+
+        duration = "zyxel_collection_duration_seconds"
+        lines.append(f"# HELP {duration} Time taken to collect a switch")
+        lines.append(f"# TYPE {duration} histogram")
+        lines.extend(self.durations.render(duration))
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] == "/metrics":
+            body = self.server.collector.snapshot()
+            content_type = METRICS_CONTENT_TYPE
+            status = 200
+        elif self.path == "/":
+            body = b'<html><body><a href="/metrics">Metrics</a></body></html>\n'
+            content_type = "text/html"
+            status = 200
+        else:
+            body = b"Not found\n"
+            content_type = "text/plain"
+            status = 404
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        LOGGER.debug(f"Metrics request: {format % args}")
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server answering `/metrics` from a MetricsCollector's snapshot"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], collector: MetricsCollector):
+        self.collector = collector
+        if ":" in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, _MetricsHandler)
+
+
+def serve_metrics(collector: MetricsCollector, address: tuple[str, int]) -> None:
+    """Collect in the background and serve `/metrics` until interrupted"""
+    server = MetricsServer(address, collector)
+    stop = threading.Event()
+    threading.Thread(
+        target=collector.run, args=(stop,), name="zyxel-metrics-collect", daemon=True
+    ).start()
+    host = f"[{address[0]}]" if ":" in address[0] else address[0]
+    print(f"Serving metrics on http://{host}:{server.server_port}/metrics", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
@@ -1,5 +1,7 @@
 from typing import Any
 
+from .templates import Template, TemplateRegistry
+
 
 def expand_port_range(port_str: str) -> list[str]:
     """
@@ -48,44 +50,13 @@ def expand_port_range(port_str: str) -> list[str]:
 
 def parse_version(output: str) -> dict[str, str]:
     """Parse 'show version' output."""
-    data = {}
-    for line in output.splitlines():
-        if ":" in line:
-            key, val = line.split(":", 1)
-            # Remove pipes if present (e.g. V2.00 | 07/08/2015)
-            val = val.split("|")[0].strip()
-            data[key.strip()] = val
-    return data
+    version: dict[str, str] = TEMPLATES.parse("show version", output)
+    return version
 
 
 def parse_vlan(output: str) -> list[dict[str, str | list[str]]]:
     """Parse 'show vlan' output."""
-    vlans = []
-    lines = output.splitlines()
-    header_found = False
-
-    for line in lines:
-        if "VID" in line and "VLAN Name" in line:
-            header_found = True
-            continue
-        if not header_found:
-            continue
-        if line.startswith("-") or not line.strip():
-            continue
-
-        parts = [p.strip() for p in line.split("|")]
-        if len(parts) >= 2:
-            vlan: dict[str, str | list[str]] = {
-                "vid": parts[0],
-                "name": parts[1],
-            }
-            if len(parts) > 2:
-                vlan["untagged_ports"] = expand_port_range(parts[2])
-            if len(parts) > 3:
-                vlan["tagged_ports"] = expand_port_range(parts[3])
-            if len(parts) > 4:
-                vlan["type"] = parts[4]
-            vlans.append(vlan)
+    vlans: list[dict[str, str | list[str]]] = TEMPLATES.parse("show vlan", output)
     return vlans
 
 
@@ -121,29 +92,27 @@ def parse_config(output: str) -> dict[str, Any]:
 
 
 def parse_output(command: str, output: str) -> Any:
-    """Dispatch output to appropriate parser."""
-    command = command.strip()
-
-    if command == "show version":
-        return parse_version(output)
-    elif command == "show vlan":
-        return parse_vlan(output)
-    elif command == "show interface status":
-        return parse_interfaces(output)
-    elif command == "show mac address-table":
-        return parse_mac_table(output)
-    elif command == "show running-config":
-        return parse_config(output)
-
-    # helper for mapped commands (aliases)
-    if command == "version":
-        return parse_version(output)
-    if command == "vlans":
-        return parse_vlan(output)
-    if command == "interfaces":
-        return parse_interfaces(output)
-    if command == "config":
-        return parse_config(output)
-
-    # Default fallback
-    return {"output": output}
+    """Dispatch output to the template of the (possibly abbreviated) command."""
+    return TEMPLATES.parse(command, output)
+
+
+TEMPLATES = TemplateRegistry(
+    (
+        # Version values may carry a date after a pipe (e.g. V2.00 | 07/08/2015)
+        Template("show version", aliases=("version",), key_value=True),
+        Template(
+            "show vlan",
+            aliases=("vlans",),
+            columns=("vid", "name", "untagged_ports", "tagged_ports", "type"),
+            start=r"VID.*VLAN Name",
+            transforms={"untagged_ports": expand_port_range, "tagged_ports": expand_port_range},
+        ),
+        Template("show interface status", aliases=("interfaces",), parse=parse_interfaces),
+        Template("show mac address-table", parse=parse_mac_table),
+        Template("show running-config", aliases=("config",), parse=parse_config),
+        # Tables keyed by their own header, e.g. "Port | Device ID" -> port, device_id
+        Template("show lldp neighbor"),
+        Template("show lag"),
+        Template("show arp"),
+    )
+)
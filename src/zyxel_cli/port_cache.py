@@ -0,0 +1,96 @@
+"""On-disk cache of how many interface IDs each switch has.
+
+The `interfaces` sweep needs the port count to send exactly the commands it
+needs. Working it out costs a command, so it is stored per host and port in
+a small JSON file and reused until it expires or turns out to be wrong.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+PORT_CACHE_TTL = 7 * 24 * 3600.0
+
+
+def default_cache_dir() -> Path:
+    """Return the cache directory from `ZYXEL_CACHE_DIR` or the per-user default"""
+    env_path = os.environ.get("ZYXEL_CACHE_DIR")
+    if env_path:
+        return Path(env_path)
+
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if cache_home:
+        return Path(cache_home) / "zyxel-cli"
+    return Path.home() / ".cache" / "zyxel-cli"
+
+
+def atomic_write_json(path: Path, data: object) -> None:
+    """Write `data` to `path` as JSON, replacing the file in one step.
+
+    The JSON goes to a temporary file in the same directory that is then
+    renamed over `path`, so readers never see half a file. Raises OSError.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.")
+    try:
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(data, tmp)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+class PortCountCache:
+    """Port counts keyed by `host:port`, each valid for `ttl` seconds"""
+
+    def __init__(self, path: Path | None = None, *, ttl: float = PORT_CACHE_TTL):
+        self.path = path or default_cache_dir() / "port_counts.json"
+        self.ttl = ttl
+
+    def get(self, host: str, port: int = 22) -> int | None:
+        """Return the cached port count, or None if unknown, expired or malformed.
+
+        A malformed entry is left for the next `set` to overwrite.
+        """
+        entry = self._load().get(f"{host}:{port}")
+        if not isinstance(entry, dict):
+            return None
+        try:
+            stored, count = float(entry["stored"]), int(entry["count"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if time.time() - stored > self.ttl:
+            return None
+        return count
+
+    def set(self, host: str, port: int, count: int) -> None:
+        """Remember `count` for the switch"""
+        entries = self._load()
+        entries[f"{host}:{port}"] = {"count": count, "stored": time.time()}
+        self._save(entries)
+
+    def invalidate(self, host: str, port: int = 22) -> None:
+        """Forget the switch's port count"""
+        entries = self._load()
+        if entries.pop(f"{host}:{port}", None) is not None:
+            self._save(entries)
+
+    def _load(self) -> dict[str, dict[str, float]]:
+        try:
+            entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self, entries: dict[str, dict[str, float]]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.path, entries)
+        except OSError as err:
+            # The cache only saves time; never fail a command over it
+            LOGGER.debug(f"Could not write port cache {self.path}: {err}")
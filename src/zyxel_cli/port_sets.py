@@ -0,0 +1,171 @@
+"""Compact port sets and VLAN membership.
+
+`expand_port_range` turns "1-24,lag1-8" into 32 strings. A `PortSet` keeps
+the same ports as two bitmaps, one for front ports and one for LAGs, so set
+operations are integer operations and a VLAN's membership costs two ints.
+"""
+
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+# "7", "1-24", "lag3", "lag1-8" or "lag1-lag8"
+_SEGMENT = re.compile(r"\s*(lag)?(\d+)(?:\s*-\s*(?:lag)?(\d+))?\s*", re.IGNORECASE)
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yield the numbers of the set bits in `mask`, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _ranges(mask: int) -> Iterator[tuple[int, int]]:
+    """Yield (first, last) of every run of set bits in `mask`"""
+    start = previous = -1
+    for bit in _bits(mask):
+        if bit != previous + 1:
+            if start >= 0:
+                yield start, previous
+            start = bit
+        previous = bit
+    if start >= 0:
+        yield start, previous
+
+
+@dataclass(frozen=True)
+class PortSet:
+    """Front ports and LAGs as bitmaps; bit n stands for port n or lag n"""
+
+    ports: int = 0
+    lags: int = 0
+
+    @classmethod
+    def from_range(cls, port_str: str) -> "PortSet":
+        """Parse a port list like "1-24,lag1-8"; "---" is the empty set"""
+        ports = lags = 0
+        for segment in port_str.split(","):
+            if not segment.strip() or segment.strip() == "---":
+                continue
+            match = _SEGMENT.fullmatch(segment)
+            if not match:
+                raise ValueError(f"Invalid port list segment: {segment!r}")
+            lag, first, last = match.groups()
+            start, end = int(first), int(last or first)
+            # All bits from start to end, inclusive
+            bits = ((1 << (end + 1)) - 1) ^ ((1 << start) - 1)
+            if lag:
+                lags |= bits
+            else:
+                ports |= bits
+        return cls(ports, lags)
+
+    @classmethod
+    def from_ports(cls, ports: Iterable[str | int]) -> "PortSet":
+        """Build a set from port names as returned by `expand_port_range`"""
+        return cls.from_range(",".join(str(port) for port in ports))
+
+    def to_range(self) -> str:
+        """Return the compact port list, e.g. "1-24,lag1-8", or "---" when empty"""
+        segments = [
+            f"{prefix}{first}" if first == last else f"{prefix}{first}-{last}"
+            for prefix, mask in (("", self.ports), ("lag", self.lags))
+            for first, last in _ranges(mask)
+        ]
+        return ",".join(segments) or "---"
+
+    def to_list(self) -> list[str]:
+        """Return the ports in the format of `expand_port_range`"""
+        return list(self)
+
+    def __contains__(self, port: object) -> bool:
+        name = str(port).strip().lower()
+        if name.startswith("lag"):
+            mask, name = self.lags, name[3:]
+        else:
+            mask = self.ports
+        return name.isdigit() and bool((mask >> int(name)) & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        for bit in _bits(self.ports):
+            yield str(bit)
+        for bit in _bits(self.lags):
+            yield f"lag{bit}"
+
+    def __len__(self) -> int:
+        return self.ports.bit_count() + self.lags.bit_count()
+
+    def __bool__(self) -> bool:
+        return bool(self.ports or self.lags)
+
+    def __or__(self, other: "PortSet") -> "PortSet":
+        return PortSet(self.ports | other.ports, self.lags | other.lags)
+
+    def __and__(self, other: "PortSet") -> "PortSet":
+        return PortSet(self.ports & other.ports, self.lags & other.lags)
+
+    def __sub__(self, other: "PortSet") -> "PortSet":
+        return PortSet(self.ports & ~other.ports, self.lags & ~other.lags)
+
+    def __str__(self) -> str:
+        return self.to_range()
+
+
+class VlanPortMatrix:
+    """Port x VLAN membership built from `parse_vlan` output.
+
+    Holds each VLAN's untagged and tagged ports as PortSets and, per port, the
+    VLANs it is in as a bitmap over VIDs, so both "which ports are in VLAN
+    20?" and "which VLANs is port 7 in?" are answered without a scan.
+    """
+
+    def __init__(self, vlans: Iterable[Mapping[str, Any]]):
+        self.untagged: dict[int, PortSet] = {}
+        self.tagged: dict[int, PortSet] = {}
+        self._untagged_vlans: dict[str, int] = {}
+        self._tagged_vlans: dict[str, int] = {}
+
+        for vlan in vlans:
+            vid = int(vlan["vid"])
+            for key, sets, port_vlans in (
+                ("untagged_ports", self.untagged, self._untagged_vlans),
+                ("tagged_ports", self.tagged, self._tagged_vlans),
+            ):
+                ports = vlan.get(key) or []
+                port_set = (
+                    PortSet.from_range(ports)
+                    if isinstance(ports, str)
+                    else PortSet.from_ports(ports)
+                )
+                sets[vid] = port_set
+                for port in port_set:
+                    port_vlans[port] = port_vlans.get(port, 0) | (1 << vid)
+
+    def members(self, vid: int) -> PortSet:
+        """Return every port in the VLAN, tagged or not"""
+        return self.untagged.get(vid, PortSet()) | self.tagged.get(vid, PortSet())
+
+    def vlans_of(self, port: str | int, *, tagged: bool | None = None) -> list[int]:
+        """Return the VIDs the port is in; `tagged` limits to one kind of membership"""
+        name = str(port).strip().lower()
+        mask = 0
+        if tagged is not True:
+            mask |= self._untagged_vlans.get(name, 0)
+        if tagged is not False:
+            mask |= self._tagged_vlans.get(name, 0)
+        return list(_bits(mask))
+
+    def to_dict(self) -> dict[str, dict[str, str]]:
+        """Return {vid: {"untagged": ranges, "tagged": ranges}} for compact JSON"""
+        return {
+            str(vid): {
+                "untagged": self.untagged[vid].to_range(),
+                "tagged": self.tagged.get(vid, PortSet()).to_range(),
+            }
+            for vid in sorted(self.untagged)
+        }
+
+    def __len__(self) -> int:
+        return len(self.untagged)
@@ -0,0 +1,227 @@
+"""On-disk cache of read-only command output.
+
+Dashboards and scripts tend to ask the same switch for the same `show`
+output several times a minute. `CachedSession` answers those from files
+under the cache directory and only connects to the switch on a miss. Each
+entry is one file written atomically, so concurrent CLI processes can share
+the cache, and the least recently used entries are evicted once the cache
+grows past its size limits.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+
+from .client import Session
+from .port_cache import atomic_write_json, default_cache_dir
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+# How long output stays valid without --max-age, by full command. Commands
+# not listed here (including every non-show command) are never cached.
+RESULT_CACHE_TTLS: dict[str, float] = {
+    "show version": 3600.0,
+    "show vlan": 60.0,
+    "show running-config": 60.0,
+    "show interface status": 10.0,
+}
+
+RESULT_CACHE_MAX_ENTRIES = 512
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache:
+    """Command output keyed by switch and command, one file per entry"""
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        *,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory or default_cache_dir() / "results"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def get(self, key: Sequence[object], *, max_age: float) -> str | None:
+        """Return the output stored for `key` if it is at most `max_age` seconds old"""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or not isinstance(entry.get("output"), str):
+            # Written by something else, or by an older version
+            return None
+        if time.time() - entry.get("stored", 0) > max_age:
+            return None
+
+        try:
+            # The modification time records use for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        output: str = entry["output"]
+        return output
+
+    def set(self, key: Sequence[object], output: str) -> None:
+        """Store `output` for `key`, evicting old entries beyond the size limits"""
+        try:
+            self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            atomic_write_json(self._path(key), {"stored": time.time(), "output": output})
+            self._evict()
+        except OSError as err:
+            # The cache only saves time; never fail a command over it
+            LOGGER.debug(f"Could not write result cache {self.directory}: {err}")
+
+    def _path(self, key: Sequence[object]) -> Path:
+        digest = hashlib.sha256(json.dumps(list(key)).encode()).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        count = len(entries)
+        size = sum(entry_size for _, entry_size, _ in entries)
+        entries.sort()
+        for _, entry_size, path in entries:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                # Another process evicted it first
+                pass
+            count -= 1
+            size -= entry_size
+
+
+def _complete(session: Session) -> bool:
+    """Whether the session's last command ran to its prompt.
+
+    ZyxelSession and BrokerSession say so in `complete`; sessions that cannot
+    tell count as complete.
+    """
+    return bool(getattr(session, "complete", True))
+
+
+class CachedSession:
+    """Session that answers cacheable commands from a ResultCache.
+
+    The real session is only opened on the first cache miss, so a run served
+    entirely from the cache never touches the network. `max_age` overrides
+    `RESULT_CACHE_TTLS` for every `show` command; other commands always go
+    to the switch. A `max_age` of 0 always asks the switch but still stores
+    the fresh output for later runs. Output is only stored when the session
+    says the command ran to its prompt, so a timed-out or abandoned command
+    is never served from the cache.
+
+    Entries are keyed by the exact command text, as the switch alone decides
+    what an abbreviation means, and by a digest of the password, so a hit
+    is only served to a caller that could have logged in.
+    """
+
+    def __init__(
+        self,
+        open_session: Callable[[], Session],
+        cache: ResultCache,
+        *,
+        host: str,
+        port: int,
+        user: str,
+        password: str | None = None,
+        max_age: float | None = None,
+    ):
+        self.open_session = open_session
+        self.cache = cache
+        self.host = host
+        self.port = port
+        self.user = user
+        self.max_age = max_age
+        # As the broker does: never keep the password itself
+        self._credential = hashlib.sha256((password or "").encode()).hexdigest()
+        self._session: Session | None = None
+
+    def connect(self) -> None:
+        """Nothing to do: the switch is only connected to on a cache miss"""
+
+    def close(self) -> None:
+        if self._session is not None:
+            session, self._session = self._session, None
+            session.__exit__(None, None, None)
+
+    def execute_command(self, *, command: str) -> str:
+        """Execute a command, or return its output from the cache if fresh"""
+        key, max_age = self._cache_key(command)
+        if key is not None and max_age > 0:
+            output = self.cache.get(key, max_age=max_age)
+            if output is not None:
+                LOGGER.debug("Result cache hit", extra={"host": self.host, "command": command})
+                return output
+
+        session = self._connected()
+        output = session.execute_command(command=command)
+        if key is not None and _complete(session):
+            self.cache.set(key, output)
+        return output
+
+    def iter_command(self, command: str) -> Iterator[str]:
+        """Yield the command's output lines, from the cache if fresh"""
+        key, max_age = self._cache_key(command)
+        if key is None:
+            yield from self._connected().iter_command(command)
+            return
+
+        output = self.cache.get(key, max_age=max_age) if max_age > 0 else None
+        if output is not None:
+            LOGGER.debug("Result cache hit", extra={"host": self.host, "command": command})
+            if output:
+                yield from output.split("\n")
+            return
+
+        session = self._connected()
+        lines = []
+        for line in session.iter_command(command):
+            lines.append(line)
+            yield line
+        if _complete(session):
+            self.cache.set(key, "\n".join(lines))
+
+    def execute_many(self, commands: Sequence[str]) -> list[str]:
+        return self._connected().execute_many(commands)
+
+    def execute_parallel(self, commands: Sequence[str], *, channels: int = 2) -> list[str]:
+        return self._connected().execute_parallel(commands, channels=channels)
+
+    def _cache_key(self, command: str) -> tuple[tuple[object, ...] | None, float]:
+        """Return the cache key and maximum age for `command`; no key if uncacheable"""
+        max_age = self.max_age if self.max_age is not None else RESULT_CACHE_TTLS.get(command)
+        if max_age is None or not command.startswith("show "):
+            return None, 0.0
+        return (self.host, self.port, self.user, self._credential, command), max_age
+
+    def _connected(self) -> Session:
+        if self._session is None:
+            # Enter it as the CLI would have without the cache in front
+            self._session = self.open_session().__enter__()
+        return self._session
+
+    def __enter__(self) -> "CachedSession":
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        """Context manager exit"""
+        self.close()
@@ -0,0 +1,63 @@
+"""Prompt learning, batch splitting and cleaning of CLI shell output.
+
+The blocking `ZyxelSession` and the asyncio `AsyncZyxelSession` both use
+these, so they cut and clean output the same way.
+"""
+
+import re
+from collections.abc import Sequence
+
+from .terminal import DEFAULT_PROMPTS, TerminalCleaner
+
+
+def learn_prompt(banner: str) -> re.Pattern[str] | None:
+    """Build a prompt pattern from the last prompt line in `banner`.
+
+    "GS1900#" yields a pattern that also accepts "GS1900>" and mode prompts
+    such as "GS1900(config)#", but not other hosts' prompts in the output.
+    """
+    for line in reversed(banner.splitlines()):
+        match = re.match(r"\s*([\w.\-]+)(?:\([\w\-]+\))?[>#]\s*$", line)
+        if match:
+            hostname = re.escape(match.group(1))
+            return re.compile(rf"^{hostname}(?:\([\w\-]+\))?[>#]\s*$", re.MULTILINE)
+    return None
+
+
+def split_outputs(output: str, commands: Sequence[str], prompt: re.Pattern[str]) -> list[str]:
+    """Split the raw output of a batch into one raw output per command.
+
+    Command N ends at the line where the prompt is followed by the echo of
+    command N+1. The echo stays with its command, as with a single command.
+    """
+    outputs = []
+    start = 0
+    for next_command in commands[1:]:
+        # Only accept an echo that sits right after a prompt on its line
+        pos = start
+        while True:
+            pos = output.find(next_command, pos + 1)
+            if pos < 0:
+                break
+            line_start = output.rfind("\n", start, pos) + 1
+            if line_start > start and prompt.match(output, line_start, pos):
+                break
+        if pos < 0:
+            break
+        outputs.append(output[start:line_start])
+        start = pos
+
+    outputs.append(output[start:])
+    # A batch cut short (timeout, dropped channel) leaves the rest empty
+    outputs.extend("" for _ in range(len(commands) - len(outputs)))
+    return outputs
+
+
+def cleaner_prompts(prompt: re.Pattern[str] | None) -> tuple[re.Pattern[str], ...]:
+    """Prompts to drop from output: the defaults and the learned one"""
+    return DEFAULT_PROMPTS if prompt is None else (*DEFAULT_PROMPTS, prompt)
+
+
+def clean_output(output: str, prompt: re.Pattern[str] | None = None) -> str:
+    """Render escape codes and pager remnants away; drop prompts and blank lines"""
+    return TerminalCleaner(cleaner_prompts(prompt)).clean(output)
@@ -0,0 +1,177 @@
+"""Declarative templates for parsing show-command output.
+
+A `Template` describes what a command's output looks like: a table with
+`|` separated columns, `Key : Value` lines, or (for output no template can
+describe) a parse function. Templates are registered in a `TemplateRegistry`
+under their command and compiled the first time they are used. Lookup
+accepts the same abbreviations the switch CLI does ("sh ver" for "show
+version"), resolved with one dictionary lookup per word.
+"""
+
+import re
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Template:
+    """How to parse the output of one show command.
+
+    Exactly one form applies:
+    - `key_value`: every `Key : Value` line becomes an entry of one dict;
+      the value ends at the first `|` (GS1900 appends dates that way).
+    - `parse`: a function that does the parsing itself.
+    - otherwise a `|` separated table: every row becomes a dict keyed by
+      `columns`, or by the snake_cased header cells when `columns` is empty.
+
+    For tables, `start` is a regex for the line after which rows begin (the
+    header); without it the first `|` line is the header when `columns` is
+    empty. A row only counts if every field in `require` is present and
+    matches its regex. `transforms` convert a field's text, e.g. expanding
+    port ranges.
+    """
+
+    command: str
+    aliases: tuple[str, ...] = ()
+    columns: tuple[str, ...] = ()
+    start: str | None = None
+    require: Mapping[str, str] = field(default_factory=dict)
+    transforms: Mapping[str, Callable[[str], Any]] = field(default_factory=dict)
+    key_value: bool = False
+    parse: Callable[[str], Any] | None = None
+
+
+_KEY_VALUE_LINE = re.compile(r"^([^:\r\n]*):([^|\r\n]*)", re.MULTILINE)
+# Ruler lines between header and rows, e.g. "-----+------" or "-----|-----"
+_SEPARATOR = re.compile(r"[\s|+=-]*")
+
+
+def snake_case(header: str) -> str:
+    """Turn a table header cell into a field name: "IP Address" -> "ip_address" """
+    return re.sub(r"[^0-9a-z]+", "_", header.lower()).strip("_")
+
+
+class CompiledTemplate:
+    """A template with its regexes compiled, callable on output text"""
+
+    def __init__(self, template: Template):
+        self.template = template
+        self._start = re.compile(template.start) if template.start else None
+        self._require = [(name, re.compile(pattern)) for name, pattern in template.require.items()]
+        self._transforms = list(template.transforms.items())
+
+    def __call__(self, output: str) -> Any:
+        template = self.template
+        if template.parse is not None:
+            return template.parse(output)
+        if template.key_value:
+            return {key.strip(): value.strip() for key, value in _KEY_VALUE_LINE.findall(output)}
+        return self._parse_table(output)
+
+    def _parse_table(self, output: str) -> list[dict[str, Any]]:
+        lines = output.splitlines()
+        first = 0
+        if self._start is not None:
+            first = next((i + 1 for i, line in enumerate(lines) if self._start.search(line)), -1)
+            if first < 0:
+                return []
+
+        columns = self.template.columns
+        rows: list[dict[str, Any]] = []
+        for line in lines[first:]:
+            if "|" not in line or _SEPARATOR.fullmatch(line):
+                continue
+            cells = [cell.strip() for cell in line.split("|")]
+            if not columns:
+                # The first row is the header
+                columns = tuple(snake_case(cell) for cell in cells)
+                continue
+
+            row: dict[str, Any] = dict(zip(columns, cells, strict=False))
+            if all(name in row and pattern.search(row[name]) for name, pattern in self._require):
+                for name, transform in self._transforms:
+                    if name in row:
+                        row[name] = transform(row[name])
+                rows.append(row)
+        return rows
+
+
+class TemplateRegistry:
+    """Templates by command, looked up with CLI style abbreviations"""
+
+    def __init__(self, templates: tuple[Template, ...] = ()):
+        self._templates: dict[str, Template] = {}
+        self._compiled: dict[str, CompiledTemplate] = {}
+        # Word tree of the registered commands, and per level of it a map
+        # from every word and unambiguous prefix to the full word
+        self._words: dict[str, Any] = {}
+        self._prefixes: dict[int, dict[str, str]] = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template: Template) -> None:
+        """Add `template` under its command and aliases, replacing earlier ones"""
+        for command in (template.command, *template.aliases):
+            key = " ".join(command.lower().split())
+            self._templates[key] = template
+            self._compiled.pop(key, None)
+            node = self._words
+            for word in key.split():
+                node = node.setdefault(word, {})
+        # New words change which prefixes are unambiguous
+        self._prefixes.clear()
+
+    def normalize(self, command: str) -> str | None:
+        """Expand an abbreviated command to a registered one, or return None.
+
+        Every word may be shortened to any prefix that only one registered
+        word at that position starts with: "sh mac add" -> "show mac
+        address-table".
+        """
+        node = self._words
+        words = []
+        for word in command.lower().split():
+            full_word = self._prefix_map(node).get(word)
+            if full_word is None:
+                return None
+            words.append(full_word)
+            node = node[full_word]
+        key = " ".join(words)
+        return key if key in self._templates else None
+
+    def lookup(self, command: str) -> CompiledTemplate | None:
+        """Return the compiled template for `command` (abbreviations allowed)"""
+        key = self.normalize(command)
+        if key is None:
+            return None
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = CompiledTemplate(self._templates[key])
+        return compiled
+
+    def parse(self, command: str, output: str) -> Any:
+        """Parse `output` of `command`, or wrap it as {"output": ...} if unknown"""
+        compiled = self.lookup(command)
+        if compiled is None:
+            return {"output": output}
+        return compiled(output)
+
+    def commands(self) -> list[str]:
+        """Return every registered command and alias"""
+        return sorted(self._templates)
+
+    def _prefix_map(self, node: dict[str, Any]) -> dict[str, str]:
+        prefixes = self._prefixes.get(id(node))
+        if prefixes is None:
+            candidates: dict[str, list[str]] = {}
+            for word in node:
+                for end in range(1, len(word) + 1):
+                    candidates.setdefault(word[:end], []).append(word)
+            prefixes = {
+                prefix: words[0] if len(words) == 1 else prefix
+                for prefix, words in candidates.items()
+                if len(words) == 1 or prefix in node
+            }
+            self._prefixes[id(node)] = prefixes
+        return prefixes
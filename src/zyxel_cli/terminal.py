@@ -0,0 +1,113 @@
+"""Turn raw CLI shell output into the text a terminal would show."""
+
+import re
+from collections.abc import Iterable
+
+from .consts import ZYXEL_PAGER_MARKER
+
+# Prompts of unconfigured switches, dropped even before a prompt is learned
+DEFAULT_PROMPTS = (re.compile(r"\s*Switch[>#]"),)
+
+# The pager marker with the backspaces and blanks that erase it again
+_PAGER_REMNANT = re.compile(re.escape(ZYXEL_PAGER_MARKER) + r"[\b \r]*")
+# Anything in a line that needs rendering; a trailing CR before the line
+# break is the normal line ending and handled by the fast path
+_CONTROL = re.compile(r"[\x1b\b]|\r(?!\r*\Z)")
+# The same for a whole chunk of lines, so plain chunks skip per-line checks
+_CHUNK_CONTROL = re.compile(r"[\x1b\b]|\r(?![\r\n])|" + re.escape(ZYXEL_PAGER_MARKER))
+# One token of a line: a run of text, an escape sequence or a cursor movement
+_TOKEN = re.compile(
+    r"[^\x1b\b\r]+"
+    # CSI, e.g. colors or "erase line"
+    r"|\x1b\[([0-?]*)[ -/]*([@-~])"
+    # OSC, e.g. window title, ended by BEL or ST
+    r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)?"
+    # Other two-character escapes (and a lone ESC)
+    r"|\x1b[@-Z\\-_]?"
+    r"|[\b\r]"
+)
+
+
+class TerminalCleaner:
+    """Incremental cleaner for CLI output, one pass over the text.
+
+    Lines are rendered the way a terminal shows them: ANSI escapes (CSI and
+    OSC) are dropped, backspace and carriage return move the cursor so later
+    characters overwrite earlier ones, and "erase line" truncates. The
+    `--More--` pager marker is removed together with the backspaces and
+    blanks that erase it. Blank lines and lines starting with one of
+    `prompts` are dropped.
+
+    `feed` accepts output in arbitrary chunks and returns the complete lines;
+    `flush` returns the last line once the output has ended. `clean` does
+    both for output that is already complete.
+    """
+
+    def __init__(self, prompts: Iterable[re.Pattern[str]] = DEFAULT_PROMPTS):
+        self.prompts = tuple(prompts)
+        # One alternation instead of a match per prompt and line
+        self._prompt = re.compile(
+            "|".join(f"(?:{prompt.pattern})" for prompt in self.prompts) or r"(?!)",
+            re.MULTILINE if any(p.flags & re.MULTILINE for p in self.prompts) else 0,
+        )
+        self._partial = ""
+
+    def feed(self, text: str) -> list[str]:
+        """Add `text` and return the cleaned lines it completed"""
+        text = self._partial + text
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        if _CHUNK_CONTROL.search(text, 0, len(text) - len(self._partial)):
+            lines = [self._render(line) for line in lines]
+        else:
+            lines = [line.rstrip("\r") for line in lines]
+        match_prompt = self._prompt.match
+        return [line for line in lines if line.strip() and not match_prompt(line)]
+
+    def flush(self) -> list[str]:
+        """Return the cleaned last line if the output did not end in a line break"""
+        line, self._partial = self._render(self._partial), ""
+        return [line] if self._keep(line) else []
+
+    def clean(self, text: str) -> str:
+        """Clean complete output and return it joined with newlines"""
+        return "\n".join(self.feed(text) + self.flush())
+
+    def _keep(self, line: str) -> bool:
+        return bool(line.strip()) and not self._prompt.match(line)
+
+    @staticmethod
+    def _render(line: str) -> str:
+        """Apply the control characters in one line of output"""
+        if ZYXEL_PAGER_MARKER in line:
+            # Drop the marker with its erase sequence, which would otherwise
+            # leave blanks behind when the next page starts with a short line
+            line = _PAGER_REMNANT.sub("", line)
+
+        if not _CONTROL.search(line):
+            line = line.rstrip("\r")
+        else:
+            screen: list[str] = []
+            cursor = 0
+            for match in _TOKEN.finditer(line):
+                token = match.group()
+                if token == "\b":
+                    cursor = max(0, cursor - 1)
+                elif token == "\r":
+                    cursor = 0
+                elif token[0] != "\x1b":
+                    if cursor > len(screen):
+                        screen.extend(" " * (cursor - len(screen)))
+                    screen[cursor : cursor + len(token)] = token
+                    cursor += len(token)
+                elif match.group(2) == "K":
+                    # Erase in line: 0 (default) to the end, 1 to the start, 2 all
+                    mode = match.group(1) or "0"
+                    if mode == "0":
+                        del screen[cursor:]
+                    elif mode == "1":
+                        screen[:cursor] = " " * min(cursor, len(screen))
+                    elif mode == "2":
+                        screen.clear()
+            line = "".join(screen)
+        return line
@@ -0,0 +1,85 @@
+"""Poll a switch on a fixed interval over one open session."""
+
+import logging
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from .client import Session
+
+LOGGER = logging.getLogger("zyxel_cli")
+
+WATCH_MIN_BACKOFF = 1.0
+WATCH_MAX_BACKOFF = 60.0
+
+
+def run_watch(
+    open_session: Callable[[], Session],
+    poll: Callable[[Session], Any],
+    *,
+    interval: float,
+    count: int | None = None,
+    max_backoff: float = WATCH_MAX_BACKOFF,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[dict[str, Any]]:
+    """Run `poll` every `interval` seconds and yield one record per poll.
+
+    Polls are scheduled on a fixed grid from the start, so slow polls do not
+    make the schedule drift; a poll that overruns its slot skips to the next
+    free one. The session stays open between polls. When connecting or a
+    poll fails, an error record is yielded and the session is reopened,
+    waiting twice as long after every failed attempt up to `max_backoff`.
+    Stops after `count` records when given.
+    """
+    session: Session | None = None
+    backoff = WATCH_MIN_BACKOFF
+    start = clock()
+    slot = 0
+    records = 0
+
+    try:
+        while count is None or records < count:
+            if session is None:
+                try:
+                    session = open_session()
+                    session.connect()
+                except Exception as err:
+                    LOGGER.debug(f"Watch connect failed: {err}")
+                    if session is not None:
+                        session.close()
+                        session = None
+                    records += 1
+                    yield {"time": time.time(), "ok": False, "error": f"Connect failed: {err}"}
+                    if count is not None and records >= count:
+                        break
+                    sleep(backoff)
+                    backoff = min(backoff * 2, max_backoff)
+                    continue
+
+            started = clock()
+            record: dict[str, Any] = {"time": time.time()}
+            try:
+                record["result"] = poll(session)
+                record["ok"] = True
+                backoff = WATCH_MIN_BACKOFF
+            except Exception as err:
+                LOGGER.debug(f"Watch poll failed: {err}")
+                record["ok"] = False
+                record["error"] = str(err)
+                # Reconnect for the next poll
+                session.close()
+                session = None
+            record["elapsed"] = round(clock() - started, 3)
+            records += 1
+            yield record
+
+            if count is not None and records >= count:
+                break
+            # Next slot on the grid that has not started yet
+            now = clock()
+            slot = max(slot + 1, int((now - start) // interval) + 1)
+            sleep(max(0.0, start + slot * interval - now))
+    finally:
+        if session is not None:
+            session.close()